@@ -14,3 +14,15 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'airline_booking.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.SEAT_HOLD_EXPIRY_SCHEDULER:
+    # Expire this process's seat holds as they fall due
+    from bookings.services.hold_expiry import hold_expiry
+    hold_expiry.start(load=settings.SEAT_HOLD_EXPIRY_LOAD)
+
+if settings.PAYMENT_WORKERS:
+    # Retry payment attempts a gateway error or a restart left pending
+    from bookings.services.payment_service import payment_pool
+    payment_pool.start()
@@ -0,0 +1,105 @@
+"""SQLite backend for single-node deployments with concurrent writers.
+
+Adds three OPTIONS to django.db.backends.sqlite3 (the first two as they
+exist in Django 5.1, so this module can go once the project upgrades):
+
+init_command
+    ";"-separated statements run on every new connection, e.g.
+    "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL".
+transaction_mode
+    "DEFERRED" (sqlite's default), "IMMEDIATE" or "EXCLUSIVE". With
+    IMMEDIATE every atomic() block takes the write lock at BEGIN, so two
+    transactions never both read and then fail to upgrade to writing:
+    sqlite reports that as "database is locked" without waiting out the
+    busy timeout.
+writer_queue
+    When true, write transactions of this process also wait their turn on
+    an in-process lock before BEGIN, so threads queue in Python instead of
+    polling sqlite's busy handler. Other processes still rely on the busy
+    timeout ("timeout", in seconds, as for the stock backend).
+"""
+import threading
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+from django.db.utils import OperationalError
+
+# One lock per database file, shared by every connection in the process
+_writer_locks = {}
+_writer_locks_guard = threading.Lock()
+
+
+def writer_lock(name):
+    with _writer_locks_guard:
+        return _writer_locks.setdefault(name, threading.Lock())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.init_commands = [
+            command.strip() for command in options.get('init_command', '').split(';')
+            if command.strip()
+        ]
+        transaction_mode = options.get('transaction_mode')
+        if transaction_mode is not None:
+            transaction_mode = transaction_mode.upper()
+            if transaction_mode not in self.TRANSACTION_MODES:
+                raise ImproperlyConfigured(
+                    f"transaction_mode must be one of {', '.join(self.TRANSACTION_MODES)}"
+                )
+        self.transaction_mode = transaction_mode
+        self.writer_queue = bool(options.get('writer_queue'))
+        self._holds_writer_lock = False
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for option in ('init_command', 'transaction_mode', 'writer_queue'):
+            kwargs.pop(option, None)
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for command in self.init_commands:
+            conn.execute(command)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.writer_queue and not self._holds_writer_lock:
+            timeout = self.settings_dict['OPTIONS'].get('timeout', 5)
+            if not writer_lock(self.settings_dict['NAME']).acquire(timeout=timeout):
+                raise OperationalError('database is locked (writer queue timed out)')
+            self._holds_writer_lock = True
+        try:
+            if self.transaction_mode is None:
+                self.cursor().execute('BEGIN')
+            else:
+                self.cursor().execute(f'BEGIN {self.transaction_mode}')
+        except Exception:
+            self._release_writer_lock()
+            raise
+
+    def _release_writer_lock(self):
+        if self._holds_writer_lock:
+            self._holds_writer_lock = False
+            writer_lock(self.settings_dict['NAME']).release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_writer_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_writer_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_writer_lock()
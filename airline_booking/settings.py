@@ -9,9 +9,9 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
-import os
 from pathlib import Path
 from datetime import timedelta
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -20,13 +20,24 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
+# Values below are read from the environment or a .env file. The
+# production profile (DJANGO_PROFILE=production) turns debug off, requires
+# SECRET_KEY and keeps database connections open between requests.
+PRODUCTION = config('DJANGO_PROFILE', default='development') == 'production'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-hu!x0g6_m0i-u=gf!pj8q5z0pzu__u$^7mgece#sg!)ia&8-&&'
+if PRODUCTION:
+    SECRET_KEY = config('SECRET_KEY')
+else:
+    SECRET_KEY = config(
+        'SECRET_KEY',
+        default='django-insecure-hu!x0g6_m0i-u=gf!pj8q5z0pzu__u$^7mgece#sg!)ia&8-&&'
+    )
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = config('DEBUG', default=not PRODUCTION, cast=bool)
 
-ALLOWED_HOSTS = ['*']
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='*', cast=Csv())
 
 
 # Application definition
@@ -42,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bookings.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -77,20 +89,69 @@ WSGI_APPLICATION = 'airline_booking.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': config('SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+    }
+}
+
+# SQLite concurrency mode (see airline_booking/db_backends/sqlite3): WAL so
+# reads never block the writer, writers wait up to SQLITE_BUSY_TIMEOUT
+# seconds for the lock instead of failing, and atomic() blocks take the
+# write lock at BEGIN IMMEDIATE. SQLITE_WRITER_QUEUE also queues this
+# process's write transactions on an in-process lock. Off by default, so
+# the stock backend is used unless it is switched on.
+SQLITE_CONCURRENCY_MODE = config('SQLITE_CONCURRENCY_MODE', default=False, cast=bool)
+SQLITE_BUSY_TIMEOUT = config('SQLITE_BUSY_TIMEOUT', default=20, cast=float)
+SQLITE_WRITER_QUEUE = config('SQLITE_WRITER_QUEUE', default=False, cast=bool)
+
+if SQLITE_CONCURRENCY_MODE:
+    DATABASES['default'].update({
+        'ENGINE': 'airline_booking.db_backends.sqlite3',
+        'OPTIONS': {
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+            'transaction_mode': 'IMMEDIATE',
+            'writer_queue': SQLITE_WRITER_QUEUE,
+        },
+    })
+
+if config('DATABASE_ENGINE', default='sqlite3') == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('POSTGRES_DB', default='airline_booking'),
+            'USER': config('POSTGRES_USER', default='postgres'),
+            'PASSWORD': config('POSTGRES_PASSWORD', default='postgres'),
+            'HOST': config('POSTGRES_HOST', default='db'),
+            'PORT': config('POSTGRES_PORT', default='5432'),
+        }
+    }
+
+# Seconds a connection is reused across requests (0 closes it after each
+# request); health checks drop connections the server has closed.
+DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=60 if PRODUCTION else 0, cast=int)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local-memory LRU per process by default; set REDIS_URL to share one cache
+# between processes.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'airline-booking',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
 }
 
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': os.environ.get('POSTGRES_DB', 'airline_booking'),
-#         'USER': os.environ.get('POSTGRES_USER', 'postgres'),
-#         'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'postgres'),
-#         'HOST': os.environ.get('POSTGRES_HOST', 'db'),
-#         'PORT': os.environ.get('POSTGRES_PORT', '5432'),
-#     }
-# }
+if config('REDIS_URL', default=''):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('REDIS_URL'),
+        'TIMEOUT': 300,
+    }
 
 
 # Password validation
@@ -128,20 +189,134 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# FAST_JSON renders and parses request bodies with orjson (bookings.renderers),
+# falling back to the stock classes when orjson is not installed
+FAST_JSON = config('FAST_JSON', default=True, cast=bool)
+
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'bookings.renderers.FastJSONRenderer' if FAST_JSON else 'rest_framework.renderers.JSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'bookings.renderers.FastJSONParser' if FAST_JSON else 'rest_framework.parsers.JSONParser',
     ],
 }
 
 # Booking specific settings
-SEAT_HOLD_DURATION = timedelta(minutes=10)
\ No newline at end of file
+SEAT_HOLD_DURATION = timedelta(minutes=10)
+
+# In-process seat hold expiry (bookings.services.hold_expiry), started by
+# the WSGI/ASGI application: holds expire within about TICK seconds of
+# their deadline, at most BATCH_SIZE per transaction.
+SEAT_HOLD_EXPIRY_SCHEDULER = config('SEAT_HOLD_EXPIRY_SCHEDULER', default=True, cast=bool)
+# Whether the scheduler also queues the holds already in the database when
+# the process starts. Every gunicorn worker would load the same holds and
+# race to expire them, so this is off: `expire_bookings --sweep` (one
+# process) expires holds from before a restart. Turn it on for a single
+# process running without the sweeper.
+SEAT_HOLD_EXPIRY_LOAD = config('SEAT_HOLD_EXPIRY_LOAD', default=False, cast=bool)
+SEAT_HOLD_EXPIRY_TICK = 1.0
+SEAT_HOLD_EXPIRY_BATCH_SIZE = 500
+
+# Seconds before an in-memory seat map is reloaded from the seats table
+SEAT_MAP_MAX_AGE = 30
+
+# Seat auto-assignment (bookings.services.seat_assignment): each request
+# picks at random among the best SPREAD free seats, skipping seats picked
+# by this process in the last PENDING_TTL seconds, and gives up after
+# ATTEMPTS seats (or groups of seats) turn out to be taken.
+SEAT_ASSIGNMENT_SPREAD = 8
+SEAT_ASSIGNMENT_ATTEMPTS = 5
+SEAT_ASSIGNMENT_PENDING_TTL = 2.0
+
+# Seat availability stream (/api/flights/<id>/seats/stream/, ASGI only):
+# changes queued per client before it is resynchronised from the seat map
+# instead, seconds between resyncs (and keepalives) when nothing changes,
+# seconds before the stream ends and the client reconnects, and the
+# reconnect delay sent to EventSource.
+SEAT_STREAM_MAX_PENDING = 100
+SEAT_STREAM_RESYNC_INTERVAL = 15
+SEAT_STREAM_MAX_AGE = 300
+SEAT_STREAM_RETRY_MS = 1000
+
+# Flight catalogue cache: alias in CACHES and entry lifetime in seconds
+FLIGHT_CACHE_ALIAS = 'default'
+FLIGHT_CACHE_TTL = 300
+
+# Seconds a cached Flight.available_seats value may lag changes made by
+# other processes (changes in this process update it immediately)
+FLIGHT_AVAILABILITY_TTL = 5
+
+# Booking audit trail
+# How far BookingStateTransition rows may lag the state change:
+# 'sync' writes them in the same transaction, 'commit' bulk inserts each
+# transaction's rows right after it commits, 'background' queues them for a
+# flusher thread (every TRANSITION_FLUSH_INTERVAL seconds or once
+# TRANSITION_FLUSH_BATCH_SIZE rows are waiting; 0 starts no thread).
+TRANSITION_AUDIT_DURABILITY = 'sync'
+TRANSITION_FLUSH_INTERVAL = 1.0
+TRANSITION_FLUSH_BATCH_SIZE = 500
+
+# Route the read-only flight endpoints to bookings.async_views; worthwhile
+# only under an ASGI server (see gunicorn.conf.py)
+ASYNC_FLIGHT_VIEWS = config('ASYNC_FLIGHT_VIEWS', default=False, cast=bool)
+
+# Fraction of requests whose SQL, lock waits and serializers are timed
+# (reported in Server-Timing and /api/metrics/); latency is always recorded
+REQUEST_METRICS_SAMPLE_RATE = config('REQUEST_METRICS_SAMPLE_RATE', default=0.1, cast=float)
+
+# Booking reference lookups: the cache alias and how long it keeps a
+# reference -> id entry and a "no such booking" entry (seconds), and the
+# bloom filter that rejects unknown references without a query. The
+# filter is sized for at least CAPACITY references at ERROR_RATE false
+# positives and reloads recent references at least every MAX_AGE seconds.
+# BOOKING_REFERENCE_FILTER: None uses the filter only when the cache is
+# shared between processes (REDIS_URL), since it relies on the cache to
+# hear of bookings made by other processes; True or False forces it.
+BOOKING_REFERENCE_FILTER = None
+BOOKING_REFERENCE_CACHE_ALIAS = 'default'
+BOOKING_REFERENCE_CACHE_TTL = 3600
+BOOKING_REFERENCE_MISS_TTL = 30
+BOOKING_REFERENCE_FILTER_CAPACITY = 100000
+BOOKING_REFERENCE_FILTER_ERROR_RATE = 0.01
+BOOKING_REFERENCE_FILTER_MAX_AGE = 60
+
+# Responses to POSTs sent with an Idempotency-Key are replayed for this
+# long; a key whose first request has run longer than the lock timeout
+# (e.g. the process died) may be taken over by a retry.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+IDEMPOTENCY_LOCK_TIMEOUT = timedelta(seconds=60)
+
+# Archival: finished bookings older than this many days move to
+# archived_bookings (`manage.py archive_bookings`)
+BOOKING_ARCHIVE_AFTER_DAYS = 90
+
+# Payments
+# Gateway adapter class and its constructor options; FakePaymentGateway
+# simulates a provider with the given latency (seconds) and success rate.
+PAYMENT_GATEWAY = 'bookings.services.payment_gateway.FakePaymentGateway'
+PAYMENT_GATEWAY_OPTIONS = {'latency': 0.0, 'success_rate': 0.8}
+
+# Threads charging payment attempts inside each web process. With 0,
+# attempts are left for `manage.py payment_worker`.
+PAYMENT_WORKERS = 4
+
+# Seconds after which an attempt stuck in PROCESSING is handed out again
+PAYMENT_CLAIM_TIMEOUT = 120
+
+# Seconds between the web process's sweeps for attempts left PENDING (after
+# a gateway error or a restart) when PAYMENT_WORKERS is set
+PAYMENT_SWEEP_INTERVAL = 5.0
+
+# Gateway calls per attempt before it is failed and the booking goes back
+# to SEAT_HELD (where its hold can expire), and the delay before the first
+# retry in seconds; each further retry waits twice as long
+PAYMENT_MAX_TRIES = 5
+PAYMENT_RETRY_BACKOFF = 2.0
\ No newline at end of file
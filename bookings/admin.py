@@ -1,11 +1,13 @@
 from django.contrib import admin
-from bookings.models import Flight, Seat, Booking, BookingStateTransition
+from bookings.models import Flight, Seat, Booking, BookingStateTransition, ArchivedBooking
 
 @admin.register(Flight)
 class FlightAdmin(admin.ModelAdmin):
-    list_display = ['flight_number', 'origin', 'destination', 'departure_time', 'total_seats', 'price']
+    list_display = ['flight_number', 'origin', 'destination', 'departure_time', 'total_seats', 'available_seats', 'price']
     search_fields = ['flight_number', 'origin', 'destination']
     list_filter = ['departure_time']
+    # Counted from the seats
+    readonly_fields = ['available_seats']
 
 @admin.register(Seat)
 class SeatAdmin(admin.ModelAdmin):
@@ -24,4 +26,10 @@ class BookingAdmin(admin.ModelAdmin):
 class BookingStateTransitionAdmin(admin.ModelAdmin):
     list_display = ['booking', 'from_state', 'to_state', 'created_at']
     list_filter = ['from_state', 'to_state', 'created_at']
-    search_fields = ['booking__booking_reference']
\ No newline at end of file
+    search_fields = ['booking__booking_reference']
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ['booking_reference', 'passenger_name', 'flight_id', 'state', 'period', 'archived_at']
+    list_filter = ['state', 'period']
+    search_fields = ['booking_reference', 'passenger_name', 'passenger_email']
@@ -0,0 +1,192 @@
+"""Async versions of the read-only flight views, for ASGI deployments.
+
+Under ASGI, Django runs every sync view on one thread per process, so a
+slow cache or database read holds up the others. These views await their
+reads on the default executor instead. They return the same envelopes as
+their APIView counterparts in views.py and are routed instead of them
+when ASYNC_FLIGHT_VIEWS is set, along with the seat availability stream.
+"""
+import asyncio
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse, StreamingHttpResponse
+from django.middleware.gzip import GZipMiddleware
+from rest_framework.settings import api_settings
+from bookings.serializers import FlightSearchSerializer, FlightValuesSerializer, SeatMapQuerySerializer
+from bookings.services.flight_cache import flight_catalogue
+from bookings.services.flight_search import FlightSearchService
+from bookings.services.seat_events import seat_events
+from bookings.services.seat_map import seat_map_cache
+from bookings.views import not_modified, with_validators
+
+def json_response(data, status=200):
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json')
+
+# gzip_page only wraps sync views on this Django version
+gzip_middleware = GZipMiddleware(lambda request: None)
+
+def compressed(request, response):
+    return gzip_middleware.process_response(request, response)
+
+def read(func, *args, **kwargs):
+    # Not thread-sensitive: reads may run in parallel on the executor. No
+    # request signals fire on those threads, so each read does what
+    # request_started/request_finished would for its thread's persistent
+    # connection: drop it once past CONN_MAX_AGE or broken, and health
+    # check it before the next use.
+    def run():
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+async def flight_list(request):
+    flights, etag, last_modified = await read(flight_catalogue.flight_list)
+    if not_modified(request, etag, last_modified):
+        return with_validators(HttpResponse(status=304), etag, last_modified)
+    resp = {
+        "results": flights,
+        "resultDescription": "Flight details.",
+        "resultCode": "1"
+    }
+    return compressed(request, with_validators(json_response(resp), etag, last_modified))
+
+
+async def flight_detail(request, flight_id):
+    flight, etag, last_modified = await read(flight_catalogue.flight_detail, flight_id)
+    if not flight:
+        return json_response({
+            "errorMessage": "Flight details not found.",
+            "resultCode": "0"
+        })
+    if not_modified(request, etag, last_modified):
+        return with_validators(HttpResponse(status=304), etag, last_modified)
+    resp = {
+        "results": flight,
+        "resultDescription": "Flight details descriptions.",
+        "resultCode": "1"
+    }
+    return with_validators(json_response(resp), etag, last_modified)
+
+
+async def flight_search(request):
+    serializer = FlightSearchSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+
+    def search():
+        flights = FlightSearchService.search(**serializer.validated_data)
+        return FlightValuesSerializer(flights).data
+
+    resp = {
+        "results": await read(search),
+        "resultDescription": "Flight search results.",
+        "resultCode": "1"
+    }
+    return compressed(request, json_response(resp))
+
+
+async def flight_seats(request, flight_id):
+    serializer = SeatMapQuerySerializer(data=request.GET)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, status=400)
+
+    seat_map = await read(seat_map_cache.get, flight_id)
+    if seat_map is None:
+        return json_response({
+            "errorMessage": "Flight details not found.",
+            "resultCode": "0"
+        })
+    if serializer.validated_data['encoding'] == 'bitmap':
+        seats = seat_map.as_bitmap()
+    else:
+        seats = seat_map.as_list()
+    resp = {
+        "results": seats,
+        "resultDescription": "Flight seats details.",
+        "resultCode": "1"
+    }
+    return compressed(request, json_response(resp))
+
+
+def server_sent_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+async def flight_seat_stream(request, flight_id):
+    """Server-Sent Events: a snapshot of the flight's seats, then changes.
+
+    `snapshot` carries the same list as the seats endpoint; `seats` events
+    carry {"available": [seat ids], "taken": [seat ids]}. Streams end after
+    SEAT_STREAM_MAX_AGE seconds and EventSource reconnects for a new
+    snapshot, so a client that went away without the server noticing is
+    not streamed to forever.
+    """
+    subscription = seat_events.subscribe(flight_id)
+    seat_map = await read(seat_map_cache.get, flight_id)
+    if seat_map is None:
+        seat_events.unsubscribe(subscription)
+        return json_response({
+            "errorMessage": "Flight details not found.",
+            "resultCode": "0"
+        })
+    response = StreamingHttpResponse(
+        seat_event_stream(subscription, seat_map), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def seat_event_stream(subscription, seat_map):
+    # Changes committed after subscribe() but already in the snapshot are
+    # filtered out against this copy of what the client has
+    sent = dict(zip(seat_map.seat_ids, seat_map.available))
+    ends_at = time.monotonic() + settings.SEAT_STREAM_MAX_AGE
+    try:
+        yield f"retry: {settings.SEAT_STREAM_RETRY_MS}\n".encode()
+        yield server_sent_event('snapshot', {
+            "flight_id": subscription.flight_id,
+            "seats": seat_map.as_list()
+        })
+        while True:
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(
+                    subscription.queue.get(),
+                    timeout=min(remaining, settings.SEAT_STREAM_RESYNC_INTERVAL)
+                )
+            except asyncio.TimeoutError:
+                event = None
+            if event is None:
+                # Fell behind, or quiet for a while: catch up with the seat
+                # map, which also sees other processes' changes once reloaded
+                seat_map = await read(seat_map_cache.get, subscription.flight_id)
+                if seat_map is None:
+                    return
+                changes = dict(zip(seat_map.seat_ids, seat_map.available))
+            else:
+                seat_ids, is_available = event
+                changes = dict.fromkeys(seat_ids, int(is_available))
+
+            delta = {"available": [], "taken": []}
+            for seat_id, flag in changes.items():
+                if sent.get(seat_id) != flag:
+                    sent[seat_id] = flag
+                    delta["available" if flag else "taken"].append(seat_id)
+            if delta["available"] or delta["taken"]:
+                yield server_sent_event('seats', delta)
+            elif event is None:
+                yield b": keepalive\n\n"
+    finally:
+        seat_events.unsubscribe(subscription)
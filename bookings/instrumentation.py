@@ -0,0 +1,212 @@
+"""Per-request timing: SQL, row-lock waits, serializers and total latency.
+
+RequestMetricsMiddleware times every request; a REQUEST_METRICS_SAMPLE_RATE
+fraction of them also get their queries and serializers timed. Results are
+returned in a Server-Timing header and aggregated into process-local
+histograms served in Prometheus text format by MetricsView.
+"""
+import functools
+import random
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from rest_framework.fields import empty
+
+_current = ContextVar('request_metrics', default=None)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+class RequestMetrics:
+    """Counters for one sampled request; also the execute_wrapper that fills them."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.lock_wait = 0.0
+        self.serializer_time = 0.0
+        self._serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.sql_time += elapsed
+            # A SELECT ... FOR UPDATE spends its time waiting for the rows
+            if 'FOR UPDATE' in sql:
+                self.lock_wait += elapsed
+
+
+def timed_serializer(method):
+    """Adds the outermost serializer call's duration to the sampled request."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None or metrics._serializer_depth:
+            return method(self, *args, **kwargs)
+        metrics._serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            metrics._serializer_depth -= 1
+            metrics.serializer_time += time.perf_counter() - started
+    return wrapper
+
+
+class InstrumentedSerializerMixin:
+    @timed_serializer
+    def to_representation(self, instance):
+        return super().to_representation(instance)
+
+    @timed_serializer
+    def run_validation(self, data=empty):
+        return super().run_validation(data)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    def __init__(self, name, help_text, buckets, labels):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.labels = labels
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for label_values, values in series:
+            labels = ','.join(f'{name}="{value}"' for name, value in zip(self.labels, label_values))
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {values[-2]}')
+            lines.append(f'{self.name}_count{{{labels}}} {values[-2]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {values[-1]:.6f}')
+        return lines
+
+
+class MetricsRegistry:
+    LABELS = ('view', 'method')
+
+    def __init__(self):
+        self.duration = Histogram(
+            'booking_api_request_duration_seconds', 'Total request latency.',
+            LATENCY_BUCKETS, self.LABELS
+        )
+        self.queries = Histogram(
+            'booking_api_request_queries', 'SQL statements per sampled request.',
+            QUERY_BUCKETS, self.LABELS
+        )
+        self.sql = Histogram(
+            'booking_api_request_sql_seconds', 'SQL time per sampled request.',
+            LATENCY_BUCKETS, self.LABELS
+        )
+        self.lock_wait = Histogram(
+            'booking_api_request_lock_wait_seconds',
+            'Time in SELECT ... FOR UPDATE statements per sampled request.',
+            LATENCY_BUCKETS, self.LABELS
+        )
+        self.serializer = Histogram(
+            'booking_api_request_serializer_seconds', 'Serializer time per sampled request.',
+            LATENCY_BUCKETS, self.LABELS
+        )
+
+    def record(self, label_values, total, metrics=None):
+        self.duration.observe(label_values, total)
+        if metrics is not None:
+            self.queries.observe(label_values, metrics.queries)
+            self.sql.observe(label_values, metrics.sql_time)
+            self.lock_wait.observe(label_values, metrics.lock_wait)
+            self.serializer.observe(label_values, metrics.serializer_time)
+
+    def render(self):
+        lines = []
+        for histogram in (self.duration, self.queries, self.sql, self.lock_wait, self.serializer):
+            lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        started = time.perf_counter()
+        metrics = None
+        if random.random() < settings.REQUEST_METRICS_SAMPLE_RATE:
+            metrics = RequestMetrics()
+
+        if metrics is None:
+            response = self.get_response(request)
+        else:
+            token = _current.set(metrics)
+            try:
+                with ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(metrics))
+                    response = self.get_response(request)
+            finally:
+                _current.reset(token)
+
+        return self.finish(request, response, started, metrics)
+
+    async def _acall(self, request):
+        # Queries of async views run on executor threads, out of reach of
+        # an execute_wrapper installed here, so only latency is recorded
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        return self.finish(request, response, started, None)
+
+    def finish(self, request, response, started, metrics):
+        total = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unmatched'
+        registry.record((view, request.method), total, metrics)
+        response['Server-Timing'] = self.server_timing(total, metrics)
+        return response
+
+    @staticmethod
+    def server_timing(total, metrics):
+        entries = []
+        if metrics is not None:
+            entries += [
+                f'sql;dur={metrics.sql_time * 1000:.2f};desc="{metrics.queries} queries"',
+                f'lock;dur={metrics.lock_wait * 1000:.2f}',
+                f'serializer;dur={metrics.serializer_time * 1000:.2f}',
+            ]
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
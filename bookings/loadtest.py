@@ -0,0 +1,308 @@
+"""Concurrent load generator for the booking API.
+
+Virtual users are threads; each repeatedly runs one of the registered
+scenarios against either a live server (HttpTransport) or the Django app
+in-process (ClientTransport). Latencies are recorded per endpoint and
+summarised as percentiles so runs can be compared across commits.
+"""
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from django.db import close_old_connections
+
+
+class Stats:
+    """Latency samples and outcome counts for one endpoint."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.rejected = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency, outcome, size=0):
+        with self._lock:
+            self.latencies.append(latency)
+            self.bytes += size
+            if outcome == 'error':
+                self.errors += 1
+            elif outcome == 'rejected':
+                self.rejected += 1
+
+    @staticmethod
+    def percentile(ordered, pct):
+        if not ordered:
+            return None
+        rank = max(1, math.ceil(pct / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+    def summary(self, elapsed):
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+        as_ms = lambda value: None if value is None else round(value * 1000, 2)
+        return {
+            'requests': count,
+            'errors': self.errors,
+            'rejected': self.rejected,
+            'error_rate': round(self.errors / count, 4) if count else 0,
+            'throughput_rps': round(count / elapsed, 2) if elapsed else 0,
+            'mean_ms': as_ms(sum(ordered) / count) if count else None,
+            'p50_ms': as_ms(self.percentile(ordered, 50)),
+            'p95_ms': as_ms(self.percentile(ordered, 95)),
+            'p99_ms': as_ms(self.percentile(ordered, 99)),
+            'max_ms': as_ms(ordered[-1]) if count else None,
+            'bytes_per_request': round(self.bytes / count) if count else 0,
+        }
+
+
+class HttpTransport:
+    """Talks to a running server over HTTP."""
+
+    def __init__(self, base_url, headers=None):
+        self.base_url = base_url.rstrip('/')
+        self.headers = headers or {}
+
+    def request(self, method, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={'Content-Type': 'application/json', **self.headers}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def close(self):
+        pass
+
+
+class ClientTransport:
+    """Calls the app in-process through django.test.Client (one per thread)."""
+
+    def __init__(self, headers=None):
+        from django.test import Client
+        self.client = Client(**{
+            'HTTP_' + name.upper().replace('-', '_'): value
+            for name, value in (headers or {}).items()
+        })
+
+    def request(self, method, path, payload=None):
+        if method == 'GET':
+            response = self.client.get(path)
+        else:
+            response = self.client.post(
+                path, payload or {}, content_type='application/json'
+            )
+        if response.streaming:
+            body = b''.join(response.streaming_content)
+        else:
+            body = response.content
+        return response.status_code, body
+
+    def close(self):
+        close_old_connections()
+
+
+class Scenario:
+    """One user action. run() returns a list of (endpoint, status, body, latency)."""
+
+    name = None
+
+    def __init__(self, context):
+        self.context = context
+
+    @staticmethod
+    def call(transport, endpoint, method, path, payload=None):
+        started = time.perf_counter()
+        try:
+            status, body = transport.request(method, path, payload)
+        except Exception as e:
+            return endpoint, None, str(e).encode(), time.perf_counter() - started
+        return endpoint, status, body, time.perf_counter() - started
+
+    def run(self, transport, rng):
+        raise NotImplementedError
+
+
+class FlightListScenario(Scenario):
+    name = 'flights'
+
+    def run(self, transport, rng):
+        return [self.call(transport, 'GET /flights/', 'GET', '/api/flights/')]
+
+
+class SeatMapScenario(Scenario):
+    name = 'seatmap'
+
+    def run(self, transport, rng):
+        flight_id = rng.choice(self.context['flight_ids'])
+        return [self.call(
+            transport, 'GET /flights/{id}/seats/', 'GET', f'/api/flights/{flight_id}/seats/'
+        )]
+
+
+class ContendedHoldScenario(Scenario):
+    """Create a booking, then race the other users for a random seat on one flight."""
+
+    name = 'hold'
+
+    def run(self, transport, rng):
+        flight_id = self.context['hold_flight_id']
+        create = self.call(transport, 'POST /bookings/create/', 'POST', '/api/bookings/create/', {
+            'flight_id': flight_id,
+            'seat_number': '-',
+            'passenger_name': 'Load Test',
+            'passenger_email': 'loadtest@example.com',
+        })
+        booking_id = None
+        if create[1] == 200:
+            try:
+                booking_id = json.loads(create[2])['results']['id']
+            except (ValueError, KeyError, TypeError):
+                pass
+        if booking_id is None:
+            return [create]
+
+        hold = self.call(
+            transport, 'POST /bookings/{id}/hold-seat/', 'POST',
+            f'/api/bookings/{booking_id}/hold-seat/', self.hold_payload(rng)
+        )
+        return [create, hold]
+
+    def hold_payload(self, rng):
+        return {'seat_number': rng.choice(self.context['hold_seats'])}
+
+
+class AutoAssignedHoldScenario(ContendedHoldScenario):
+    """Like hold, but lets the server pick the seat instead of racing for one."""
+
+    name = 'autohold'
+
+    def hold_payload(self, rng):
+        return {}
+
+
+class LoadTestError(Exception):
+    pass
+
+
+def discover(transport, hold_flight=None):
+    """Scenario context (flight ids, the contended flight and its free seats)."""
+    status, body = transport.request('GET', '/api/flights/')
+    try:
+        flight_ids = [flight['id'] for flight in json.loads(body)['results']]
+    except (ValueError, KeyError, TypeError):
+        raise LoadTestError(f'Could not list flights (HTTP {status})')
+    if not flight_ids:
+        raise LoadTestError('No flights to test against; run seed_data first')
+
+    hold_flight = hold_flight or flight_ids[0]
+    status, body = transport.request('GET', f'/api/flights/{hold_flight}/seats/')
+    try:
+        seats = json.loads(body)['results']
+    except (ValueError, KeyError, TypeError):
+        raise LoadTestError(f'Could not read seats of flight {hold_flight} (HTTP {status})')
+    transport.close()
+
+    return {
+        'flight_ids': flight_ids,
+        'hold_flight_id': hold_flight,
+        'hold_seats': [seat['seat_number'] for seat in seats if seat['is_available']] or ['1A'],
+    }
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [
+        FlightListScenario, SeatMapScenario, ContendedHoldScenario, AutoAssignedHoldScenario
+    ]
+}
+
+
+def classify(status, body):
+    """'ok', 'rejected' (the API declined, e.g. seat taken) or 'error'."""
+    if status is None or status >= 500:
+        return 'error'
+    if status >= 400:
+        return 'rejected'
+    try:
+        if json.loads(body).get('resultCode') == '0':
+            return 'rejected'
+    except (ValueError, AttributeError):
+        pass
+    return 'ok'
+
+
+class LoadTestRunner:
+    def __init__(self, transport_factory, scenarios, context, users=10,
+                 duration=10.0, iterations=None, seed=1):
+        self.transport_factory = transport_factory
+        self.scenarios = [SCENARIOS[name](context) for name in scenarios]
+        self.users = users
+        self.duration = duration
+        self.iterations = iterations
+        self.seed = seed
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+
+    def stats_for(self, endpoint):
+        with self._stats_lock:
+            return self.stats.setdefault(endpoint, Stats())
+
+    def run(self):
+        barrier = threading.Barrier(self.users + 1)
+        deadline = [None]
+        threads = [
+            threading.Thread(target=self._user, args=(i, barrier, deadline))
+            for i in range(self.users)
+        ]
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        deadline[0] = started + self.duration
+        barrier.wait()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return self.report(elapsed)
+
+    def _user(self, index, barrier, deadline):
+        rng = random.Random(self.seed * 1000 + index)
+        transport = self.transport_factory()
+        barrier.wait()
+        try:
+            done = 0
+            while True:
+                if self.iterations is not None:
+                    if done >= self.iterations:
+                        break
+                elif time.perf_counter() >= deadline[0]:
+                    break
+                scenario = self.scenarios[done % len(self.scenarios)]
+                for endpoint, status, body, latency in scenario.run(transport, rng):
+                    self.stats_for(endpoint).record(latency, classify(status, body), len(body or b''))
+                done += 1
+        finally:
+            transport.close()
+
+    def report(self, elapsed):
+        endpoints = {name: stats.summary(elapsed) for name, stats in sorted(self.stats.items())}
+        total = Stats()
+        for stats in self.stats.values():
+            total.latencies.extend(stats.latencies)
+            total.errors += stats.errors
+            total.rejected += stats.rejected
+            total.bytes += stats.bytes
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'users': self.users,
+            'total': total.summary(elapsed),
+            'endpoints': endpoints,
+        }
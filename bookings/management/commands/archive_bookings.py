@@ -0,0 +1,53 @@
+import re
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from bookings.services.archive_service import ArchiveService
+
+class Command(BaseCommand):
+    help = 'Move finished bookings and their history into archived_bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.BOOKING_ARCHIVE_AFTER_DAYS,
+            help='Archive bookings finished more than this many days ago'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Bookings archived per transaction'
+        )
+        parser.add_argument(
+            '--max-batches', type=int, default=None,
+            help='Stop after this many batches (default: until nothing is due)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Count archivable bookings without moving them'
+        )
+        parser.add_argument(
+            '--purge-before', metavar='YYYY-MM',
+            help='Also delete archived bookings created before this month'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        purge_before = options['purge_before']
+        if purge_before and not re.fullmatch(r'\d{4}-\d{2}', purge_before):
+            raise CommandError('--purge-before must look like YYYY-MM')
+
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        if options['dry_run']:
+            count = ArchiveService.archivable(cutoff).count()
+            self.stdout.write(self.style.SUCCESS(f'{count} bookings would be archived'))
+            return
+
+        archived = ArchiveService.archive(
+            cutoff, batch_size=options['batch_size'], max_batches=options['max_batches']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} bookings'))
+
+        if purge_before:
+            purged = ArchiveService.purge_before(purge_before)
+            self.stdout.write(self.style.SUCCESS(f'Purged {purged} archived bookings before {purge_before}'))
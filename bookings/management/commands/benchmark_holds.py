@@ -0,0 +1,96 @@
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from bookings.models import Booking, Flight, Seat
+from bookings.services.booking_service import BookingService
+
+LETTERS = 'ABCDEF'
+
+
+class Command(BaseCommand):
+    help = 'Measure how seat holds on distinct seats scale with concurrent threads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, action='append',
+            help='Thread count to run; repeatable (default: 1, 2, 4 and 8)'
+        )
+        parser.add_argument('--holds', type=int, default=50, help='Holds per thread')
+
+    def handle(self, *args, **options):
+        thread_counts = options['threads'] or [1, 2, 4, 8]
+        self.stdout.write(f'{connection.vendor}: {options["holds"]} holds per thread, each on its own seat')
+        self.stdout.write(f"{'threads':>7} {'holds/s':>9} {'p50':>8} {'p99':>8} {'errors':>7}")
+        for count in thread_counts:
+            held, elapsed, latencies, errors = self.run(count, options['holds'])
+            latencies.sort()
+            self.stdout.write(
+                f"{count:>7} {held / elapsed:>9.1f} {self.percentile(latencies, 50):>8.1f} "
+                f"{self.percentile(latencies, 99):>8.1f} {errors:>7}"
+            )
+
+    def run(self, count, holds):
+        flight = self.create_flight(count * holds)
+        try:
+            seats = list(Seat.objects.filter(flight=flight).values_list('seat_number', flat=True))
+            bookings = [
+                BookingService.create_booking(flight.id, '', f'Passenger {i}', f'p{i}@example.com').id
+                for i in range(len(seats))
+            ]
+            barrier = threading.Barrier(count)
+            latencies = []
+            errors = []
+
+            def worker(index):
+                barrier.wait()
+                try:
+                    for i in range(index * holds, (index + 1) * holds):
+                        started = time.perf_counter()
+                        try:
+                            BookingService.hold_seat(bookings[i], seats[i])
+                        except Exception as e:
+                            errors.append(e)
+                        else:
+                            latencies.append((time.perf_counter() - started) * 1000)
+                finally:
+                    connection.close()
+
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            held = Booking.objects.filter(flight=flight, seat__isnull=False).count()
+            if held != len(latencies):
+                raise CommandError(f'{len(latencies)} holds succeeded but {held} bookings hold a seat')
+            return held, elapsed, latencies, len(errors)
+        finally:
+            flight.delete()
+
+    @staticmethod
+    def create_flight(seat_count):
+        rows = -(-seat_count // len(LETTERS))
+        flight = Flight.objects.create(
+            flight_number=f'BH{time.time_ns() % 10 ** 8}', origin='Delhi', destination='Mumbai',
+            departure_time=timezone.now() + timedelta(days=7), total_seats=rows * len(LETTERS),
+            available_seats=rows * len(LETTERS), price=Decimal('5500.00')
+        )
+        Seat.objects.bulk_create([
+            Seat(flight=flight, seat_number=f'{row}{letter}')
+            for row in range(1, rows + 1)
+            for letter in LETTERS
+        ])
+        return flight
+
+    @staticmethod
+    def percentile(values, pct):
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, len(values) * pct // 100)]
@@ -0,0 +1,58 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from bookings.models import Flight
+
+# name -> (query string, request headers)
+VARIANTS = {
+    'list': ('', {}),
+    'list+gzip': ('', {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+    'bitmap': ('?encoding=bitmap', {}),
+    'bitmap+gzip': ('?encoding=bitmap', {'HTTP_ACCEPT_ENCODING': 'gzip'}),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare response bytes and time per seat-map request across encodings'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--flight', type=int,
+            help='Flight id (default: the flight with the most seats)'
+        )
+        parser.add_argument('--requests', type=int, default=200, help='Requests per variant')
+
+    def handle(self, *args, **options):
+        flight = self.flight(options['flight'])
+        url = reverse('flight-seats', args=[flight.id])
+        client = Client()
+        # Load the seat map before timing
+        client.get(url)
+
+        self.stdout.write(f'Flight {flight.flight_number}: {flight.total_seats} seats')
+        self.stdout.write(f"{'variant':12} {'bytes':>8} {'vs list':>8} {'ms/req':>8}")
+        baseline = None
+        for name, (query, headers) in VARIANTS.items():
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                response = client.get(url + query, **headers)
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                raise CommandError(f'{name}: HTTP {response.status_code}')
+            size = len(response.content)
+            baseline = baseline or size
+            self.stdout.write(
+                f"{name:12} {size:>8} {size / baseline:>8.1%} "
+                f"{elapsed / options['requests'] * 1000:>8.2f}"
+            )
+
+    @staticmethod
+    def flight(flight_id):
+        flights = Flight.objects.order_by('-total_seats')
+        if flight_id is not None:
+            flights = flights.filter(id=flight_id)
+        flight = flights.first()
+        if flight is None:
+            raise CommandError('No flight found; run seed_data first')
+        return flight
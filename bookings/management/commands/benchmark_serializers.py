@@ -0,0 +1,106 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from bookings.models import Booking, BookingState, BookingStateTransition, Flight, Seat
+from bookings.renderers import FastJSONRenderer, orjson
+from bookings.serializers import (
+    BookingSerializer, BookingValuesSerializer, FlightSerializer, FlightValuesSerializer,
+    SeatSerializer, SeatValuesSerializer
+)
+
+LETTERS = 'ABCDEF'
+
+
+class Command(BaseCommand):
+    help = 'Compare serialization and rendering cost per 10k flights, seats and bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=10000, help='Rows of each model')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per case; the best is reported')
+
+    def handle(self, *args, **options):
+        count = options['objects']
+        # The rows are created in a transaction that is rolled back
+        with transaction.atomic():
+            self.create_rows(count)
+            results = self.run_cases(count, options['repeat'])
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"ms per 10k objects (query included); orjson {'installed' if orjson else 'missing'}")
+        self.stdout.write(f"{'case':10} {'baseline':>10} {'fast':>10} {'speedup':>8}")
+        for name, baseline, fast in results:
+            self.stdout.write(
+                f"{name:10} {baseline * 1000:>10.1f} {fast * 1000:>10.1f} {baseline / fast:>7.1f}x"
+            )
+
+    def run_cases(self, count, repeat):
+        flights = Flight.objects.order_by('id')
+        seats = Seat.objects.order_by('id')
+        bookings = Booking.objects.order_by('-created_at', '-id')
+        booking_data = BookingSerializer(bookings.select_related('flight', 'seat'), many=True).data
+
+        cases = [
+            ('flight', lambda: FlightSerializer(flights, many=True).data,
+             lambda: FlightValuesSerializer(flights).data),
+            ('seat', lambda: SeatSerializer(seats, many=True).data,
+             lambda: SeatValuesSerializer(seats).data),
+            ('booking', lambda: BookingSerializer(
+                bookings.select_related('flight', 'seat').prefetch_related('transitions'), many=True
+             ).data,
+             lambda: BookingValuesSerializer(bookings).data),
+            ('render', lambda: JSONRenderer().render(booking_data),
+             lambda: FastJSONRenderer().render(booking_data)),
+        ]
+        return [
+            (name, self.best(baseline, repeat) * 10000 / count, self.best(fast, repeat) * 10000 / count)
+            for name, baseline, fast in cases
+        ]
+
+    @staticmethod
+    def best(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    @staticmethod
+    def create_rows(count):
+        now = timezone.now()
+        Flight.objects.bulk_create([
+            Flight(
+                flight_number=f'BS{i:06d}', origin='Delhi', destination='Mumbai',
+                departure_time=now + timedelta(days=7, minutes=i), total_seats=count,
+                available_seats=count, price=Decimal('5500.00')
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        flight = Flight.objects.get(flight_number='BS000000')
+        seats = Seat.objects.bulk_create([
+            Seat(flight=flight, seat_number=f'{i // len(LETTERS) + 1}{LETTERS[i % len(LETTERS)]}',
+                 is_available=False)
+            for i in range(count)
+        ], batch_size=1000)
+        Booking.objects.bulk_create([
+            Booking(
+                booking_reference=f'BENCH{i:08d}', flight=flight, seat=seat,
+                passenger_name=f'Passenger {i}', passenger_email=f'p{i}@example.com',
+                state=BookingState.SEAT_HELD, amount=flight.price,
+                seat_hold_expires_at=now + timedelta(minutes=10)
+            )
+            for i, seat in enumerate(seats)
+        ], batch_size=1000)
+        BookingStateTransition.objects.bulk_create([
+            BookingStateTransition(
+                booking_id=booking_id, from_state=BookingState.INITIATED,
+                to_state=BookingState.SEAT_HELD, notes='Seat held'
+            )
+            for booking_id in Booking.objects.filter(
+                booking_reference__startswith='BENCH'
+            ).values_list('id', flat=True)
+        ], batch_size=1000)
@@ -0,0 +1,132 @@
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from bookings.loadtest import HttpTransport, LoadTestError, LoadTestRunner, discover
+
+# name -> (command line with {port}, extra environment, module it needs)
+SERVERS = {
+    'runserver': (
+        [sys.executable, 'manage.py', 'runserver', '--noreload', '127.0.0.1:{port}'],
+        {'DJANGO_PROFILE': 'development'},
+        None,
+    ),
+    'gunicorn': (
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--bind', '127.0.0.1:{port}', 'airline_booking.wsgi:application'],
+        {'DJANGO_PROFILE': 'production'},
+        'gunicorn',
+    ),
+    'uvicorn': (
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--bind', '127.0.0.1:{port}', '--worker-class', 'uvicorn.workers.UvicornWorker',
+         'airline_booking.asgi:application'],
+        {'DJANGO_PROFILE': 'production', 'ASYNC_FLIGHT_VIEWS': 'true'},
+        'uvicorn',
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = 'Start each server profile in turn and compare read throughput with the load tester'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server', action='append', choices=list(SERVERS),
+            help='Server profile to benchmark; repeatable (default: all that are installed)'
+        )
+        parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per server')
+        parser.add_argument(
+            '--scenario', action='append', choices=['flights', 'seatmap'],
+            help='Read scenario to run; repeat for a mix (default: both)'
+        )
+        parser.add_argument('--workers', type=int, default=4, help='WEB_CONCURRENCY for gunicorn')
+
+    def handle(self, *args, **options):
+        names = options['server'] or [
+            name for name, (_, _, module) in SERVERS.items()
+            if module is None or importlib.util.find_spec(module)
+        ]
+        scenarios = options['scenario'] or ['flights', 'seatmap']
+
+        results = []
+        for name in names:
+            command, env, module = SERVERS[name]
+            if module and not importlib.util.find_spec(module):
+                raise CommandError(f'{name} needs the {module} package')
+            self.stdout.write(f'Benchmarking {name}...')
+            results.append((name, self.run_server(command, env, scenarios, options)))
+
+        self.stdout.write(f"{'server':12} {'reqs':>7} {'rps':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6}")
+        for name, total in results:
+            self.stdout.write(
+                f"{name:12} {total['requests']:>7} {total['throughput_rps']:>9} "
+                f"{total['p50_ms'] or 0:>8} {total['p95_ms'] or 0:>8} {total['p99_ms'] or 0:>8} "
+                f"{total['error_rate'] * 100:>6.1f}"
+            )
+
+    def run_server(self, command, env, scenarios, options):
+        port = self.free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        # A file rather than a pipe: runserver logs every request
+        log = tempfile.TemporaryFile()
+        process = subprocess.Popen(
+            [part.format(port=port) for part in command],
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                'SECRET_KEY': os.environ.get('SECRET_KEY', 'benchmark-only-secret-key'),
+                'ALLOWED_HOSTS': '127.0.0.1,localhost',
+                'WEB_CONCURRENCY': str(options['workers']),
+                'GUNICORN_ACCESS_LOG': '',
+                'REQUEST_METRICS_SAMPLE_RATE': '0',
+                **env,
+            },
+            stdout=subprocess.DEVNULL,
+            stderr=log,
+        )
+        try:
+            self.wait_until_ready(process, base_url, log)
+            try:
+                context = discover(HttpTransport(base_url))
+            except LoadTestError as e:
+                raise CommandError(str(e))
+            runner = LoadTestRunner(
+                lambda: HttpTransport(base_url), scenarios, context,
+                users=options['users'], duration=options['duration']
+            )
+            return runner.run()['total']
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            log.close()
+
+    def wait_until_ready(self, process, base_url, log, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                log.seek(0)
+                raise CommandError(f'Server exited: {log.read().decode()[-2000:]}')
+            try:
+                with urllib.request.urlopen(base_url + '/api/flights/', timeout=2):
+                    return
+            except (urllib.error.URLError, OSError):
+                time.sleep(0.2)
+        raise CommandError(f'Server at {base_url} did not start within {timeout}s')
+
+    @staticmethod
+    def free_port():
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
@@ -0,0 +1,89 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+HOLD_ENDPOINT = 'POST /bookings/{id}/hold-seat/'
+
+# name -> environment for the settings in airline_booking/settings.py
+MODES = {
+    'stock': {'SQLITE_CONCURRENCY_MODE': 'false'},
+    'wal': {'SQLITE_CONCURRENCY_MODE': 'true', 'SQLITE_WRITER_QUEUE': 'false'},
+    'wal+queue': {'SQLITE_CONCURRENCY_MODE': 'true', 'SQLITE_WRITER_QUEUE': 'true'},
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare seat holds/sec under contention across the SQLite concurrency modes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode', action='append', choices=list(MODES),
+            help='Mode to benchmark; repeatable (default: all)'
+        )
+        parser.add_argument('--users', type=int, default=16, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per mode')
+        parser.add_argument(
+            '--seats', type=int, default=600,
+            help='Seats on the contended flight'
+        )
+
+    def handle(self, *args, **options):
+        if settings.DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+            raise CommandError('benchmark_sqlite compares SQLite modes; unset DATABASE_ENGINE')
+
+        results = []
+        for name in options['mode'] or list(MODES):
+            self.stdout.write(f'Benchmarking {name}...')
+            results.append((name, self.run_mode(MODES[name], options)))
+
+        self.stdout.write(
+            f"{'mode':10} {'holds/s':>8} {'attempts/s':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6}"
+        )
+        for name, hold in results:
+            held = hold['requests'] - hold['errors'] - hold['rejected']
+            self.stdout.write(
+                f"{name:10} {held / hold['elapsed_s']:>8.1f} {hold['throughput_rps']:>10} "
+                f"{hold['p50_ms'] or 0:>8} {hold['p95_ms'] or 0:>8} {hold['p99_ms'] or 0:>8} "
+                f"{hold['error_rate'] * 100:>6.1f}"
+            )
+
+    def run_mode(self, env, options):
+        # A fresh database per mode: the WAL journal mode persists in the file
+        with tempfile.TemporaryDirectory() as directory:
+            report_path = Path(directory) / 'report.json'
+            env = {
+                **os.environ,
+                'SQLITE_PATH': str(Path(directory) / 'bench.sqlite3'),
+                'DATABASE_ENGINE': 'sqlite3',
+                'REQUEST_METRICS_SAMPLE_RATE': '0',
+                **env,
+            }
+            self.manage(env, 'migrate', '--noinput')
+            self.manage(
+                env, 'seed_data', '--flights', '1', '--routes', '1',
+                '--seats-per-flight', str(options['seats'])
+            )
+            self.manage(
+                env, 'loadtest', '--scenario', 'hold',
+                '--users', str(options['users']), '--duration', str(options['duration']),
+                '--output', str(report_path)
+            )
+            report = json.loads(report_path.read_text())
+        hold = report['endpoints'].get(HOLD_ENDPOINT)
+        if hold is None:
+            raise CommandError('No seat holds were attempted; every booking creation failed')
+        return {**hold, 'elapsed_s': report['elapsed_s']}
+
+    @staticmethod
+    def manage(env, *args):
+        result = subprocess.run(
+            [sys.executable, 'manage.py', *args],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if result.returncode:
+            raise CommandError(f"manage.py {args[0]} failed: {result.stderr[-2000:]}")
@@ -1,35 +1,61 @@
+import time
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from bookings.models import Booking, BookingState
 from bookings.services.booking_service import BookingService
 
 class Command(BaseCommand):
     help = 'Expire bookings with expired seat holds'
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Maximum number of bookings expired per transaction'
+        )
+        parser.add_argument(
+            '--sweep', action='store_true',
+            help='Keep running and sweep expired holds every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Seconds to sleep between sweeps in --sweep mode'
+        )
+
     def handle(self, *args, **options):
-        now = timezone.now()
-        expired_bookings = Booking.objects.filter(
-            state=BookingState.SEAT_HELD,
-            seat_hold_expires_at__lt=now
+        if not options['sweep']:
+            count = self.sweep(options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS(f'Successfully expired {count} bookings')
+            )
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Sweeping expired holds every {options['interval']}s")
         )
-        
-        count = 0
-        for booking in expired_bookings:
-            try:
-                BookingService.expire_booking(booking.id)
-                count += 1
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Expired booking {booking.booking_reference}'
+        try:
+            while True:
+                count = self.sweep(options['batch_size'])
+                if count:
+                    self.stdout.write(
+                        self.style.SUCCESS(f'Expired {count} bookings')
                     )
-                )
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Sweeper stopped'))
+
+    def sweep(self, batch_size):
+        # Drain everything that was due when the sweep started, one
+        # bounded transaction at a time.
+        now = timezone.now()
+        total = 0
+        while True:
+            try:
+                count = BookingService.expire_held_bookings(now=now, batch_size=batch_size)
             except Exception as e:
                 self.stdout.write(
-                    self.style.ERROR(
-                        f'Failed to expire booking {booking.booking_reference}: {str(e)}'
-                    )
+                    self.style.ERROR(f'Failed to expire bookings: {str(e)}')
                 )
-        
-        self.stdout.write(
-            self.style.SUCCESS(f'Successfully expired {count} bookings')
-        )
\ No newline at end of file
+                break
+            total += count
+            if count < batch_size:
+                break
+        return total
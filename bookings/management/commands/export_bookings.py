@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from bookings.services.export_service import ExportService, ExportError
+
+class Command(BaseCommand):
+    help = 'Stream bookings or state transitions as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', choices=list(ExportService.TABLES), default='bookings')
+        parser.add_argument('--format', choices=ExportService.FORMATS, default='ndjson')
+        parser.add_argument('--output', help='File to write to (default: stdout)')
+        parser.add_argument('--state', help='Only bookings in this state')
+        parser.add_argument('--flight', help='Only bookings on this flight id')
+        parser.add_argument('--from', dest='created_from', help='Created at or after (date or datetime)')
+        parser.add_argument('--to', dest='created_to', help='Created before (date or datetime)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            filters = ExportService.parse_filters(
+                state=options['state'],
+                flight_id=options['flight'],
+                created_from=options['created_from'],
+                created_to=options['created_to']
+            )
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        rows = ExportService.rows(options['table'], filters, chunk_size=options['chunk_size'])
+        chunks = ExportService.render(options['table'], rows, options['format'])
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
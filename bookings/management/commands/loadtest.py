@@ -0,0 +1,93 @@
+import json
+import subprocess
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from bookings.loadtest import (
+    SCENARIOS, ClientTransport, HttpTransport, LoadTestError, LoadTestRunner, discover
+)
+
+class Command(BaseCommand):
+    help = 'Drive the booking API with concurrent virtual users and report latency percentiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            help='Server to load, e.g. http://localhost:8000. Without it the app '
+                 'is called in-process against the configured database.'
+        )
+        parser.add_argument(
+            '--scenario', action='append', choices=list(SCENARIOS),
+            help='Scenario to run; repeat for a mix (default: all)'
+        )
+        parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run')
+        parser.add_argument(
+            '--iterations', type=int,
+            help='Scenario runs per user; overrides --duration for repeatable request counts'
+        )
+        parser.add_argument(
+            '--hold-flight', type=int,
+            help='Flight whose seats the hold scenario contends for (default: first flight)'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--label', default='', help='Free-form label stored in the report')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        if options['base_url']:
+            transport_factory = lambda: HttpTransport(options['base_url'])
+        else:
+            transport_factory = ClientTransport
+
+        scenarios = options['scenario'] or list(SCENARIOS)
+        try:
+            context = discover(transport_factory(), options['hold_flight'])
+        except LoadTestError as e:
+            raise CommandError(str(e))
+
+        runner = LoadTestRunner(
+            transport_factory, scenarios, context,
+            users=options['users'],
+            duration=options['duration'],
+            iterations=options['iterations'],
+            seed=options['seed'],
+        )
+        report = {
+            'label': options['label'],
+            'commit': self.git_commit(),
+            'started_at': timezone.now().isoformat(),
+            'target': options['base_url'] or f'in-process ({connection.vendor})',
+            'scenarios': scenarios,
+            **runner.run(),
+        }
+
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{report['target']}  users={report['users']}  elapsed={report['elapsed_s']}s"
+        )
+        header = f"{'endpoint':34} {'reqs':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6} {'rej':>6}"
+        self.stdout.write(header)
+        rows = list(report['endpoints'].items()) + [('TOTAL', report['total'])]
+        for endpoint, stats in rows:
+            self.stdout.write(
+                f"{endpoint:34} {stats['requests']:>7} {stats['throughput_rps']:>8} "
+                f"{stats['p50_ms'] or 0:>8} {stats['p95_ms'] or 0:>8} {stats['p99_ms'] or 0:>8} "
+                f"{stats['error_rate'] * 100:>6.1f} {stats['rejected']:>6}"
+            )
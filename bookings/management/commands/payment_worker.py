@@ -0,0 +1,77 @@
+import time
+from concurrent.futures import wait
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from bookings.models import PaymentStatus
+from bookings.services.payment_gateway import get_gateway
+from bookings.services.payment_service import PaymentService, PaymentWorkerPool
+
+class Command(BaseCommand):
+    help = 'Charge pending payment attempts through the configured gateway'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.PAYMENT_WORKERS or 4,
+            help='Concurrent gateway calls'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Drain the pending attempts, report throughput and exit'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Seconds to sleep when nothing is pending'
+        )
+        parser.add_argument(
+            '--latency', type=float,
+            help='Override the fake gateway latency in seconds (benchmarking)'
+        )
+        parser.add_argument(
+            '--success-rate', type=float,
+            help='Override the fake gateway success rate (benchmarking)'
+        )
+
+    def handle(self, *args, **options):
+        overrides = {}
+        if options['latency'] is not None:
+            overrides['latency'] = options['latency']
+        if options['success_rate'] is not None:
+            overrides['success_rate'] = options['success_rate']
+
+        pool = PaymentWorkerPool(workers=options['workers'], gateway=get_gateway(**overrides))
+        try:
+            if options['once']:
+                self.drain(pool, options['workers'])
+            else:
+                self.run_forever(pool, options['workers'], options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Payment worker stopped'))
+        finally:
+            pool.shutdown()
+
+    def drain(self, pool, workers):
+        started = time.monotonic()
+        # One snapshot: attempts put back for a retry wait for the next run
+        ids = PaymentService.claimable_attempt_ids(limit=None)
+        futures = [pool.submit(attempt_id) for attempt_id in ids]
+        attempts = [future.result() for future in wait(futures).done]
+        processed = sum(1 for attempt in attempts if attempt is not None)
+        retrying = sum(
+            1 for attempt in attempts if attempt is not None and attempt.status == PaymentStatus.PENDING
+        )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} payment attempts in {elapsed:.2f}s '
+            f'({processed / max(elapsed, 1e-9):.1f}/s with {workers} workers); '
+            f'{retrying} left for a retry'
+        ))
+
+    def run_forever(self, pool, workers, interval):
+        self.stdout.write(self.style.SUCCESS(f'Payment worker running with {workers} workers'))
+        while True:
+            ids = PaymentService.claimable_attempt_ids(limit=workers * 10)
+            if not ids:
+                time.sleep(interval)
+                continue
+            wait([pool.submit(attempt_id) for attempt_id in ids])
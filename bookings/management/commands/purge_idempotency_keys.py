@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from bookings.services.idempotency import IdempotencyService
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses past their TTL'
+
+    def handle(self, *args, **options):
+        deleted = IdempotencyService.purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} expired idempotency records'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from bookings.services.seat_counts import SeatCountService
+
+class Command(BaseCommand):
+    help = 'Compare Flight.available_seats with the seats table and repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--flight', type=int, action='append', dest='flight_ids',
+            help='Only check this flight id (repeatable)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drift without repairing it'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Flights compared per query'
+        )
+
+    def handle(self, *args, **options):
+        drifted = repaired = 0
+        for flight_id, stored, actual in SeatCountService.find_drift(
+            options['flight_ids'], chunk_size=options['chunk_size']
+        ):
+            drifted += 1
+            if options['dry_run']:
+                self.stdout.write(
+                    self.style.WARNING(f'Flight {flight_id}: counter {stored}, seats {actual}')
+                )
+                continue
+
+            # Recounted under the flight's row lock; a booking may have moved
+            # the count since the comparison above.
+            old, new = SeatCountService.repair(flight_id)
+            if old != new:
+                repaired += 1
+                self.stdout.write(
+                    self.style.WARNING(f'Flight {flight_id}: counter {old} -> {new}')
+                )
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Found {drifted} flights with drift'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {repaired} of {drifted} flights with drift'))
@@ -1,12 +1,68 @@
-from django.core.management.base import BaseCommand
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from django.utils import timezone
 from datetime import timedelta
 from bookings.models import Flight, Seat
+from bookings.services.flight_cache import flight_catalogue
+
+SEAT_LETTERS = ['A', 'B', 'C', 'D', 'E', 'F']
+
+CITIES = [
+    'Delhi', 'Mumbai', 'Bangalore', 'Goa', 'Chennai', 'Kolkata', 'Hyderabad',
+    'Pune', 'Ahmedabad', 'Jaipur', 'Kochi', 'Lucknow', 'Guwahati', 'Srinagar',
+    'Chandigarh', 'Indore', 'Nagpur', 'Patna', 'Bhubaneswar', 'Varanasi',
+]
+
+
+def seat_numbers(total_seats):
+    """Seat numbers for a single-aisle layout: 1A..1F, 2A..2F, ..."""
+    return [
+        f"{i // len(SEAT_LETTERS) + 1}{SEAT_LETTERS[i % len(SEAT_LETTERS)]}"
+        for i in range(total_seats)
+    ]
+
 
 class Command(BaseCommand):
     help = 'Seed database with sample flights and seats'
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--flights', type=int, default=0,
+            help='Generate this many synthetic flights instead of the sample ones'
+        )
+        parser.add_argument(
+            '--seats-per-flight', type=int, default=180,
+            help='Seats generated for each synthetic flight'
+        )
+        parser.add_argument(
+            '--routes', type=int, default=50,
+            help='Number of distinct origin/destination pairs to spread flights over'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=42,
+            help='Random seed; the same seed produces the same schedule'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Seats written per INSERT batch'
+        )
+        parser.add_argument(
+            '--prefix', default='LT',
+            help='Flight number prefix for synthetic flights'
+        )
+
     def handle(self, *args, **options):
+        if options['flights']:
+            self.generate_fleet(options)
+        else:
+            self.seed_samples()
+
+        self.stdout.write(self.style.SUCCESS('Database seeding completed!'))
+
+    def seed_samples(self):
         # Create sample flights
         flights_data = [
             {
@@ -15,6 +71,7 @@ class Command(BaseCommand):
                 'destination': 'Mumbai',
                 'departure_time': timezone.now() + timedelta(days=7),
                 'total_seats': 180,
+                'available_seats': 180,
                 'price': 5500.00
             },
             {
@@ -23,6 +80,7 @@ class Command(BaseCommand):
                 'destination': 'Goa',
                 'departure_time': timezone.now() + timedelta(days=10),
                 'total_seats': 150,
+                'available_seats': 150,
                 'price': 4200.00
             },
             {
@@ -31,34 +89,28 @@ class Command(BaseCommand):
                 'destination': 'Kolkata',
                 'departure_time': timezone.now() + timedelta(days=5),
                 'total_seats': 120,
+                'available_seats': 120,
                 'price': 6800.00
             },
         ]
-        
+
         for flight_data in flights_data:
             flight, created = Flight.objects.get_or_create(
                 flight_number=flight_data['flight_number'],
                 defaults=flight_data
             )
-            
+
             if created:
                 self.stdout.write(
                     self.style.SUCCESS(f'Created flight {flight.flight_number}')
                 )
-                
+
                 # Create seats for this flight
-                seat_rows = flight.total_seats // 6
-                seat_letters = ['A', 'B', 'C', 'D', 'E', 'F']
-                
-                for row in range(1, seat_rows + 1):
-                    for letter in seat_letters:
-                        seat_number = f"{row}{letter}"
-                        Seat.objects.create(
-                            flight=flight,
-                            seat_number=seat_number,
-                            is_available=True
-                        )
-                
+                Seat.objects.bulk_create([
+                    Seat(flight=flight, seat_number=seat_number, is_available=True)
+                    for seat_number in seat_numbers(flight.total_seats)
+                ])
+
                 self.stdout.write(
                     self.style.SUCCESS(
                         f'Created {flight.total_seats} seats for {flight.flight_number}'
@@ -68,5 +120,111 @@ class Command(BaseCommand):
                 self.stdout.write(
                     self.style.WARNING(f'Flight {flight.flight_number} already exists')
                 )
-        
-        self.stdout.write(self.style.SUCCESS('Database seeding completed!'))
\ No newline at end of file
+
+    def generate_fleet(self, options):
+        total_flights = options['flights']
+        seats_per_flight = options['seats_per_flight']
+        batch_size = options['batch_size']
+        prefix = options['prefix']
+        if seats_per_flight < 1 or batch_size < 1 or options['routes'] < 1:
+            raise CommandError('--seats-per-flight, --batch-size and --routes must be positive')
+        # Fixed width so runs of different sizes number flights the same way
+        width = max(6, len(str(total_flights)))
+        if len(prefix) + width > Flight._meta.get_field('flight_number').max_length:
+            raise CommandError('Flight numbers would not fit; use a shorter --prefix')
+
+        rng = random.Random(options['seed'])
+        routes = self.build_routes(rng, options['routes'])
+        numbers = seat_numbers(seats_per_flight)
+        start_day = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        existing = set(
+            Flight.objects.filter(flight_number__startswith=prefix)
+            .values_list('flight_number', flat=True)
+        )
+
+        flights_per_chunk = max(1, batch_size // seats_per_flight)
+        started = time.monotonic()
+        created_flights = created_seats = 0
+        next_report = 0.1
+
+        for chunk_start in range(0, total_flights, flights_per_chunk):
+            chunk = []
+            for i in range(chunk_start, min(chunk_start + flights_per_chunk, total_flights)):
+                origin, destination = routes[i % len(routes)]
+                # Draw every value even for skipped flights so a re-run with
+                # the same seed produces the same schedule.
+                departure = start_day + timedelta(minutes=rng.randrange(1, 90 * 24 * 60))
+                price = Decimal(rng.randrange(2500, 15000)).quantize(Decimal('0.01'))
+                flight_number = f"{prefix}{i + 1:0{width}d}"
+                if flight_number in existing:
+                    continue
+                chunk.append(Flight(
+                    flight_number=flight_number,
+                    origin=origin,
+                    destination=destination,
+                    departure_time=departure,
+                    total_seats=seats_per_flight,
+                    available_seats=seats_per_flight,
+                    price=price,
+                ))
+
+            if chunk:
+                with transaction.atomic():
+                    flight_ids = self.insert_flights(chunk)
+                    self.insert_seats(flight_ids, numbers, batch_size)
+                created_flights += len(chunk)
+                created_seats += len(chunk) * seats_per_flight
+
+            done = min(chunk_start + flights_per_chunk, total_flights) / total_flights
+            if done >= next_report or done == 1:
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{done:6.1%}  {created_flights} flights, {created_seats} seats '
+                    f'in {elapsed:.1f}s ({created_seats / max(elapsed, 1e-9):,.0f} seats/s)'
+                )
+                next_report = done + 0.1
+
+        # bulk_create does not send post_save
+        flight_catalogue.invalidate()
+
+        skipped = total_flights - created_flights
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'Skipped {skipped} flights that already exist'))
+        self.stdout.write(
+            self.style.SUCCESS(f'Created {created_flights} flights and {created_seats} seats')
+        )
+
+    def build_routes(self, rng, count):
+        pairs = [(a, b) for a in CITIES for b in CITIES if a != b]
+        rng.shuffle(pairs)
+        return pairs[:count]
+
+    def insert_flights(self, flights):
+        Flight.objects.bulk_create(flights)
+        if all(flight.pk for flight in flights):
+            return [flight.pk for flight in flights]
+
+        # Backends that cannot return ids from a bulk insert
+        ids = dict(
+            Flight.objects.filter(flight_number__in=[f.flight_number for f in flights])
+            .values_list('flight_number', 'id')
+        )
+        return [ids[flight.flight_number] for flight in flights]
+
+    def insert_seats(self, flight_ids, numbers, batch_size):
+        # executemany skips model instantiation, which dominates bulk_create
+        # at this volume.
+        table = connection.ops.quote_name(Seat._meta.db_table)
+        sql = (
+            f'INSERT INTO {table} (flight_id, seat_number, is_available) '
+            f'VALUES (%s, %s, %s)'
+        )
+        rows = [
+            (flight_id, seat_number, True)
+            for flight_id in flight_ids
+            for seat_number in numbers
+        ]
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(sql, rows[start:start + batch_size])
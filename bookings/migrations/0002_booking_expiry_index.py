@@ -0,0 +1,17 @@
+# Generated by Django 4.2.9 on 2026-10-18 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['state', 'seat_hold_expires_at'], name='bookings_state_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.9 on 2026-10-18 20:18
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_available_seats(apps, schema_editor):
+    Flight = apps.get_model('bookings', 'Flight')
+    Seat = apps.get_model('bookings', 'Seat')
+    available = (
+        Seat.objects.filter(flight=OuterRef('pk'), is_available=True)
+        .order_by()
+        .values('flight')
+        .annotate(n=Count('pk'))
+        .values('n')
+    )
+    Flight.objects.update(available_seats=Coalesce(Subquery(available), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_payment_attempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='available_seats',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_available_seats, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['origin', 'destination', 'departure_time'], name='flights_route_departure_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_time'], name='flights_departure_idx'),
+        ),
+    ]
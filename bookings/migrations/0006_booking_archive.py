@@ -0,0 +1,40 @@
+# Generated by Django 4.2.9 on 2026-10-18 20:23
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_flight_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_id', models.BigIntegerField(db_index=True)),
+                ('booking_reference', models.CharField(db_index=True, max_length=20)),
+                ('flight_id', models.BigIntegerField()),
+                ('seat_number', models.CharField(blank=True, max_length=10, null=True)),
+                ('passenger_name', models.CharField(max_length=100)),
+                ('passenger_email', models.EmailField(max_length=254)),
+                ('state', models.CharField(choices=[('INITIATED', 'Initiated'), ('SEAT_HELD', 'Seat Held'), ('PAYMENT_PENDING', 'Payment Pending'), ('CONFIRMED', 'Confirmed'), ('CANCELLED', 'Cancelled'), ('EXPIRED', 'Expired'), ('REFUNDED', 'Refunded')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payment_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('refund_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('transitions', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('payment_attempts', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('period', models.CharField(max_length=7)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'archived_bookings',
+                'indexes': [models.Index(fields=['period'], name='archived_period_idx')],
+            },
+        ),
+    ]
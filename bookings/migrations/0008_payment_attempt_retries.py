@@ -0,0 +1,23 @@
+# Generated by Django 4.2.9 on 2026-10-18 21:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_idempotency_record'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentattempt',
+            name='retry_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='paymentattempt',
+            name='tries',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
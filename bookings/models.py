@@ -1,5 +1,5 @@
 from django.db import models
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from django.conf import settings
 
@@ -18,11 +18,18 @@ class Flight(models.Model):
     destination = models.CharField(max_length=100)
     departure_time = models.DateTimeField()
     total_seats = models.IntegerField()
+    # Seats with is_available=True, kept in step by BookingService
+    available_seats = models.IntegerField(default=0)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'flights'
+        indexes = [
+            # Flight search: route equality, then departure window / ordering
+            models.Index(fields=['origin', 'destination', 'departure_time'], name='flights_route_departure_idx'),
+            models.Index(fields=['departure_time'], name='flights_departure_idx'),
+        ]
     
     def __str__(self):
         return f"{self.flight_number} - {self.origin} to {self.destination}"
@@ -60,6 +67,12 @@ class Booking(models.Model):
     class Meta:
         db_table = 'bookings'
         ordering = ['-created_at']
+        indexes = [
+            # Serves the expiry sweep: state=SEAT_HELD AND seat_hold_expires_at < now
+            models.Index(fields=['state', 'seat_hold_expires_at'], name='bookings_state_expiry_idx'),
+            # Keyset pagination of the booking list
+            models.Index(fields=['created_at', 'id'], name='bookings_created_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.booking_reference} - {self.state}"
@@ -81,4 +94,90 @@ class BookingStateTransition(models.Model):
         ordering = ['created_at']
     
     def __str__(self):
-        return f"{self.booking.booking_reference}: {self.from_state} -> {self.to_state}"
\ No newline at end of file
+        return f"{self.booking.booking_reference}: {self.from_state} -> {self.to_state}"
+
+class PaymentStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    PROCESSING = 'PROCESSING', 'Processing'
+    SUCCEEDED = 'SUCCEEDED', 'Succeeded'
+    FAILED = 'FAILED', 'Failed'
+
+class PaymentAttempt(models.Model):
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='payment_attempts')
+    payment_method = models.CharField(max_length=20)
+    status = models.CharField(
+        max_length=20,
+        choices=PaymentStatus.choices,
+        default=PaymentStatus.PENDING
+    )
+    payment_id = models.CharField(max_length=100, null=True, blank=True)
+    notes = models.TextField(blank=True)
+    # Gateway calls made so far, and when a PENDING attempt may be retried
+    tries = models.PositiveIntegerField(default=0)
+    retry_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'payment_attempts'
+        indexes = [
+            # Workers poll for the oldest pending attempts
+            models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.booking.booking_reference} payment {self.id} - {self.status}"
+
+class ArchivedBooking(models.Model):
+    """A finished booking moved out of the hot tables by ArchiveService.
+    
+    Transitions and payment attempts are stored inline as JSON: archived
+    bookings are only ever read whole, by id or reference.
+    """
+    booking_id = models.BigIntegerField(db_index=True)
+    booking_reference = models.CharField(max_length=20, db_index=True)
+    flight_id = models.BigIntegerField()
+    seat_number = models.CharField(max_length=10, null=True, blank=True)
+    passenger_name = models.CharField(max_length=100)
+    passenger_email = models.EmailField()
+    state = models.CharField(max_length=20, choices=BookingState.choices)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_id = models.CharField(max_length=100, null=True, blank=True)
+    refund_id = models.CharField(max_length=100, null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    transitions = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    payment_attempts = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    # Month the booking was created (YYYY-MM); retention drops whole periods
+    period = models.CharField(max_length=7)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'archived_bookings'
+        indexes = [
+            models.Index(fields=['period'], name='archived_period_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.booking_reference} - {self.state} (archived)"
+
+class IdempotencyRecord(models.Model):
+    """The stored outcome of a POST sent with an Idempotency-Key header.
+    
+    status_code is null while the first request is still being handled.
+    """
+    key = models.CharField(max_length=255, unique=True)
+    # sha256 of method, path and body; a reused key must match it
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    # zlib-compressed response body
+    body = models.BinaryField(blank=True, default=b'')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'idempotency_records'
+    
+    def __str__(self):
+        return f"{self.key} - {self.status_code or 'in progress'}"
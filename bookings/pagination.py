@@ -0,0 +1,62 @@
+import base64
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+class InvalidCursorError(Exception):
+    pass
+
+class KeysetPagination:
+    """Keyset pagination over (created_at, id), newest first.
+
+    The cursor encodes the last row of the previous page, so every page is
+    an index range scan no matter how deep the client pages.
+    """
+    default_page_size = 50
+    max_page_size = 200
+
+    def __init__(self, request):
+        self.cursor = request.query_params.get('cursor')
+        try:
+            page_size = int(request.query_params.get('page_size', self.default_page_size))
+        except ValueError:
+            raise InvalidCursorError("page_size must be an integer")
+        self.page_size = max(1, min(page_size, self.max_page_size))
+
+    def paginate(self, queryset):
+        queryset = queryset.order_by('-created_at', '-id')
+        if self.cursor:
+            created_at, last_id = self.decode_cursor(self.cursor)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=last_id)
+            )
+
+        # One extra row tells us whether there is a next page
+        rows = list(queryset[:self.page_size + 1])
+        page = rows[:self.page_size]
+        next_cursor = None
+        if len(rows) > self.page_size:
+            next_cursor = self.encode_cursor(page[-1])
+        return page, next_cursor
+
+    @staticmethod
+    def encode_cursor(obj):
+        # A model instance or a .values() row
+        if isinstance(obj, dict):
+            created_at, last_id = obj['created_at'], obj['id']
+        else:
+            created_at, last_id = obj.created_at, obj.id
+        raw = f"{created_at.isoformat()}|{last_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            created_at, last_id = raw.split('|')
+            created_at = parse_datetime(created_at)
+            last_id = int(last_id)
+        except (ValueError, UnicodeDecodeError):
+            raise InvalidCursorError("Invalid cursor")
+        if created_at is None:
+            raise InvalidCursorError("Invalid cursor")
+        return created_at, last_id
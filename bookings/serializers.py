@@ -1,23 +1,52 @@
+from django.db.models import QuerySet
+from django.utils import timezone
 from rest_framework import serializers
-from bookings.models import Booking, Flight, Seat, BookingStateTransition
+from bookings.instrumentation import InstrumentedSerializerMixin, timed_serializer
+from bookings.services.seat_assignment import SEAT_TYPES
+from bookings.models import (
+    ArchivedBooking, Booking, Flight, Seat, BookingStateTransition, PaymentAttempt
+)
 
-class FlightSerializer(serializers.ModelSerializer):
+class FlightSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Flight
         fields = ['id', 'flight_number', 'origin', 'destination', 
-                  'departure_time', 'total_seats', 'price', 'created_at']
+                  'departure_time', 'total_seats', 'available_seats', 'price', 'created_at']
+        read_only_fields = ['available_seats']
 
-class SeatSerializer(serializers.ModelSerializer):
+class FlightSearchSerializer(InstrumentedSerializerMixin, serializers.Serializer):
+    origin = serializers.CharField(max_length=100, required=False)
+    destination = serializers.CharField(max_length=100, required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    min_seats = serializers.IntegerField(min_value=1, required=False)
+    sort = serializers.ChoiceField(
+        choices=['departure', '-departure', 'price', '-price'],
+        default='departure'
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=200, default=50)
+
+class SeatSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Seat
         fields = ['id', 'seat_number', 'is_available']
 
-class BookingStateTransitionSerializer(serializers.ModelSerializer):
+class SeatMapQuerySerializer(InstrumentedSerializerMixin, serializers.Serializer):
+    # list: one object per seat; bitmap: see FlightSeatMap.as_bitmap
+    encoding = serializers.ChoiceField(choices=['list', 'bitmap'], default='list')
+
+class BookingStateTransitionSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = BookingStateTransition
         fields = ['from_state', 'to_state', 'created_at', 'notes']
 
-class BookingSerializer(serializers.ModelSerializer):
+class PaymentAttemptSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = PaymentAttempt
+        fields = ['id', 'booking', 'payment_method', 'status', 'payment_id',
+                  'notes', 'created_at', 'updated_at']
+
+class BookingSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     flight_details = FlightSerializer(source='flight', read_only=True)
     seat_details = SeatSerializer(source='seat', read_only=True)
     transitions = BookingStateTransitionSerializer(many=True, read_only=True)
@@ -35,16 +64,211 @@ class BookingSerializer(serializers.ModelSerializer):
             'payment_id', 'refund_id', 'created_at', 'updated_at'
         ]
 
-class CreateBookingSerializer(serializers.Serializer):
+class ArchivedBookingSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
+    id = serializers.IntegerField(source='booking_id')
+    flight = serializers.IntegerField(source='flight_id')
+    
+    class Meta:
+        model = ArchivedBooking
+        fields = [
+            'id', 'booking_reference', 'flight', 'seat_number', 'passenger_name',
+            'passenger_email', 'state', 'amount', 'payment_id', 'refund_id',
+            'created_at', 'updated_at', 'transitions', 'payment_attempts', 'archived_at'
+        ]
+
+class ValuesSerializer:
+    """Read-only serializer for large lists, working on .values() rows.
+
+    Each subclass gives the same output as a ModelSerializer, without
+    building model instances or running DRF's per-field pipeline. Pass a
+    queryset, or rows already fetched with values().
+    """
+    # output field -> (column, converter method for non-null values or None),
+    # in output order
+    columns = {}
+
+    def __init__(self, instance=None, fields=None):
+        self.instance = instance
+        self.field_names = [name for name in self.columns if fields is None or name in fields]
+        self.timezone = timezone.get_current_timezone()
+        self._fields = [
+            (name, column, getattr(self, converter) if converter else None)
+            for name, (column, converter) in self.columns.items() if name in self.field_names
+        ]
+
+    def values(self, queryset):
+        return queryset.values(*{column for _, column, _ in self._fields})
+
+    @property
+    def data(self):
+        rows = self.instance
+        if isinstance(rows, QuerySet):
+            rows = self.values(rows)
+        return self.to_representation(rows)
+
+    @timed_serializer
+    def to_representation(self, rows):
+        return [self.represent(row) for row in rows]
+
+    def represent(self, row, prefix=''):
+        result = {}
+        for name, column, convert in self._fields:
+            value = row[prefix + column]
+            result[name] = value if convert is None or value is None else convert(value)
+        return result
+
+    def datetime_value(self, value):
+        # As DateTimeField renders it with the default ISO 8601 format
+        value = value.astimezone(self.timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    @staticmethod
+    def decimal_value(value):
+        # As DecimalField renders it with COERCE_DECIMAL_TO_STRING; the
+        # database already returns the field's decimal places
+        return format(value, 'f')
+
+class FlightValuesSerializer(ValuesSerializer):
+    """FlightSerializer's output."""
+    columns = {
+        'id': ('id', None),
+        'flight_number': ('flight_number', None),
+        'origin': ('origin', None),
+        'destination': ('destination', None),
+        'departure_time': ('departure_time', 'datetime_value'),
+        'total_seats': ('total_seats', None),
+        'available_seats': ('available_seats', None),
+        'price': ('price', 'decimal_value'),
+        'created_at': ('created_at', 'datetime_value'),
+    }
+
+class SeatValuesSerializer(ValuesSerializer):
+    """SeatSerializer's output."""
+    columns = {
+        'id': ('id', None),
+        'seat_number': ('seat_number', None),
+        'is_available': ('is_available', None),
+    }
+
+class BookingValuesSerializer(ValuesSerializer):
+    """BookingSerializer's output, with the same optional fields projection.
+
+    Flight and seat details come from the same query; transitions take
+    one more.
+    """
+    columns = {
+        'id': ('id', None),
+        'booking_reference': ('booking_reference', None),
+        'flight': ('flight_id', None),
+        'seat': ('seat_id', None),
+        'passenger_name': ('passenger_name', None),
+        'passenger_email': ('passenger_email', None),
+        'state': ('state', None),
+        'amount': ('amount', 'decimal_value'),
+        'seat_hold_expires_at': ('seat_hold_expires_at', 'datetime_value'),
+        'payment_id': ('payment_id', None),
+        'refund_id': ('refund_id', None),
+        'created_at': ('created_at', 'datetime_value'),
+        'updated_at': ('updated_at', 'datetime_value'),
+    }
+
+    def __init__(self, instance=None, fields=None):
+        super().__init__(instance, fields)
+        nested = {'flight_details', 'seat_details', 'transitions'} if fields is None else set(fields)
+        self.flight_details = FlightValuesSerializer() if 'flight_details' in nested else None
+        self.seat_details = SeatValuesSerializer() if 'seat_details' in nested else None
+        self.transitions = 'transitions' in nested
+
+    def values(self, queryset):
+        # id and created_at are always fetched for transitions and pagination
+        columns = {'id', 'created_at'} | {column for _, column, _ in self._fields}
+        if self.flight_details:
+            columns |= {f'flight__{column}' for column, _ in FlightValuesSerializer.columns.values()}
+        if self.seat_details:
+            columns.add('seat_id')
+            columns |= {f'seat__{column}' for column, _ in SeatValuesSerializer.columns.values()}
+        return queryset.values(*columns)
+
+    @timed_serializer
+    def to_representation(self, rows):
+        rows = list(rows)
+        transitions = {}
+        if self.transitions and rows:
+            for transition in (
+                BookingStateTransition.objects
+                .filter(booking_id__in=[row['id'] for row in rows])
+                .order_by('created_at', 'id')
+                .values('booking_id', 'from_state', 'to_state', 'created_at', 'notes')
+            ):
+                transitions.setdefault(transition.pop('booking_id'), []).append(
+                    {**transition, 'created_at': self.datetime_value(transition['created_at'])}
+                )
+
+        results = []
+        for row in rows:
+            result = self.represent(row)
+            if self.flight_details:
+                result['flight_details'] = self.flight_details.represent(row, 'flight__')
+            if self.seat_details:
+                result['seat_details'] = (
+                    self.seat_details.represent(row, 'seat__') if row['seat_id'] is not None else None
+                )
+            if self.transitions:
+                result['transitions'] = transitions.get(row['id'], [])
+            results.append(result)
+        return results
+
+class SeatPreferenceSerializer(InstrumentedSerializerMixin, serializers.Serializer):
+    """Without seat_number, a seat is assigned matching the optional preferences."""
+    seat_number = serializers.CharField(max_length=10, required=False, allow_blank=True)
+    seat_type = serializers.ChoiceField(choices=SEAT_TYPES, required=False)
+    row_from = serializers.IntegerField(min_value=1, required=False)
+    row_to = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, data):
+        if data.get('row_from') and data.get('row_to') and data['row_from'] > data['row_to']:
+            raise serializers.ValidationError("row_from must not be after row_to")
+        return data
+
+    @staticmethod
+    def preference(data):
+        return {key: data[key] for key in ('seat_type', 'row_from', 'row_to') if key in data}
+
+class CreateBookingSerializer(InstrumentedSerializerMixin, serializers.Serializer):
     flight_id = serializers.IntegerField()
     seat_number = serializers.CharField(max_length=10)
     passenger_name = serializers.CharField(max_length=100)
     passenger_email = serializers.EmailField()
 
-class HoldSeatSerializer(serializers.Serializer):
-    seat_number = serializers.CharField(max_length=10)
+class CheckoutSerializer(SeatPreferenceSerializer):
+    flight_id = serializers.IntegerField()
+    passenger_name = serializers.CharField(max_length=100)
+    passenger_email = serializers.EmailField()
+
+class GroupPassengerSerializer(InstrumentedSerializerMixin, serializers.Serializer):
+    seat_number = serializers.CharField(max_length=10, required=False)
+    passenger_name = serializers.CharField(max_length=100)
+    passenger_email = serializers.EmailField()
+
+class GroupBookingSerializer(SeatPreferenceSerializer):
+    """Either every passenger names a seat or seats are assigned, optionally together."""
+    flight_id = serializers.IntegerField()
+    passengers = GroupPassengerSerializer(many=True, min_length=2, max_length=9)
+    seat_together = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        data = super().validate(data)
+        named = sum(1 for passenger in data['passengers'] if passenger.get('seat_number'))
+        if named not in (0, len(data['passengers'])):
+            raise serializers.ValidationError("Give a seat_number for every passenger or for none")
+        return data
+
+class HoldSeatSerializer(SeatPreferenceSerializer):
+    pass
 
-class ProcessPaymentSerializer(serializers.Serializer):
+class ProcessPaymentSerializer(InstrumentedSerializerMixin, serializers.Serializer):
     payment_method = serializers.ChoiceField(
         choices=['card', 'upi', 'wallet'],
         default='card'
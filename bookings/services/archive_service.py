@@ -0,0 +1,125 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from bookings.models import (
+    ArchivedBooking, Booking, BookingState, BookingStateTransition, PaymentAttempt
+)
+
+class ArchiveService:
+    """Moves finished bookings into archived_bookings in bounded batches.
+
+    A booking is finished when it is EXPIRED or REFUNDED, or CONFIRMED for
+    a flight that has departed, and that happened before the cutoff.
+    """
+
+    TRANSITION_FIELDS = ['from_state', 'to_state', 'created_at', 'notes']
+    PAYMENT_FIELDS = ['id', 'payment_method', 'status', 'payment_id', 'notes', 'created_at', 'updated_at']
+
+    @staticmethod
+    def default_cutoff():
+        return timezone.now() - timedelta(days=settings.BOOKING_ARCHIVE_AFTER_DAYS)
+
+    @staticmethod
+    def archivable(cutoff):
+        return Booking.objects.filter(
+            Q(state__in=[BookingState.EXPIRED, BookingState.REFUNDED], updated_at__lt=cutoff) |
+            Q(state=BookingState.CONFIRMED, flight__departure_time__lt=cutoff)
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def archive_batch(cutoff, batch_size=500):
+        """Archive up to batch_size bookings finished before cutoff.
+
+        Returns the number archived; fewer than batch_size means nothing
+        else was due.
+        """
+        due = ArchiveService.archivable(cutoff).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            # Leave rows another archiver (or a late refund) is holding
+            due = due.select_for_update(
+                skip_locked=True,
+                of=('self',) if connection.features.has_select_for_update_of else ()
+            )
+        booking_ids = list(due.values_list('id', flat=True)[:batch_size])
+        if not booking_ids:
+            return 0
+
+        transitions = ArchiveService._grouped(
+            BookingStateTransition.objects.filter(booking_id__in=booking_ids).order_by('id'),
+            ArchiveService.TRANSITION_FIELDS
+        )
+        attempts = ArchiveService._grouped(
+            PaymentAttempt.objects.filter(booking_id__in=booking_ids).order_by('id'),
+            ArchiveService.PAYMENT_FIELDS
+        )
+        bookings = Booking.objects.filter(id__in=booking_ids).order_by('id').values(
+            'id', 'booking_reference', 'flight_id', 'seat__seat_number', 'passenger_name',
+            'passenger_email', 'state', 'amount', 'payment_id', 'refund_id',
+            'created_at', 'updated_at'
+        )
+        ArchivedBooking.objects.bulk_create([
+            ArchivedBooking(
+                booking_id=booking['id'],
+                booking_reference=booking['booking_reference'],
+                flight_id=booking['flight_id'],
+                seat_number=booking['seat__seat_number'],
+                passenger_name=booking['passenger_name'],
+                passenger_email=booking['passenger_email'],
+                state=booking['state'],
+                amount=booking['amount'],
+                payment_id=booking['payment_id'],
+                refund_id=booking['refund_id'],
+                created_at=booking['created_at'],
+                updated_at=booking['updated_at'],
+                transitions=transitions.get(booking['id'], []),
+                payment_attempts=attempts.get(booking['id'], []),
+                period=booking['created_at'].strftime('%Y-%m'),
+            )
+            for booking in bookings
+        ])
+
+        # Children first so deleting the bookings has nothing left to cascade
+        BookingStateTransition.objects.filter(booking_id__in=booking_ids).delete()
+        PaymentAttempt.objects.filter(booking_id__in=booking_ids).delete()
+        Booking.objects.filter(id__in=booking_ids).delete()
+
+        return len(booking_ids)
+
+    @staticmethod
+    def archive(cutoff=None, batch_size=500, max_batches=None):
+        """Archive in separate transactions until nothing is due. Returns the total."""
+        cutoff = cutoff or ArchiveService.default_cutoff()
+        total = batches = 0
+        while max_batches is None or batches < max_batches:
+            archived = ArchiveService.archive_batch(cutoff, batch_size)
+            total += archived
+            batches += 1
+            if archived < batch_size:
+                break
+        return total
+
+    @staticmethod
+    def find(booking_id=None, booking_reference=None):
+        """The archived copy of a booking, or None."""
+        archived = ArchivedBooking.objects.order_by('-archived_at')
+        if booking_id is not None:
+            archived = archived.filter(booking_id=booking_id)
+        if booking_reference is not None:
+            archived = archived.filter(booking_reference=booking_reference)
+        return archived.first()
+
+    @staticmethod
+    def purge_before(period):
+        """Delete archived bookings created before period (YYYY-MM)."""
+        deleted, _ = ArchivedBooking.objects.filter(period__lt=period).delete()
+        return deleted
+
+    @staticmethod
+    def _grouped(queryset, fields):
+        grouped = {}
+        for row in queryset.values('booking_id', *fields):
+            grouped.setdefault(row.pop('booking_id'), []).append(row)
+        return grouped
@@ -0,0 +1,217 @@
+import hashlib
+import math
+import re
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+from bookings.models import ArchivedBooking, Booking
+from bookings.services.archive_service import ArchiveService
+
+class BloomFilter:
+    """Set membership with no false negatives and a bounded false positive rate."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(1, capacity)
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        positions = self._positions(value)
+        if all(self.bits[p >> 3] & (1 << (p & 7)) for p in positions):
+            return
+        for p in positions:
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(value))
+
+
+class BookingReferenceIndex:
+    """Resolves booking references to ids, live or archived.
+
+    Malformed references and references missing from a process-local bloom
+    filter of every issued reference are rejected without a query. Other
+    references are resolved through the cache, which also remembers
+    references found missing for BOOKING_REFERENCE_MISS_TTL seconds, so
+    a repeated unknown reference costs no query either. New bookings bump a
+    generation counter in the cache; a process that sees the counter move
+    (or whose filter is older than BOOKING_REFERENCE_FILTER_MAX_AGE) loads
+    recently created references before answering "no".
+
+    That only works when every process sees the same counter, so the
+    filter is used only with a shared cache (BOOKING_REFERENCE_FILTER=None)
+    or when forced on; otherwise every new well-formed reference is looked
+    up once.
+    """
+    PATTERN = re.compile(r'BK[0-9A-F]{10}')
+    GENERATION_KEY = 'bookings:references:generation'
+    # Cached in place of an id for a reference with no booking
+    MISSING = 0
+    # Bookings created this long before a refresh may not have been
+    # committed when it ran, so the next refresh looks back this far
+    REFRESH_OVERLAP = timedelta(minutes=5)
+
+    def __init__(self):
+        self.rejected = 0
+        self._filter = None
+        self._generation = None
+        self._refreshed_at = None
+        self._checked_at = 0
+        # Guards the filter and counters; loading holds only _loading, so
+        # lookups are not held up while the references are scanned
+        self._lock = threading.Lock()
+        self._loading = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[settings.BOOKING_REFERENCE_CACHE_ALIAS]
+
+    @property
+    def filter_enabled(self):
+        if settings.BOOKING_REFERENCE_FILTER is not None:
+            return settings.BOOKING_REFERENCE_FILTER
+        # A per-process cache cannot tell this process about bookings
+        # created by the others
+        return not isinstance(self.cache, (LocMemCache, DummyCache))
+
+    def resolve(self, reference):
+        """The booking id for reference, or None if no such booking exists."""
+        reference = reference.upper()
+        if not self.PATTERN.fullmatch(reference) or not self.might_exist(reference):
+            return self._reject()
+
+        key = self._key(reference)
+        booking_id = self.cache.get(key)
+        if booking_id == self.MISSING:
+            return self._reject()
+        if booking_id is None:
+            booking_id = (
+                Booking.objects.filter(booking_reference=reference)
+                .values_list('id', flat=True).first()
+            )
+            if booking_id is None:
+                archived = ArchiveService.find(booking_reference=reference)
+                booking_id = archived.booking_id if archived else None
+            if booking_id is None:
+                self.cache.set(key, self.MISSING, timeout=settings.BOOKING_REFERENCE_MISS_TTL)
+                return None
+            self.cache.set(key, booking_id, timeout=settings.BOOKING_REFERENCE_CACHE_TTL)
+        return booking_id
+
+    def might_exist(self, reference):
+        """False only if no booking has reference."""
+        if not self.filter_enabled:
+            return True
+        bloom = self._filter
+        if bloom is None or bloom.count > bloom.capacity:
+            if not self._load(self._rebuild):
+                # Another thread is loading the filter; ask the database
+                return True
+            bloom = self._filter
+        if reference in bloom:
+            return True
+        if not self._is_stale():
+            return False
+        if not self._load(self._refresh):
+            return True
+        return reference in self._filter
+
+    def add(self, references):
+        """Record references issued by this process; call once they are committed."""
+        with self._lock:
+            if self._filter is not None:
+                for reference in references:
+                    self._filter.add(reference)
+        if references:
+            # In case one was looked up before its booking was made
+            self.cache.delete_many([self._key(reference) for reference in references])
+        self.cache.add(self.GENERATION_KEY, 0, timeout=None)
+        try:
+            self.cache.incr(self.GENERATION_KEY)
+        except ValueError:
+            # Evicted between add and incr; the age bound still applies
+            pass
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+
+    @staticmethod
+    def _key(reference):
+        return f'bookings:reference:{reference}'
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+        return None
+
+    def _is_stale(self):
+        if time.monotonic() - self._checked_at > settings.BOOKING_REFERENCE_FILTER_MAX_AGE:
+            return True
+        return self.cache.get(self.GENERATION_KEY) != self._generation
+
+    def _load(self, step):
+        """Run step unless another thread is loading; True if it ran."""
+        if not self._loading.acquire(blocking=False):
+            return False
+        try:
+            step()
+        finally:
+            self._loading.release()
+        return True
+
+    def _rebuild(self):
+        generation = self.cache.get(self.GENERATION_KEY)
+        refreshed_at = timezone.now()
+        total = Booking.objects.count() + ArchivedBooking.objects.count()
+        bloom = BloomFilter(
+            max(2 * total, settings.BOOKING_REFERENCE_FILTER_CAPACITY),
+            settings.BOOKING_REFERENCE_FILTER_ERROR_RATE
+        )
+        for model in (Booking, ArchivedBooking):
+            references = model.objects.values_list('booking_reference', flat=True)
+            for reference in references.iterator(chunk_size=5000):
+                bloom.add(reference)
+        # References added to the old filter meanwhile bumped the generation
+        # after generation was read, so the next miss refreshes them in
+        with self._lock:
+            self._filter = bloom
+            self._generation = generation
+            self._refreshed_at = refreshed_at
+            self._checked_at = time.monotonic()
+
+    def _refresh(self):
+        generation = self.cache.get(self.GENERATION_KEY)
+        refreshed_at = timezone.now()
+        recent = list(
+            Booking.objects.filter(created_at__gte=self._refreshed_at - self.REFRESH_OVERLAP)
+            .values_list('booking_reference', flat=True)
+        )
+        with self._lock:
+            if self._filter is None:
+                # Reset meanwhile; the next lookup rebuilds it
+                return
+            for reference in recent:
+                self._filter.add(reference)
+            self._generation = generation
+            self._refreshed_at = refreshed_at
+            self._checked_at = time.monotonic()
+
+
+booking_references = BookingReferenceIndex()
@@ -1,11 +1,18 @@
 import uuid
-import random
 from decimal import Decimal
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Case, F, Value, When
 from django.utils import timezone
 from django.conf import settings
 from bookings.models import Booking, BookingState, Seat, Flight
 from bookings.services.state_machine import BookingStateMachine
+from bookings.services.seat_assignment import SeatContentionError, seat_assigner
+from bookings.services.seat_events import seat_events
+from bookings.services.seat_map import seat_map_cache
+from bookings.services.flight_cache import flight_catalogue
+from bookings.services.payment_gateway import get_gateway
+from bookings.services.booking_references import booking_references
+from bookings.services.hold_expiry import hold_expiry
 
 class BookingService:
     
@@ -17,7 +24,9 @@ class BookingService:
     @transaction.atomic
     def create_booking(flight_id, seat_number, passenger_name, passenger_email):
         try:
-            flight = Flight.objects.select_for_update().get(id=flight_id)
+            # Only the price is read here, so the flight row is not locked;
+            # seat contention is resolved per seat in hold_seat.
+            flight = Flight.objects.get(id=flight_id)
         except Flight.DoesNotExist:
             raise ValueError("Flight not found")
         
@@ -30,12 +39,15 @@ class BookingService:
             amount=flight.price,
             state=BookingState.INITIATED
         )
+        BookingService._publish_references([booking.booking_reference])
         
         return booking
     
     @staticmethod
     @transaction.atomic
-    def hold_seat(booking_id, seat_number):
+    def hold_seat(booking_id, seat_number=None, preference=None):
+        """Hold seat_number, or without one a free seat matching preference
+        (seat_type, row_from, row_to; see SeatAssigner)."""
         booking = Booking.objects.select_for_update().get(id=booking_id)
         
         # Check if seat hold has expired
@@ -43,19 +55,11 @@ class BookingService:
             BookingStateMachine.transition(booking, BookingState.EXPIRED, "Seat hold expired")
             raise ValueError("Seat hold has expired")
         
-        # Get and lock the seat
-        try:
-            seat = Seat.objects.select_for_update().get(
-                flight=booking.flight,
-                seat_number=seat_number,
-                is_available=True
-            )
-        except Seat.DoesNotExist:
-            raise ValueError("Seat not available or does not exist")
-        
-        # Mark seat as unavailable
-        seat.is_available = False
-        seat.save(update_fields=['is_available'])
+        # Claim the seat; only this seat's row is contended
+        if seat_number:
+            seat = BookingService._claim_seat(booking.flight_id, seat_number)
+        else:
+            seat = BookingService._claim_any_seat(booking.flight_id, preference)
         
         # Update booking
         booking.seat = seat
@@ -66,11 +70,142 @@ class BookingService:
         BookingStateMachine.transition(
             booking,
             BookingState.SEAT_HELD,
-            f"Seat {seat_number} held until {booking.seat_hold_expires_at}"
+            f"Seat {seat.seat_number} held until {booking.seat_hold_expires_at}"
         )
+        BookingService._schedule_expiry([booking])
         
         return booking
     
+    @staticmethod
+    @transaction.atomic
+    def checkout(flight_id, seat_number, passenger_name, passenger_email, preference=None):
+        """Create a booking, hold the seat and initiate payment in one transaction.
+        
+        Equivalent to create_booking + hold_seat + initiate_payment. The
+        booking row is inserted once, already PAYMENT_PENDING, so no other
+        request can see or lock it before the seat is held. With no
+        seat_number a seat matching preference is assigned.
+        """
+        try:
+            flight = Flight.objects.get(id=flight_id)
+        except Flight.DoesNotExist:
+            raise ValueError("Flight not found")
+        
+        if seat_number:
+            seat = BookingService._claim_seat(flight.id, seat_number)
+        else:
+            seat = BookingService._claim_any_seat(flight.id, preference)
+        
+        booking = Booking(
+            booking_reference=BookingService.generate_booking_reference(),
+            flight=flight,
+            seat=seat,
+            passenger_name=passenger_name,
+            passenger_email=passenger_email,
+            amount=flight.price,
+            seat_hold_expires_at=timezone.now() + settings.SEAT_HOLD_DURATION,
+            state=BookingState.INITIATED
+        )
+        BookingService._publish_references([booking.booking_reference])
+        
+        return BookingStateMachine.transition_path(booking, [
+            (BookingState.SEAT_HELD, f"Seat {seat.seat_number} held until {booking.seat_hold_expires_at}"),
+            (BookingState.PAYMENT_PENDING, "Payment initiated"),
+        ])
+    
+    @staticmethod
+    @transaction.atomic
+    def create_group_booking(flight_id, passengers):
+        """Create and hold one booking per passenger; all or none succeed.
+        
+        passengers is a list of dicts with seat_number, passenger_name and
+        passenger_email. Returns the bookings in the same order.
+        """
+        seat_numbers = [p['seat_number'] for p in passengers]
+        if len(set(seat_numbers)) != len(seat_numbers):
+            raise ValueError("Each passenger needs a different seat")
+        
+        try:
+            flight = Flight.objects.get(id=flight_id)
+        except Flight.DoesNotExist:
+            raise ValueError("Flight not found")
+        
+        # One locking pass, in id order so overlapping groups cannot deadlock
+        seats = {
+            seat.seat_number: seat
+            for seat in Seat.objects.select_for_update()
+            .filter(flight=flight, seat_number__in=seat_numbers)
+            .order_by('id')
+        }
+        unavailable = [n for n in seat_numbers if n not in seats or not seats[n].is_available]
+        if unavailable:
+            raise ValueError(f"Seats not available or do not exist: {', '.join(unavailable)}")
+        
+        seat_ids = [seats[n].id for n in seat_numbers]
+        claimed = Seat.objects.filter(id__in=seat_ids, is_available=True).update(is_available=False)
+        if claimed != len(seat_ids):
+            raise ValueError("Seats not available or do not exist")
+        for seat in seats.values():
+            seat.is_available = False
+        BookingService._adjust_available_seats({flight.id: -claimed})
+        BookingService._publish_seat_change(flight.id, seat_ids, False)
+        
+        expires_at = timezone.now() + settings.SEAT_HOLD_DURATION
+        bookings = [
+            Booking(
+                booking_reference=BookingService.generate_booking_reference(),
+                flight=flight,
+                seat=seats[passenger['seat_number']],
+                passenger_name=passenger['passenger_name'],
+                passenger_email=passenger['passenger_email'],
+                amount=flight.price,
+                seat_hold_expires_at=expires_at,
+                state=BookingState.INITIATED
+            )
+            for passenger in passengers
+        ]
+        BookingService._publish_references([booking.booking_reference for booking in bookings])
+        
+        bookings = BookingStateMachine.create_with_path(bookings, [
+            (BookingState.SEAT_HELD,
+             lambda booking: f"Seat {booking.seat.seat_number} held until {expires_at} (group)"),
+        ])
+        BookingService._schedule_expiry(bookings)
+        return bookings
+    
+    @staticmethod
+    def create_assigned_group_booking(flight_id, passengers, together=False, preference=None):
+        """create_group_booking with the seats picked server-side.
+        
+        With together, the group sits in adjacent seats of one row. Each
+        attempt is its own transaction; a group that loses a seat to
+        another request is retried on different seats, and when every
+        attempt loses, once more on a refreshed seat map before
+        SeatContentionError.
+        """
+        for refreshed in (False, True):
+            tried = False
+            for seat_numbers in seat_assigner.group_candidates(
+                flight_id, len(passengers), together, **(preference or {})
+            ):
+                try:
+                    return BookingService.create_group_booking(flight_id, [
+                        {**passenger, 'seat_number': seat_number}
+                        for passenger, seat_number in zip(passengers, seat_numbers)
+                    ])
+                except ValueError:
+                    tried = True
+            if not tried:
+                break
+            if not refreshed:
+                # Every group was beaten to a seat: the map may be stale
+                seat_assigner.refresh(flight_id)
+        else:
+            raise SeatContentionError("Seats for the group are in demand, please retry")
+        if together:
+            raise ValueError(f"No {len(passengers)} adjacent seats available")
+        raise ValueError(f"Not enough seats available for {len(passengers)} passengers")
+    
     @staticmethod
     @transaction.atomic
     def initiate_payment(booking_id):
@@ -102,18 +237,23 @@ class BookingService:
             BookingStateMachine.transition(booking, BookingState.EXPIRED, "Seat hold expired")
             raise ValueError("Seat hold has expired")
         
-        # Mock payment processing (80% success rate)
-        payment_success = random.random() < 0.8
-        payment_id = f"PAY{uuid.uuid4().hex[:12].upper()}"
+        # Synchronous path: the gateway is called while the booking is locked.
+        # PaymentService.request_payment charges off the request thread.
+        result = get_gateway().charge(
+            booking_reference=booking.booking_reference,
+            amount=booking.amount,
+            payment_method=payment_method,
+            idempotency_key=f"booking-{booking.id}-{booking.updated_at.timestamp()}"
+        )
         
-        if payment_success:
-            booking.payment_id = payment_id
+        if result.success:
+            booking.payment_id = result.payment_id
             booking.save(update_fields=['payment_id', 'updated_at'])
             
             BookingStateMachine.transition(
                 booking,
                 BookingState.CONFIRMED,
-                f"Payment successful: {payment_id}"
+                result.message
             )
             return booking, True
         else:
@@ -121,8 +261,10 @@ class BookingService:
             BookingStateMachine.transition(
                 booking,
                 BookingState.SEAT_HELD,
-                f"Payment failed: {payment_id}"
+                result.message
             )
+            # Its deadline may have passed while payment was pending
+            BookingService._schedule_expiry([booking])
             return booking, False
     
     @staticmethod
@@ -182,9 +324,161 @@ class BookingService:
         
         return booking
     
+    @staticmethod
+    @transaction.atomic
+    def expire_held_bookings(now=None, batch_size=500):
+        """Expire one batch of seat holds that are past their deadline.
+        
+        Returns the number of bookings expired; a result smaller than
+        batch_size means nothing else was due at `now`.
+        """
+        now = now or timezone.now()
+        
+        due = Booking.objects.filter(
+            state=BookingState.SEAT_HELD,
+            seat_hold_expires_at__lt=now
+        ).order_by('seat_hold_expires_at')
+        if connection.features.has_select_for_update_skip_locked:
+            # Rows being paid for or claimed by another sweeper are skipped
+            due = due.select_for_update(skip_locked=True)
+        
+        rows = due.values_list('id', 'flight_id', 'seat_id')[:batch_size]
+        return BookingService._expire_rows(list(rows))
+    
+    @staticmethod
+    @transaction.atomic
+    def expire_due_bookings(booking_ids, now=None):
+        """Expire those of booking_ids that are still held past their deadline.
+        
+        Used by the hold expiry scheduler, which knows the ids, so no scan
+        of held bookings is needed. Returns the number expired.
+        """
+        due = Booking.objects.filter(
+            id__in=booking_ids,
+            state=BookingState.SEAT_HELD,
+            seat_hold_expires_at__lte=now or timezone.now()
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        return BookingService._expire_rows(list(due.values_list('id', 'flight_id', 'seat_id')))
+    
+    @staticmethod
+    def _expire_rows(rows):
+        """Release the seats of (booking id, flight id, seat id) rows and expire them."""
+        if not rows:
+            return 0
+        
+        booking_ids = [booking_id for booking_id, _, _ in rows]
+        seats_by_flight = {}
+        for _, flight_id, seat_id in rows:
+            if seat_id:
+                seats_by_flight.setdefault(flight_id, []).append(seat_id)
+        
+        # Count only the seats this flips, as _release_seat does: a seat
+        # already marked available must not be added to the counter twice
+        BookingService._adjust_available_seats({
+            flight_id: Seat.objects.filter(
+                id__in=flight_seat_ids, is_available=False
+            ).update(is_available=True)
+            for flight_id, flight_seat_ids in seats_by_flight.items()
+        })
+        for flight_id, flight_seat_ids in seats_by_flight.items():
+            BookingService._publish_seat_change(flight_id, flight_seat_ids, True)
+        BookingStateMachine.bulk_transition(
+            booking_ids,
+            BookingState.SEAT_HELD,
+            BookingState.EXPIRED,
+            "Seat hold expired automatically"
+        )
+        
+        return len(booking_ids)
+    
+    @staticmethod
+    def _claim_seat(flight_id, seat_number):
+        try:
+            seat = Seat.objects.get(flight_id=flight_id, seat_number=seat_number)
+        except Seat.DoesNotExist:
+            raise ValueError("Seat not available or does not exist")
+        
+        # Conditional UPDATE: exactly one concurrent caller flips the flag,
+        # the others see zero rows updated.
+        claimed = Seat.objects.filter(id=seat.id, is_available=True).update(is_available=False)
+        if not claimed:
+            raise ValueError("Seat not available or does not exist")
+        
+        seat.is_available = False
+        BookingService._adjust_available_seats({flight_id: -1})
+        BookingService._publish_seat_change(flight_id, [seat.id], False)
+        return seat
+    
+    @staticmethod
+    def _claim_any_seat(flight_id, preference=None):
+        """Claim a free seat matching preference, trying a few candidates.
+        
+        The candidates come from this process's seat map, which may be
+        behind other processes' holds. If they were all taken, the map is
+        refreshed and a second round tried before giving up with
+        SeatContentionError.
+        """
+        for refreshed in (False, True):
+            tried = False
+            for seat_id, seat_number in seat_assigner.candidates(flight_id, **(preference or {})):
+                claimed = Seat.objects.filter(id=seat_id, is_available=True).update(is_available=False)
+                if claimed:
+                    BookingService._adjust_available_seats({flight_id: -1})
+                    BookingService._publish_seat_change(flight_id, [seat_id], False)
+                    return Seat(id=seat_id, flight_id=flight_id, seat_number=seat_number, is_available=False)
+                seat_assigner.conflict(flight_id, seat_id)
+                tried = True
+            if not tried:
+                raise ValueError("No seat available matching the preference")
+            if not refreshed:
+                seat_assigner.refresh(flight_id)
+        raise SeatContentionError("Seats matching the preference are in demand, please retry")
+    
     @staticmethod
     def _release_seat(booking):
-        if booking.seat:
-            seat = Seat.objects.select_for_update().get(id=booking.seat.id)
-            seat.is_available = True
-            seat.save(update_fields=['is_available'])
\ No newline at end of file
+        if booking.seat_id:
+            released = Seat.objects.filter(id=booking.seat_id, is_available=False).update(is_available=True)
+            BookingService._adjust_available_seats({booking.flight_id: released})
+            BookingService._publish_seat_change(booking.flight_id, [booking.seat_id], True)
+    
+    @staticmethod
+    def _adjust_available_seats(deltas):
+        """Apply {flight_id: change} to Flight.available_seats in one UPDATE."""
+        deltas = {flight_id: delta for flight_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        if len(deltas) == 1:
+            [(flight_id, delta)] = deltas.items()
+            Flight.objects.filter(id=flight_id).update(available_seats=F('available_seats') + delta)
+        else:
+            Flight.objects.filter(id__in=deltas).update(
+                available_seats=F('available_seats') + Case(
+                    *[When(id=flight_id, then=Value(delta)) for flight_id, delta in deltas.items()],
+                    default=Value(0)
+                )
+            )
+        flight_ids = list(deltas)
+        transaction.on_commit(lambda: flight_catalogue.invalidate_availability(flight_ids))
+    
+    @staticmethod
+    def _publish_references(references):
+        """Make new references resolvable by booking_references once committed."""
+        transaction.on_commit(lambda: booking_references.add(references))
+    
+    @staticmethod
+    def _schedule_expiry(bookings):
+        """Hand seat hold deadlines to the hold expiry scheduler once committed."""
+        def schedule():
+            for booking in bookings:
+                hold_expiry.schedule(booking.id, booking.seat_hold_expires_at)
+        transaction.on_commit(schedule)
+    
+    @staticmethod
+    def _publish_seat_change(flight_id, seat_ids, is_available):
+        # Applied and streamed only once the seat update is committed
+        def publish():
+            seat_map_cache.mark_seats(flight_id, seat_ids, is_available)
+            seat_events.publish(flight_id, seat_ids, is_available)
+        transaction.on_commit(publish)
\ No newline at end of file
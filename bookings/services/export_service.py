@@ -0,0 +1,103 @@
+import csv
+from datetime import datetime, time
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from bookings.models import Booking, BookingState, BookingStateTransition
+
+class ExportError(ValueError):
+    pass
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+class ExportService:
+    TABLES = {
+        'bookings': (Booking, [
+            'id', 'booking_reference', 'flight_id', 'seat_id', 'passenger_name',
+            'passenger_email', 'state', 'amount', 'seat_hold_expires_at',
+            'payment_id', 'refund_id', 'created_at', 'updated_at',
+        ]),
+        'transitions': (BookingStateTransition, [
+            'id', 'booking_id', 'from_state', 'to_state', 'created_at', 'notes',
+        ]),
+    }
+    FORMATS = ['ndjson', 'csv']
+    CONTENT_TYPES = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv',
+    }
+
+    @staticmethod
+    def parse_filters(state=None, flight_id=None, created_from=None, created_to=None):
+        """Validate raw (string) filter values; created_to is exclusive."""
+        filters = {}
+        if state:
+            if state not in BookingState.values:
+                raise ExportError(f"Unknown state {state}")
+            filters['state'] = state
+        if flight_id:
+            try:
+                filters['flight_id'] = int(flight_id)
+            except (TypeError, ValueError):
+                raise ExportError("flight_id must be an integer")
+        if created_from:
+            filters['created_at__gte'] = ExportService._parse_moment(created_from)
+        if created_to:
+            filters['created_at__lt'] = ExportService._parse_moment(created_to)
+        return filters
+
+    @staticmethod
+    def rows(table, filters, chunk_size=2000):
+        if table not in ExportService.TABLES:
+            raise ExportError(f"Unknown table {table}")
+        model, fields = ExportService.TABLES[table]
+
+        if model is BookingStateTransition:
+            # Transitions are filtered by their booking
+            filters = {f'booking__{key}': value for key, value in filters.items()}
+
+        # Ordering by the primary key avoids sorting the table by created_at
+        queryset = model.objects.filter(**filters).order_by('id').values_list(*fields)
+        for row in queryset.iterator(chunk_size=chunk_size):
+            yield dict(zip(fields, row))
+
+    @staticmethod
+    def render(table, rows, fmt):
+        if fmt == 'ndjson':
+            return ExportService.render_ndjson(rows)
+        if fmt == 'csv':
+            return ExportService.render_csv(ExportService.TABLES[table][1], rows)
+        raise ExportError(f"Unknown format {fmt}")
+
+    @staticmethod
+    def render_ndjson(rows):
+        encoder = DjangoJSONEncoder()
+        for row in rows:
+            yield encoder.encode(row) + '\n'
+
+    @staticmethod
+    def render_csv(fields, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([row[field] for field in fields])
+
+    @staticmethod
+    def _parse_moment(value):
+        try:
+            moment = parse_datetime(value)
+            day = parse_date(value) if moment is None else None
+        except ValueError:
+            raise ExportError(f"Invalid date {value}")
+        if moment is None:
+            if day is None:
+                raise ExportError(f"Invalid date {value}")
+            moment = datetime.combine(day, time.min)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
@@ -0,0 +1,149 @@
+import threading
+import time
+import uuid
+import zlib
+from django.conf import settings
+from django.core.cache import caches
+from bookings.models import Flight
+
+class FlightCatalogue:
+    """Read-through cache of serialized flight data.
+
+    Keys embed a catalogue version; any Flight save or delete bumps the
+    version, so every cached list and detail is superseded at once and old
+    entries age out of the LRU. With the default local-memory cache each
+    process invalidates only its own copy and relies on FLIGHT_CACHE_TTL
+    for changes made elsewhere; configure a shared cache to avoid that.
+
+    available_seats changes on every hold, so it is cached separately for
+    at most FLIGHT_AVAILABILITY_TTL seconds and laid over the cached data.
+    A hold patches the held flight's count in place rather than dropping
+    the whole map. Unknown flight ids are cached too, so repeated lookups
+    of a missing flight do not reach the database.
+    """
+    VERSION_KEY = 'flights:version'
+    AVAILABILITY_KEY = 'flights:availability'
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[settings.FLIGHT_CACHE_ALIAS]
+
+    def version(self):
+        """(version token, last modified unix time) of the catalogue."""
+        current = self.cache.get(self.VERSION_KEY)
+        if current is None:
+            self.cache.add(self.VERSION_KEY, (uuid.uuid4().hex[:12], int(time.time())), timeout=None)
+            current = self.cache.get(self.VERSION_KEY)
+        return current
+
+    def invalidate(self):
+        self.cache.set(self.VERSION_KEY, (uuid.uuid4().hex[:12], int(time.time())), timeout=None)
+
+    def flight_list(self):
+        """Returns (serialized flights, etag, last modified)."""
+        from bookings.serializers import FlightValuesSerializer
+
+        token, modified = self.version()
+        data = self._read_through(
+            f'flights:list:{token}',
+            lambda: FlightValuesSerializer(Flight.objects.order_by('id')).data
+        )
+        digest, counts, counted_at, _ = self.availability()
+        for flight in data:
+            flight['available_seats'] = counts.get(flight['id'], flight['available_seats'])
+        return data, f'"flights-{token}-{digest}"', max(modified, counted_at)
+
+    def flight_detail(self, flight_id):
+        """Returns (serialized flight or None, etag, last modified)."""
+        from bookings.serializers import FlightSerializer
+
+        def load():
+            flight = Flight.objects.filter(id=flight_id).first()
+            # An empty dict caches the miss; creating the flight bumps the version
+            return FlightSerializer(flight).data if flight else {}
+
+        token, modified = self.version()
+        data = self._read_through(f'flights:detail:{token}:{flight_id}', load)
+        if not data:
+            return None, None, modified
+
+        key = f'{self.AVAILABILITY_KEY}:{flight_id}'
+        seats = self.cache.get(key)
+        if seats is None:
+            seats = (
+                Flight.objects.filter(id=flight_id).values_list('available_seats', flat=True).first(),
+                int(time.time())
+            )
+            self.cache.set(key, seats, timeout=settings.FLIGHT_AVAILABILITY_TTL)
+        available_seats, counted_at = seats
+        if available_seats is not None:
+            data['available_seats'] = available_seats
+        etag = f'"flight-{flight_id}-{token}-{data["available_seats"]}"'
+        return data, etag, max(modified, counted_at)
+
+    def availability(self):
+        """(digest, {flight_id: available_seats}, counted at, expires at) for all flights."""
+        current = self.cache.get(self.AVAILABILITY_KEY)
+        if current is None:
+            counts = dict(Flight.objects.order_by('id').values_list('id', 'available_seats'))
+            current = self._store_availability(counts, time.time() + settings.FLIGHT_AVAILABILITY_TTL)
+        return current
+
+    def invalidate_availability(self, flight_ids):
+        """Refresh the cached counts of flight_ids after they changed.
+
+        Reads only those flights' counters and patches them into the cached
+        map. Two processes patching at once can drop one update, which
+        FLIGHT_AVAILABILITY_TTL bounds as for any change made elsewhere.
+        """
+        changed = dict(Flight.objects.filter(id__in=flight_ids).values_list('id', 'available_seats'))
+        now = int(time.time())
+        self.cache.set_many(
+            {f'{self.AVAILABILITY_KEY}:{flight_id}': (count, now) for flight_id, count in changed.items()},
+            timeout=settings.FLIGHT_AVAILABILITY_TTL
+        )
+        with self._lock:
+            current = self.cache.get(self.AVAILABILITY_KEY)
+            # Patching keeps the map's expiry, so other processes' changes
+            # still show up within FLIGHT_AVAILABILITY_TTL
+            if current is not None and current[3] > time.time():
+                self._store_availability({**current[1], **changed}, current[3])
+
+    def _store_availability(self, counts, expires_at):
+        digest = format(zlib.crc32(repr(sorted(counts.items())).encode()), '08x')
+        current = (digest, counts, int(time.time()), expires_at)
+        self.cache.set(self.AVAILABILITY_KEY, current, timeout=expires_at - time.time())
+        return current
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else None,
+            'backend': self.cache.__class__.__name__,
+        }
+
+    def _read_through(self, key, load):
+        data = self.cache.get(key)
+        if data is not None:
+            with self._lock:
+                self.hits += 1
+            return data
+
+        with self._lock:
+            self.misses += 1
+        data = load()
+        if data is not None:
+            # Plain lists/dicts pickle smaller and faster than ReturnList/ReturnDict
+            data = [dict(row) for row in data] if isinstance(data, list) else dict(data)
+            self.cache.set(key, data, timeout=settings.FLIGHT_CACHE_TTL)
+        return data
+
+
+flight_catalogue = FlightCatalogue()
@@ -0,0 +1,39 @@
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from bookings.models import Flight
+
+class FlightSearchService:
+    SORTS = {
+        'departure': ('departure_time', 'id'),
+        '-departure': ('-departure_time', '-id'),
+        'price': ('price', 'departure_time', 'id'),
+        '-price': ('-price', 'departure_time', 'id'),
+    }
+
+    @staticmethod
+    def search(origin=None, destination=None, date_from=None, date_to=None,
+               min_seats=None, sort='departure', limit=50):
+        """Flights matching the filters; date_to is inclusive.
+
+        Served by the (origin, destination, departure_time) index and the
+        denormalized available_seats column, so no seats are counted.
+        """
+        flights = Flight.objects.all()
+        if origin:
+            flights = flights.filter(origin=origin)
+        if destination:
+            flights = flights.filter(destination=destination)
+        if date_from:
+            flights = flights.filter(departure_time__gte=FlightSearchService._start_of(date_from))
+        if date_to:
+            flights = flights.filter(
+                departure_time__lt=FlightSearchService._start_of(date_to + timedelta(days=1))
+            )
+        if min_seats:
+            flights = flights.filter(available_seats__gte=min_seats)
+
+        return flights.order_by(*FlightSearchService.SORTS[sort])[:limit]
+
+    @staticmethod
+    def _start_of(day):
+        return timezone.make_aware(datetime.combine(day, time.min))
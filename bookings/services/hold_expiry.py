@@ -0,0 +1,194 @@
+import heapq
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import close_old_connections
+from bookings.models import Booking, BookingState
+
+logger = logging.getLogger(__name__)
+
+class HoldExpiryScheduler:
+    """Expires seat holds at their deadline instead of polling for them.
+
+    Deadlines live in a heap of (timestamp, booking id). Held bookings are
+    loaded from the database when the scheduler starts; after that,
+    hold_seat, group bookings and failed payments add theirs as they
+    commit. A thread sleeps until the earliest deadline, rounded up to
+    SEAT_HOLD_EXPIRY_TICK seconds so holds due within one tick expire in a
+    single transaction. A booking that is paid for, cancelled or held
+    again before its deadline is left alone; its stale heap entry is
+    discarded when it comes up.
+
+    Web processes start it with load=False (SEAT_HOLD_EXPIRY_LOAD): each
+    then expires only the holds it made itself, so gunicorn workers never
+    race for the same rows. Holds from before a restart, or from a worker
+    that has exited, are left to the single `expire_bookings --sweep`
+    process.
+    """
+
+    def __init__(self, tick=None, batch_size=None):
+        self.tick = tick
+        self.batch_size = batch_size
+        self._heap = []
+        # booking id -> the deadline its newest heap entry is for
+        self._deadlines = None
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._load = True
+
+    @property
+    def active(self):
+        return self._deadlines is not None
+
+    def start(self, load=True):
+        """Start the expiry thread, first queueing the held bookings if load."""
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._load = load
+            self._thread = threading.Thread(target=self._run, name='hold-expiry', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._condition.notify()
+        if thread is not None:
+            thread.join()
+        self.reset()
+
+    def reset(self):
+        with self._condition:
+            self._heap = []
+            self._deadlines = None
+
+    def load(self):
+        """Queue every held booking's deadline; holds already queued keep theirs."""
+        held = Booking.objects.filter(
+            state=BookingState.SEAT_HELD, seat_hold_expires_at__isnull=False
+        ).values_list('id', 'seat_hold_expires_at')
+        loaded = [
+            (booking_id, deadline.timestamp())
+            for booking_id, deadline in held.iterator(chunk_size=5000)
+        ]
+        with self._condition:
+            if self._deadlines is None:
+                self._deadlines = {}
+            for booking_id, deadline in loaded:
+                if booking_id not in self._deadlines:
+                    self._push(booking_id, deadline)
+            self._condition.notify()
+        return len(loaded)
+
+    def schedule(self, booking_id, expires_at):
+        """Expire booking_id at expires_at unless it has moved on by then.
+
+        Does nothing until the scheduler is loaded, so processes that never
+        start it (management commands, tests) do not accumulate deadlines.
+        """
+        if expires_at is None:
+            return
+        with self._condition:
+            if self._deadlines is None:
+                return
+            earliest = self._heap[0][0] if self._heap else math.inf
+            self._push(booking_id, expires_at.timestamp())
+            if self._heap[0][0] < earliest:
+                self._condition.notify()
+
+    def pending(self):
+        with self._condition:
+            return len(self._deadlines or ())
+
+    def run_pending(self, now=None):
+        """Expire every queued hold due at now, in batches. Returns the count."""
+        now = now or time.time()
+        expired = 0
+        while True:
+            with self._condition:
+                due = self._pop_due(now)
+            if not due:
+                return expired
+            expired += self._expire(due, now)
+
+    def _push(self, booking_id, deadline):
+        self._deadlines[booking_id] = deadline
+        heapq.heappush(self._heap, (deadline, booking_id))
+
+    def _pop_due(self, now):
+        due = []
+        batch_size = self.batch_size or settings.SEAT_HOLD_EXPIRY_BATCH_SIZE
+        while self._heap and self._heap[0][0] <= now and len(due) < batch_size:
+            deadline, booking_id = heapq.heappop(self._heap)
+            # Superseded by a later schedule() for the same booking
+            if self._deadlines.get(booking_id) == deadline:
+                del self._deadlines[booking_id]
+                due.append((booking_id, deadline))
+        return due
+
+    def _expire(self, due, now):
+        # Imported here: booking_service imports this module
+        from bookings.services.booking_service import BookingService
+
+        try:
+            return BookingService.expire_due_bookings(
+                [booking_id for booking_id, _ in due],
+                now=datetime.fromtimestamp(now, tz=dt_timezone.utc)
+            )
+        except Exception:
+            logger.exception("Failed to expire %d seat holds; retrying", len(due))
+            retry_at = now + self._tick()
+            with self._condition:
+                for booking_id, _ in due:
+                    if booking_id not in self._deadlines:
+                        self._push(booking_id, retry_at)
+            return 0
+
+    def _tick(self):
+        return self.tick or settings.SEAT_HOLD_EXPIRY_TICK
+
+    def _run(self):
+        try:
+            if self._load:
+                self.load()
+            else:
+                with self._condition:
+                    if self._deadlines is None:
+                        self._deadlines = {}
+        except Exception:
+            logger.exception("Failed to load held bookings; only new holds will expire on time")
+            with self._condition:
+                if self._deadlines is None:
+                    self._deadlines = {}
+        finally:
+            close_old_connections()
+
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    now = time.time()
+                    if self._heap:
+                        # Round up so neighbouring deadlines share a batch
+                        tick = self._tick()
+                        wake_at = math.ceil(self._heap[0][0] / tick) * tick
+                        if wake_at <= now:
+                            break
+                        self._condition.wait(wake_at - now)
+                    else:
+                        self._condition.wait()
+                if self._stopping:
+                    return
+            close_old_connections()
+            try:
+                self.run_pending(now)
+            finally:
+                close_old_connections()
+
+
+hold_expiry = HoldExpiryScheduler()
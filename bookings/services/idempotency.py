@@ -0,0 +1,101 @@
+import hashlib
+import zlib
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from bookings.models import IdempotencyRecord
+
+class IdempotencyError(Exception):
+    status_code = 409
+
+class IdempotencyKeyInUse(IdempotencyError):
+    """The first request with this key has not finished yet."""
+    status_code = 409
+
+class IdempotencyKeyMismatch(IdempotencyError):
+    """The key was first used for a different request."""
+    status_code = 422
+
+
+class IdempotencyService:
+    """Claims Idempotency-Key values and stores the responses they produced."""
+
+    @staticmethod
+    def fingerprint(method, path, body):
+        digest = hashlib.sha256()
+        for part in (method.encode(), path.encode(), body):
+            digest.update(part)
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    @staticmethod
+    def claim(key, fingerprint):
+        """Claim key for a new request.
+
+        Returns None when the caller should handle the request, or the
+        completed IdempotencyRecord to replay. Raises IdempotencyError when
+        the key is in use by a running request or a different one.
+        """
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                IdempotencyRecord.objects.create(
+                    key=key, fingerprint=fingerprint, expires_at=now + settings.IDEMPOTENCY_KEY_TTL
+                )
+            return None
+        except IntegrityError:
+            pass
+
+        record = IdempotencyRecord.objects.filter(key=key).first()
+        if record is None:
+            # Released between our insert and this read; let the client retry
+            raise IdempotencyKeyInUse("A request with this Idempotency-Key is in progress")
+        if record.expires_at <= now:
+            return IdempotencyService._take_over(record, fingerprint, now)
+        if record.status_code is None:
+            if record.created_at < now - settings.IDEMPOTENCY_LOCK_TIMEOUT:
+                # The first request died without releasing the key
+                return IdempotencyService._take_over(record, fingerprint, now)
+            raise IdempotencyKeyInUse("A request with this Idempotency-Key is in progress")
+        if record.fingerprint != fingerprint:
+            raise IdempotencyKeyMismatch("Idempotency-Key was already used for a different request")
+        return record
+
+    @staticmethod
+    def complete(key, status_code, content_type, content):
+        IdempotencyRecord.objects.filter(key=key).update(
+            status_code=status_code,
+            content_type=content_type,
+            body=zlib.compress(content)
+        )
+
+    @staticmethod
+    def release(key):
+        """Forget an unfinished claim so a retry runs the request again."""
+        IdempotencyRecord.objects.filter(key=key, status_code__isnull=True).delete()
+
+    @staticmethod
+    def content(record):
+        return zlib.decompress(bytes(record.body))
+
+    @staticmethod
+    def purge_expired(now=None):
+        deleted, _ = IdempotencyRecord.objects.filter(expires_at__lt=now or timezone.now()).delete()
+        return deleted
+
+    @staticmethod
+    def _take_over(record, fingerprint, now):
+        # Conditional on the row being unchanged so only one retry wins
+        taken = IdempotencyRecord.objects.filter(
+            id=record.id, created_at=record.created_at, status_code=record.status_code
+        ).update(
+            fingerprint=fingerprint,
+            status_code=None,
+            content_type='',
+            body=b'',
+            created_at=now,
+            expires_at=now + settings.IDEMPOTENCY_KEY_TTL
+        )
+        if not taken:
+            raise IdempotencyKeyInUse("A request with this Idempotency-Key is in progress")
+        return None
@@ -0,0 +1,40 @@
+import random
+import time
+import uuid
+from collections import namedtuple
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+GatewayResult = namedtuple('GatewayResult', ['success', 'payment_id', 'message'])
+
+class PaymentGateway:
+    """Adapter interface for a payment provider.
+
+    charge() is called outside any database transaction and may block for
+    as long as the provider takes. idempotency_key is stable across retries
+    of the same payment attempt.
+    """
+
+    def charge(self, booking_reference, amount, payment_method, idempotency_key):
+        raise NotImplementedError
+
+
+class FakePaymentGateway(PaymentGateway):
+    """Local stand-in with configurable latency (seconds) and success rate."""
+
+    def __init__(self, latency=0.0, success_rate=0.8):
+        self.latency = latency
+        self.success_rate = success_rate
+
+    def charge(self, booking_reference, amount, payment_method, idempotency_key):
+        if self.latency:
+            time.sleep(self.latency)
+        payment_id = f"PAY{uuid.uuid4().hex[:12].upper()}"
+        if random.random() < self.success_rate:
+            return GatewayResult(True, payment_id, f"Payment successful: {payment_id}")
+        return GatewayResult(False, payment_id, f"Payment failed: {payment_id}")
+
+
+def get_gateway(**overrides):
+    gateway_class = import_string(settings.PAYMENT_GATEWAY)
+    return gateway_class(**{**settings.PAYMENT_GATEWAY_OPTIONS, **overrides})
@@ -0,0 +1,226 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from bookings.models import Booking, BookingState, PaymentAttempt, PaymentStatus
+from bookings.services.hold_expiry import hold_expiry
+from bookings.services.payment_gateway import GatewayResult, get_gateway
+from bookings.services.state_machine import BookingStateMachine
+
+logger = logging.getLogger(__name__)
+
+class PaymentService:
+    """Asynchronous payments: record an attempt, charge it off the request path.
+
+    The gateway is called with no transaction open and no rows locked; only
+    the short apply step locks the booking.
+    """
+
+    @staticmethod
+    @transaction.atomic
+    def request_payment(booking_id, payment_method='card'):
+        booking = Booking.objects.select_for_update().get(id=booking_id)
+
+        if booking.state != BookingState.PAYMENT_PENDING:
+            raise ValueError(f"Booking is {booking.state}, payment must be initiated first")
+
+        # A retried request reuses the attempt that is still in flight. A
+        # PENDING one may have been left by a gateway error or a process
+        # that died before charging it, so it is queued again; the claim in
+        # process_attempt stops it being charged twice.
+        attempt = booking.payment_attempts.filter(
+            status__in=[PaymentStatus.PENDING, PaymentStatus.PROCESSING]
+        ).first()
+        if attempt:
+            if attempt.status == PaymentStatus.PENDING and settings.PAYMENT_WORKERS:
+                transaction.on_commit(lambda: payment_pool.submit(attempt.id))
+            return attempt
+
+        attempt = PaymentAttempt.objects.create(booking=booking, payment_method=payment_method)
+        if settings.PAYMENT_WORKERS:
+            transaction.on_commit(lambda: payment_pool.submit(attempt.id))
+        return attempt
+
+    @staticmethod
+    def process_attempt(attempt_id, gateway=None):
+        """Charge one attempt and apply the result. Returns the attempt, or
+        None if another worker already claimed it or its retry is not due."""
+        now = timezone.now()
+        claimed = PaymentAttempt.objects.filter(
+            Q(retry_at__isnull=True) | Q(retry_at__lte=now),
+            id=attempt_id, status=PaymentStatus.PENDING
+        ).update(status=PaymentStatus.PROCESSING, tries=F('tries') + 1, updated_at=now)
+        if not claimed:
+            return None
+
+        attempt = PaymentAttempt.objects.select_related('booking').get(id=attempt_id)
+        try:
+            result = (gateway or get_gateway()).charge(
+                booking_reference=attempt.booking.booking_reference,
+                amount=attempt.booking.amount,
+                payment_method=attempt.payment_method,
+                idempotency_key=f"attempt-{attempt.id}"
+            )
+        except Exception:
+            logger.exception("Payment gateway error for attempt %s (try %d)", attempt.id, attempt.tries)
+            if attempt.tries >= settings.PAYMENT_MAX_TRIES:
+                return PaymentService.apply_result(attempt, GatewayResult(
+                    False, None, f"Payment gateway failed {attempt.tries} times"
+                ))
+            # Leave it for a later retry; the idempotency key makes that safe
+            attempt.status = PaymentStatus.PENDING
+            attempt.retry_at = timezone.now() + timedelta(
+                seconds=settings.PAYMENT_RETRY_BACKOFF * 2 ** (attempt.tries - 1)
+            )
+            attempt.save(update_fields=['status', 'retry_at', 'updated_at'])
+            return attempt
+
+        return PaymentService.apply_result(attempt, result)
+
+    @staticmethod
+    @transaction.atomic
+    def apply_result(attempt, result):
+        attempt.status = PaymentStatus.SUCCEEDED if result.success else PaymentStatus.FAILED
+        attempt.payment_id = result.payment_id
+        attempt.notes = result.message
+        # Write before reading so the transaction takes its write lock up
+        # front (SQLite would otherwise fail upgrading a read lock).
+        attempt.save(update_fields=['status', 'payment_id', 'notes', 'updated_at'])
+
+        booking = Booking.objects.select_for_update().get(id=attempt.booking_id)
+
+        if booking.state != BookingState.PAYMENT_PENDING:
+            # Cancelled or expired while the gateway was working
+            attempt.notes = f"{result.message}; booking was {booking.state}, not applied"
+            attempt.save(update_fields=['notes', 'updated_at'])
+        elif result.success:
+            booking.payment_id = result.payment_id
+            booking.save(update_fields=['payment_id', 'updated_at'])
+            BookingStateMachine.transition(booking, BookingState.CONFIRMED, result.message)
+        else:
+            BookingStateMachine.transition(booking, BookingState.SEAT_HELD, result.message)
+            # Its deadline may have passed while payment was pending
+            transaction.on_commit(
+                lambda: hold_expiry.schedule(booking.id, booking.seat_hold_expires_at)
+            )
+
+        attempt.booking = booking
+        return attempt
+
+    @staticmethod
+    def claimable_attempt_ids(limit=100):
+        """Pending attempts whose retry is due, oldest first; also re-queues
+        attempts stuck in PROCESSING for longer than PAYMENT_CLAIM_TIMEOUT
+        (a dead worker). limit=None returns them all."""
+        now = timezone.now()
+        stale_before = now - timedelta(seconds=settings.PAYMENT_CLAIM_TIMEOUT)
+        PaymentAttempt.objects.filter(
+            status=PaymentStatus.PROCESSING, updated_at__lt=stale_before
+        ).update(status=PaymentStatus.PENDING, updated_at=now)
+
+        # Workers may see the same ids; process_attempt's conditional
+        # claim lets exactly one of them charge each attempt.
+        return list(
+            PaymentAttempt.objects.filter(
+                Q(retry_at__isnull=True) | Q(retry_at__lte=now), status=PaymentStatus.PENDING
+            )
+            .order_by('created_at')
+            .values_list('id', flat=True)[:limit]
+        )
+
+
+class PaymentWorkerPool:
+    """Thread pool that runs PaymentService.process_attempt off the request thread.
+
+    Once started, a sweeper thread also queues every claimable attempt
+    each PAYMENT_SWEEP_INTERVAL seconds: attempts put back to PENDING by a
+    gateway error once their retry is due, and attempts left behind by a
+    process that died before charging them.
+    """
+
+    def __init__(self, workers=None, gateway=None):
+        self.workers = workers
+        self.gateway = gateway
+        self._executor = None
+        self._lock = threading.Lock()
+        # Attempt ids submitted and not yet run, so sweeps do not pile up
+        self._queued = set()
+        self._sweeper = None
+        self._stopping = threading.Event()
+
+    def submit(self, attempt_id):
+        with self._lock:
+            self._queued.add(attempt_id)
+        return self.executor.submit(self._run, attempt_id)
+
+    def sweep(self):
+        """Queue the claimable attempts not already queued; returns their ids."""
+        workers = self.workers or settings.PAYMENT_WORKERS or 1
+        ids = PaymentService.claimable_attempt_ids(limit=workers * 10)
+        with self._lock:
+            ids = [attempt_id for attempt_id in ids if attempt_id not in self._queued]
+        for attempt_id in ids:
+            self.submit(attempt_id)
+        return ids
+
+    def start(self):
+        """Start the sweeper thread."""
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._stopping.clear()
+            self._sweeper = threading.Thread(
+                target=self._sweep_forever, name='payment-sweeper', daemon=True
+            )
+            self._sweeper.start()
+
+    def stop(self):
+        with self._lock:
+            sweeper, self._sweeper = self._sweeper, None
+        self._stopping.set()
+        if sweeper is not None:
+            sweeper.join()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers or settings.PAYMENT_WORKERS or 1,
+                    thread_name_prefix='payment'
+                )
+            return self._executor
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    def _run(self, attempt_id):
+        with self._lock:
+            self._queued.discard(attempt_id)
+        close_old_connections()
+        try:
+            return PaymentService.process_attempt(attempt_id, gateway=self.gateway)
+        except Exception:
+            logger.exception("Payment attempt %s failed", attempt_id)
+        finally:
+            close_old_connections()
+
+    def _sweep_forever(self):
+        while not self._stopping.wait(settings.PAYMENT_SWEEP_INTERVAL):
+            close_old_connections()
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Payment sweep failed")
+            finally:
+                close_old_connections()
+
+
+payment_pool = PaymentWorkerPool()
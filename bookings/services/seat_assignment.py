@@ -0,0 +1,174 @@
+import random
+import threading
+import time
+from django.conf import settings
+from bookings.services.seat_map import seat_map_cache
+
+SEAT_TYPES = ('window', 'aisle', 'middle')
+
+
+class SeatContentionError(Exception):
+    """Every seat tried was taken by other requests, though the flight
+    may still have free seats; the request can be retried."""
+
+
+class SeatAssigner:
+    """Picks free seats server-side for "any seat" and preference requests.
+
+    Candidates come from this process's seat map in preference order:
+    matching seat type and row range, front rows first. Instead of every
+    concurrent request trying the first free seat, each tries a random one
+    of the first SEAT_ASSIGNMENT_SPREAD candidates, skipping seats that
+    another request in this process picked in the last
+    SEAT_ASSIGNMENT_PENDING_TTL seconds. The claim itself is still the
+    conditional UPDATE in BookingService. When every candidate turns out
+    to be taken, BookingService refreshes the map once and tries again.
+    """
+
+    def __init__(self):
+        # seat id -> monotonic time until which another request owns it
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def candidates(self, flight_id, seat_type=None, row_from=None, row_to=None):
+        """Yield (seat id, seat number) pairs to try claiming, best first.
+
+        Stops after SEAT_ASSIGNMENT_ATTEMPTS seats. Raises ValueError if
+        the flight does not exist.
+        """
+        seat_map = self._seat_map(flight_id)
+        matching = self._matching(seat_map, seat_type, row_from, row_to)
+        for _ in range(settings.SEAT_ASSIGNMENT_ATTEMPTS):
+            if not matching:
+                return
+            [ordinal] = self._pick(seat_map, matching, 1, settings.SEAT_ASSIGNMENT_SPREAD)
+            matching.remove(ordinal)
+            yield seat_map.seat_ids[ordinal], seat_map.seat_numbers[ordinal]
+
+    def group_candidates(self, flight_id, count, together=False, seat_type=None,
+                         row_from=None, row_to=None):
+        """Yield lists of count seat numbers to try holding as a group.
+
+        With together, each list is a run of adjacent seats in one row, not
+        split by the aisle.
+        """
+        seat_map = self._seat_map(flight_id)
+        matching = self._matching(seat_map, seat_type, row_from, row_to)
+        if together:
+            blocks = self._blocks(seat_map, matching, count)
+        for _ in range(settings.SEAT_ASSIGNMENT_ATTEMPTS):
+            if together:
+                if not blocks:
+                    return
+                block = self._pick_block(seat_map, blocks)
+                blocks = [b for b in blocks if not set(b) & set(block)]
+                ordinals = block
+            else:
+                if len(matching) < count:
+                    return
+                ordinals = self._pick(
+                    seat_map, matching, count, max(settings.SEAT_ASSIGNMENT_SPREAD, 2 * count)
+                )
+                for ordinal in ordinals:
+                    matching.remove(ordinal)
+            yield [seat_map.seat_numbers[ordinal] for ordinal in ordinals]
+
+    def conflict(self, flight_id, seat_id):
+        """Record that seat_id turned out to be taken (by another process)."""
+        seat_map_cache.mark_seats(flight_id, [seat_id], False)
+
+    def refresh(self, flight_id):
+        """Reload flight_id's seat map after every candidate was taken."""
+        seat_map_cache.verify(flight_id)
+
+    def reset(self):
+        with self._lock:
+            self._pending = {}
+
+    @staticmethod
+    def _seat_map(flight_id):
+        seat_map = seat_map_cache.get(flight_id)
+        if seat_map is None:
+            raise ValueError("Flight not found")
+        return seat_map
+
+    @staticmethod
+    def _matching(seat_map, seat_type, row_from, row_to):
+        unparsed_row = float('inf')
+        matching = []
+        for ordinal, place in enumerate(seat_map.layout):
+            if not seat_map.available[ordinal]:
+                continue
+            if place is None:
+                if seat_type or row_from or row_to:
+                    continue
+                matching.append((unparsed_row, ordinal))
+                continue
+            row, _, position = place
+            if seat_type and position != seat_type:
+                continue
+            if (row_from and row < row_from) or (row_to and row > row_to):
+                continue
+            matching.append((row, ordinal))
+        matching.sort()
+        return [ordinal for _, ordinal in matching]
+
+    @staticmethod
+    def _blocks(seat_map, matching, count):
+        """Runs of count adjacent free seats in one row, front rows first.
+
+        Adjacent means next to each other in the flight's seat letters on the
+        same side of the aisle (FlightSeatMap.sections).
+        """
+        columns = {
+            letter: (section, column)
+            for section, letters in enumerate(seat_map.sections)
+            for column, letter in enumerate(letters)
+        }
+        by_row = {}
+        for ordinal in matching:
+            place = seat_map.layout[ordinal]
+            if place is not None:
+                by_row.setdefault(place[0], []).append(columns[place[1]] + (ordinal,))
+        blocks = []
+        for row in sorted(by_row):
+            seats = sorted(by_row[row])
+            for start in range(len(seats) - count + 1):
+                run = seats[start:start + count]
+                if run[0][0] == run[-1][0] and run[-1][1] - run[0][1] == count - 1:
+                    blocks.append([ordinal for _, _, ordinal in run])
+        return blocks
+
+    def _pick(self, seat_map, matching, count, spread):
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            free = [o for o in matching if self._pending.get(seat_map.seat_ids[o], 0) <= now]
+            pool = (free if len(free) >= count else matching)[:max(spread, count)]
+            picked = random.sample(pool, count)
+            self._reserve(seat_map, picked, now)
+        return picked
+
+    def _pick_block(self, seat_map, blocks):
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            free = [
+                block for block in blocks
+                if all(self._pending.get(seat_map.seat_ids[o], 0) <= now for o in block)
+            ]
+            block = random.choice((free or blocks)[:settings.SEAT_ASSIGNMENT_SPREAD])
+            self._reserve(seat_map, block, now)
+        return block
+
+    def _reserve(self, seat_map, ordinals, now):
+        until = now + settings.SEAT_ASSIGNMENT_PENDING_TTL
+        for ordinal in ordinals:
+            self._pending[seat_map.seat_ids[ordinal]] = until
+
+    def _prune(self, now):
+        if len(self._pending) > 1024:
+            self._pending = {seat_id: until for seat_id, until in self._pending.items() if until > now}
+
+
+seat_assigner = SeatAssigner()
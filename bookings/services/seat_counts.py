@@ -0,0 +1,55 @@
+from django.db import transaction
+from django.db.models import Count, F
+from bookings.models import Flight, Seat
+from bookings.services.flight_cache import flight_catalogue
+
+class SeatCountService:
+    """Detects and repairs drift between Flight.available_seats and the seats table.
+
+    Drift can come from writes that bypass BookingService (raw SQL, bulk
+    loads). Seats saved or deleted one at a time, as the admin does, are
+    counted by the signals in bookings/signals.py.
+    """
+
+    @staticmethod
+    def adjust(flight_id, delta):
+        """Add delta to one flight's counter."""
+        Flight.objects.filter(id=flight_id).update(available_seats=F('available_seats') + delta)
+        transaction.on_commit(lambda: flight_catalogue.invalidate_availability([flight_id]))
+
+    @staticmethod
+    def find_drift(flight_ids=None, chunk_size=1000):
+        """Yield (flight_id, stored, actual) for every flight whose counter is off."""
+        flights = Flight.objects.order_by('id')
+        if flight_ids:
+            flights = flights.filter(id__in=flight_ids)
+
+        last_id = 0
+        while True:
+            stored = dict(
+                flights.filter(id__gt=last_id).values_list('id', 'available_seats')[:chunk_size]
+            )
+            if not stored:
+                return
+            actual = dict(
+                Seat.objects.filter(flight_id__in=stored, is_available=True)
+                .order_by()
+                .values('flight_id')
+                .annotate(n=Count('id'))
+                .values_list('flight_id', 'n')
+            )
+            for flight_id, count in stored.items():
+                if count != actual.get(flight_id, 0):
+                    yield flight_id, count, actual.get(flight_id, 0)
+            last_id = max(stored)
+
+    @staticmethod
+    @transaction.atomic
+    def repair(flight_id):
+        """Recount one flight under its row lock. Returns (old, new)."""
+        flight = Flight.objects.select_for_update().get(id=flight_id)
+        actual = Seat.objects.filter(flight_id=flight_id, is_available=True).count()
+        if actual != flight.available_seats:
+            Flight.objects.filter(id=flight_id).update(available_seats=actual)
+            transaction.on_commit(lambda: flight_catalogue.invalidate_availability([flight_id]))
+        return flight.available_seats, actual
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from django.conf import settings
+
+class SeatSubscription:
+    """One stream's queue of seat changes, owned by the event loop that created it.
+
+    Events are (seat_ids, is_available) tuples. None in the queue means
+    events were dropped because the stream fell behind, and it should
+    resynchronise from the seat map instead.
+    """
+
+    def __init__(self, flight_id):
+        self.flight_id = flight_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=settings.SEAT_STREAM_MAX_PENDING)
+
+    def deliver(self, event):
+        # Runs on self.loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class SeatEventBroadcaster:
+    """Fans committed seat changes out to every stream watching the flight.
+
+    publish() may be called from any thread; each subscription receives
+    the change on its own event loop. Only changes made by this process
+    are seen, so streams also resynchronise from the seat map periodically.
+    """
+
+    def __init__(self):
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, flight_id):
+        """Start receiving changes for flight_id; call from the stream's event loop."""
+        subscription = SeatSubscription(flight_id)
+        with self._lock:
+            self._subscriptions.setdefault(flight_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.flight_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.flight_id]
+
+    def publish(self, flight_id, seat_ids, is_available):
+        subscriptions = self._subscriptions.get(flight_id)
+        if not subscriptions:
+            return
+        with self._lock:
+            subscriptions = list(subscriptions)
+        event = (list(seat_ids), bool(is_available))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The stream's event loop has closed
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self, flight_id=None):
+        with self._lock:
+            if flight_id is not None:
+                return len(self._subscriptions.get(flight_id, ()))
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+seat_events = SeatEventBroadcaster()
@@ -0,0 +1,220 @@
+import base64
+import re
+import threading
+import time
+from django.conf import settings
+from django.utils.functional import cached_property
+from bookings.models import Flight, Seat
+
+SEAT_NUMBER = re.compile(r'(\d+)([A-Z])')
+
+def aisle_sections(letters):
+    """Split a row's letters at the aisle: one down the middle of an even count."""
+    if len(letters) % 2 == 0 and letters:
+        return [letters[:len(letters) // 2], letters[len(letters) // 2:]]
+    return [letters] if letters else []
+
+class FlightSeatMap:
+    """Availability of every seat on one flight, indexed by seat ordinal.
+
+    Seats are ordered by id; `available` holds one byte per seat.
+    """
+
+    def __init__(self, flight_id, seat_ids, seat_numbers, available):
+        self.flight_id = flight_id
+        self.seat_ids = seat_ids
+        self.seat_numbers = seat_numbers
+        self.available = available
+        self.ordinals = {seat_id: i for i, seat_id in enumerate(seat_ids)}
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls, flight_id):
+        rows = list(
+            Seat.objects.filter(flight_id=flight_id)
+            .order_by('id')
+            .values_list('id', 'seat_number', 'is_available')
+        )
+        if not rows and not Flight.objects.filter(id=flight_id).exists():
+            return None
+
+        return cls(
+            flight_id,
+            [seat_id for seat_id, _, _ in rows],
+            [seat_number for _, seat_number, _ in rows],
+            bytearray(is_available for _, _, is_available in rows)
+        )
+
+    def is_stale(self):
+        return time.monotonic() - self.loaded_at > settings.SEAT_MAP_MAX_AGE
+
+    def set_available(self, seat_id, is_available):
+        ordinal = self.ordinals.get(seat_id)
+        if ordinal is None:
+            return False
+        self.available[ordinal] = is_available
+        return True
+
+    @cached_property
+    def layout(self):
+        """(row, letter, position) per ordinal, or None for unparseable seat numbers.
+
+        Assumes one aisle down the middle of the seat letters used on the
+        flight: the outermost letters are window seats, the two either
+        side of the middle are aisle seats and the rest are middle seats.
+        """
+        parsed = [SEAT_NUMBER.fullmatch(seat_number) for seat_number in self.seat_numbers]
+        letters = ''.join(sorted({match.group(2) for match in parsed if match}))
+        positions = {letter: 'middle' for letter in letters}
+        sections = aisle_sections(letters)
+        for left, right in zip(sections, sections[1:]):
+            positions[left[-1]] = positions[right[0]] = 'aisle'
+        if letters:
+            positions[letters[0]] = positions[letters[-1]] = 'window'
+        return [
+            (int(match.group(1)), match.group(2), positions[match.group(2)]) if match else None
+            for match in parsed
+        ]
+
+    @cached_property
+    def sections(self):
+        """The flight's seat letters between aisles, e.g. ['ABC', 'DEF']."""
+        return aisle_sections(''.join(sorted({place[1] for place in self.layout if place})))
+
+    @cached_property
+    def grid(self):
+        """(first row, last row, letters, bit index per ordinal, missing seat numbers).
+
+        The bitmap encoding numbers seats row by row across the letters
+        used on the flight. Seats whose number does not parse have no bit.
+        """
+        places = [place for place in self.layout if place is not None]
+        if not places:
+            return 0, 0, '', [None] * len(self.layout), []
+        first = min(row for row, _, _ in places)
+        last = max(row for row, _, _ in places)
+        letters = ''.join(sorted({letter for _, letter, _ in places}))
+        columns = {letter: i for i, letter in enumerate(letters)}
+        index = [
+            (place[0] - first) * len(letters) + columns[place[1]] if place else None
+            for place in self.layout
+        ]
+        used = set(index)
+        missing = [
+            f"{first + i // len(letters)}{letters[i % len(letters)]}"
+            for i in range((last - first + 1) * len(letters)) if i not in used
+        ]
+        return first, last, letters, index, missing
+
+    def available_count(self):
+        return self.available.count(1)
+
+    def as_list(self):
+        # Same shape as SeatSerializer(many=True)
+        return [
+            {'id': seat_id, 'seat_number': seat_number, 'is_available': bool(flag)}
+            for seat_id, seat_number, flag in zip(self.seat_ids, self.seat_numbers, self.available)
+        ]
+
+    def as_bitmap(self):
+        """The seat map as a grid descriptor plus a base64 availability bitmap.
+
+        Bit i, most significant bit of each byte first, is the seat in row
+        rows[0] + i // len(letters) at letter letters[i % len(letters)] and
+        is set when the seat is available. Grid positions with no seat are
+        listed in missing; seats outside the grid are in other.
+        """
+        first, last, letters, index, missing = self.grid
+        bits = bytearray(((last - first + 1) * len(letters) + 7) // 8 if letters else 0)
+        other = {}
+        for ordinal, i in enumerate(index):
+            if i is None:
+                other[self.seat_numbers[ordinal]] = bool(self.available[ordinal])
+            elif self.available[ordinal]:
+                bits[i >> 3] |= 0x80 >> (i & 7)
+        return {
+            'encoding': 'bitmap',
+            'rows': [first, last],
+            'letters': letters,
+            'available': base64.b64encode(bits).decode(),
+            'missing': missing,
+            'other': other,
+        }
+
+
+class SeatMapCache:
+    """Process-local seat maps, updated incrementally by BookingService.
+
+    Other processes write to the same seats table, so maps are reloaded
+    (and checked against the table) once they are SEAT_MAP_MAX_AGE old.
+    """
+
+    def __init__(self):
+        self._maps = {}
+        self._lock = threading.Lock()
+        self.drift_count = 0
+
+    def get(self, flight_id):
+        seat_map = self._maps.get(flight_id)
+        if seat_map is not None and not seat_map.is_stale():
+            return seat_map
+
+        fresh = FlightSeatMap.load(flight_id)
+        if seat_map is not None and fresh is not None:
+            self.drift_count += len(self._diff(seat_map, fresh))
+
+        with self._lock:
+            if fresh is None:
+                self._maps.pop(flight_id, None)
+            else:
+                self._maps[flight_id] = fresh
+        return fresh
+
+    def mark_seats(self, flight_id, seat_ids, is_available):
+        seat_map = self._maps.get(flight_id)
+        if seat_map is None:
+            return
+        for seat_id in seat_ids:
+            if not seat_map.set_available(seat_id, is_available):
+                # Seat added after the map was built
+                self.invalidate(flight_id)
+                return
+
+    def invalidate(self, flight_id=None):
+        with self._lock:
+            if flight_id is None:
+                self._maps.clear()
+            else:
+                self._maps.pop(flight_id, None)
+
+    def verify(self, flight_id):
+        """Compare the cached map with the seats table and repair it.
+
+        Returns the seat numbers whose cached availability was wrong.
+        """
+        seat_map = self._maps.get(flight_id)
+        fresh = FlightSeatMap.load(flight_id)
+        with self._lock:
+            if fresh is None:
+                self._maps.pop(flight_id, None)
+            else:
+                self._maps[flight_id] = fresh
+        if seat_map is None or fresh is None:
+            return []
+
+        mismatches = self._diff(seat_map, fresh)
+        self.drift_count += len(mismatches)
+        return mismatches
+
+    @staticmethod
+    def _diff(cached, fresh):
+        if cached.seat_ids != fresh.seat_ids:
+            return list(set(cached.seat_numbers) ^ set(fresh.seat_numbers))
+        return [
+            seat_number
+            for seat_number, old, new in zip(fresh.seat_numbers, cached.available, fresh.available)
+            if old != new
+        ]
+
+
+seat_map_cache = SeatMapCache()
@@ -1,5 +1,7 @@
 from django.db import transaction
+from django.utils import timezone
 from bookings.models import Booking, BookingState, BookingStateTransition
+from bookings.services.transition_log import transition_log
 
 class InvalidStateTransitionError(Exception):
     pass
@@ -33,12 +35,135 @@ class BookingStateMachine:
         booking.state = to_state
         booking.save(update_fields=['state', 'updated_at'])
         
-        # Record transition
-        BookingStateTransition.objects.create(
-            booking=booking,
-            from_state=from_state,
-            to_state=to_state,
-            notes=notes
+        # Record transition (see TransitionLog for when the row is written)
+        transition_log.record([
+            BookingStateTransition(
+                booking=booking,
+                from_state=from_state,
+                to_state=to_state,
+                notes=notes
+            )
+        ])
+        
+        return booking
+    
+    @classmethod
+    def _plan(cls, from_state, steps):
+        """Validate a chain of (to_state, notes) steps starting at from_state."""
+        plan = []
+        for to_state, notes in steps:
+            if not cls.can_transition(from_state, to_state):
+                raise InvalidStateTransitionError(
+                    f"Invalid transition from {from_state} to {to_state}"
+                )
+            plan.append((from_state, to_state, notes))
+            from_state = to_state
+        return plan
+    
+    @classmethod
+    @transaction.atomic
+    def transition_path(cls, booking, steps):
+        """Apply several transitions in order with a single booking write.
+        
+        steps is a list of (to_state, notes). Every step is validated before
+        anything is written; the transition rows go in with one bulk INSERT.
+        An unsaved booking is inserted directly in its final state.
+        """
+        plan = cls._plan(booking.state, steps)
+        
+        booking.state = plan[-1][1]
+        if booking.pk is None:
+            booking.save()
+        else:
+            booking.save(update_fields=['state', 'updated_at'])
+        
+        transition_log.record([
+            BookingStateTransition(
+                booking=booking,
+                from_state=from_state,
+                to_state=to_state,
+                notes=notes
+            )
+            for from_state, to_state, notes in plan
+        ])
+        
+        return booking
+    
+    @classmethod
+    def create_with_path(cls, bookings, steps):
+        """Insert unsaved bookings already moved along steps.
+        
+        All bookings must start in the same state. notes in steps may be a
+        callable taking the booking. Uses one bulk INSERT per table.
+        """
+        if not bookings:
+            return bookings
+        plan = cls._plan(bookings[0].state, steps)
+        if any(booking.state != bookings[0].state for booking in bookings):
+            raise InvalidStateTransitionError("Bookings must start in the same state")
+        
+        for booking in bookings:
+            booking.state = plan[-1][1]
+        Booking.objects.bulk_create(bookings)
+        
+        if any(booking.pk is None for booking in bookings):
+            # Backends that cannot return ids from a bulk insert
+            ids = dict(
+                Booking.objects.filter(
+                    booking_reference__in=[b.booking_reference for b in bookings]
+                ).values_list('booking_reference', 'id')
+            )
+            for booking in bookings:
+                booking.pk = ids[booking.booking_reference]
+        
+        transition_log.record([
+            BookingStateTransition(
+                booking=booking,
+                from_state=from_state,
+                to_state=to_state,
+                notes=notes(booking) if callable(notes) else notes
+            )
+            for booking in bookings
+            for from_state, to_state, notes in plan
+        ])
+        
+        return bookings
+    
+    @classmethod
+    def bulk_transition(cls, booking_ids, from_state, to_state, notes=''):
+        """Move many bookings that are known to be in from_state to to_state.
+        
+        Callers must hold the rows (e.g. select_for_update) so their state
+        cannot change underneath; if some are no longer in from_state this
+        raises, and the caller's transaction rolls back the UPDATE. Uses one
+        UPDATE and one bulk INSERT.
+        """
+        if not cls.can_transition(from_state, to_state):
+            raise InvalidStateTransitionError(
+                f"Invalid transition from {from_state} to {to_state}"
+            )
+        
+        booking_ids = list(booking_ids)
+        if not booking_ids:
+            return 0
+        
+        updated = Booking.objects.filter(id__in=booking_ids, state=from_state).update(
+            state=to_state,
+            updated_at=timezone.now()
         )
+        if updated != len(booking_ids):
+            raise InvalidStateTransitionError(
+                f"{len(booking_ids) - updated} of {len(booking_ids)} bookings are no longer {from_state}"
+            )
+        
+        transition_log.record([
+            BookingStateTransition(
+                booking_id=booking_id,
+                from_state=from_state,
+                to_state=to_state,
+                notes=notes
+            )
+            for booking_id in booking_ids
+        ])
         
-        return booking
\ No newline at end of file
+        return updated
\ No newline at end of file
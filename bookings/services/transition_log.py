@@ -0,0 +1,153 @@
+import atexit
+import logging
+import threading
+import weakref
+from collections import deque
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from bookings.models import BookingStateTransition
+
+logger = logging.getLogger(__name__)
+
+class _CommitBatch:
+    """Transitions from one record() call, inserted after the commit.
+
+    Each batch is its own on_commit callback, so a rollback discards the
+    batches of the savepoint or transaction it undoes along with their
+    callbacks. A transaction's batches run back to back once it commits;
+    the last one to run inserts the rows of all of them.
+    """
+
+    def __init__(self, log, records):
+        self.log = log
+        self.records = records
+
+    def __call__(self):
+        self.log._batch_committed(self)
+
+
+class TransitionLog:
+    """Write path for BookingStateTransition audit rows.
+
+    TRANSITION_AUDIT_DURABILITY selects how far the audit row may lag the
+    state change it describes:
+
+    - 'sync': inserted inside the booking's transaction (never lags)
+    - 'commit': one bulk INSERT per transaction, right after it commits;
+      rows are lost if the process dies in between
+    - 'background': queued after commit and bulk inserted by a flusher
+      thread every TRANSITION_FLUSH_INTERVAL seconds; rows still queued
+      when the process dies are lost. With an interval of 0 no thread is
+      started and rows wait for flush()
+    """
+
+    def __init__(self):
+        # Per thread: the batches registered and not yet run, and the rows
+        # of those that have run
+        self._batches = threading.local()
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._flusher = None
+        self._lock = threading.Lock()
+
+    @property
+    def mode(self):
+        return settings.TRANSITION_AUDIT_DURABILITY
+
+    def record(self, records):
+        """Persist records according to the durability mode."""
+        records = list(records)
+        if not records:
+            return
+        if self.mode == 'sync':
+            self.write(records)
+        elif self.mode == 'commit':
+            if connection.in_atomic_block:
+                batch = _CommitBatch(self, records)
+                self._pending_batches().add(batch)
+                transaction.on_commit(batch)
+            else:
+                self.write(records)
+        elif self.mode == 'background':
+            transaction.on_commit(lambda: self._enqueue(records))
+        else:
+            raise ValueError(f"Unknown TRANSITION_AUDIT_DURABILITY {self.mode}")
+
+    def write(self, records):
+        if len(records) == 1:
+            records[0].save(force_insert=True)
+        else:
+            BookingStateTransition.objects.bulk_create(records)
+
+    def flush(self):
+        """Insert everything queued in background mode. Returns rows written."""
+        written = 0
+        while True:
+            with self._lock:
+                batch = [
+                    self._queue.popleft()
+                    for _ in range(min(len(self._queue), settings.TRANSITION_FLUSH_BATCH_SIZE))
+                ]
+            if not batch:
+                return written
+            try:
+                BookingStateTransition.objects.bulk_create(batch)
+            except Exception:
+                with self._lock:
+                    self._queue.extendleft(reversed(batch))
+                raise
+            written += len(batch)
+
+    def pending(self):
+        return len(self._queue)
+
+    def _pending_batches(self):
+        # Weak, so a batch whose callback a rollback discarded drops out
+        pending = getattr(self._batches, 'pending', None)
+        if pending is None:
+            pending = self._batches.pending = weakref.WeakSet()
+            self._batches.committed = []
+        return pending
+
+    def _batch_committed(self, batch):
+        pending = self._pending_batches()
+        pending.discard(batch)
+        self._batches.committed.extend(batch.records)
+        if not pending:
+            records, self._batches.committed = self._batches.committed, []
+            self.write(records)
+
+    def _enqueue(self, records):
+        with self._lock:
+            self._queue.extend(records)
+            if not settings.TRANSITION_FLUSH_INTERVAL:
+                return
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(
+                    target=self._flush_forever, name='transition-flusher', daemon=True
+                )
+                self._flusher.start()
+        if len(self._queue) >= settings.TRANSITION_FLUSH_BATCH_SIZE:
+            self._wakeup.set()
+
+    def _flush_forever(self):
+        while True:
+            self._wakeup.wait(settings.TRANSITION_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush %s transition rows; will retry", self.pending())
+
+
+transition_log = TransitionLog()
+
+
+@atexit.register
+def _flush_on_exit():
+    if transition_log.pending():
+        try:
+            transition_log.flush()
+        except Exception:
+            logger.exception("Lost %s transition rows at exit", transition_log.pending())
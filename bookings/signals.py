@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from bookings.models import Flight, Seat
+from bookings.services.flight_cache import flight_catalogue
+from bookings.services.seat_counts import SeatCountService
+from bookings.services.seat_map import seat_map_cache
+
+@receiver([post_save, post_delete], sender=Seat)
+def invalidate_seat_map(sender, instance, **kwargs):
+    seat_map_cache.invalidate(instance.flight_id)
+
+@receiver(post_save, sender=Seat)
+def count_saved_seat(sender, instance, created, raw=False, **kwargs):
+    # Fixtures carry their own counts
+    if raw:
+        return
+    if created:
+        if instance.is_available:
+            SeatCountService.adjust(instance.flight_id, 1)
+    else:
+        # The previous is_available is not known here
+        SeatCountService.repair(instance.flight_id)
+
+@receiver(post_delete, sender=Seat)
+def count_deleted_seat(sender, instance, origin=None, **kwargs):
+    # Nothing to count when the whole flight is being deleted
+    if instance.is_available and not isinstance(origin, Flight):
+        SeatCountService.adjust(instance.flight_id, -1)
+
+@receiver([post_save, post_delete], sender=Flight)
+def invalidate_flight_catalogue(sender, instance, **kwargs):
+    flight_catalogue.invalidate()
@@ -1,3 +1,1653 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connection, connections, transaction
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.renderers import JSONRenderer
+
+from airline_booking.db_backends.sqlite3.base import DatabaseWrapper as SQLiteWrapper
+from bookings import async_views
+from bookings.loadtest import Stats, classify
+from bookings.renderers import FastJSONParser, FastJSONRenderer
+from bookings.serializers import (
+    BookingSerializer, BookingValuesSerializer, FlightSerializer, FlightValuesSerializer
+)
+from bookings.models import (
+    ArchivedBooking, Booking, BookingState, BookingStateTransition, Flight, IdempotencyRecord,
+    PaymentAttempt, PaymentStatus, Seat
+)
+from bookings.services.archive_service import ArchiveService
+from bookings.services.booking_references import booking_references
+from bookings.services.booking_service import BookingService
+from bookings.services.flight_cache import flight_catalogue
+from bookings.services.hold_expiry import HoldExpiryScheduler, hold_expiry
+from bookings.services.payment_gateway import FakePaymentGateway
+from bookings.services.payment_service import PaymentService, PaymentWorkerPool
+from bookings.services.seat_assignment import seat_assigner
+from bookings.services.seat_events import seat_events
+from bookings.services.seat_map import seat_map_cache
+from bookings.services.state_machine import BookingStateMachine, InvalidStateTransitionError
+from bookings.services.transition_log import transition_log
+
+
+def make_flight(flight_number='TS100', rows=5, letters='ABCDEF', **kwargs):
+    flight = Flight.objects.create(
+        flight_number=flight_number,
+        origin=kwargs.pop('origin', 'Delhi'),
+        destination=kwargs.pop('destination', 'Mumbai'),
+        departure_time=kwargs.pop('departure_time', timezone.now() + timedelta(days=7)),
+        total_seats=rows * len(letters),
+        available_seats=rows * len(letters),
+        price=kwargs.pop('price', Decimal('5500.00')),
+        **kwargs
+    )
+    Seat.objects.bulk_create([
+        Seat(flight=flight, seat_number=f"{row}{letter}")
+        for row in range(1, rows + 1)
+        for letter in letters
+    ])
+    return flight
+
+
+def statement_count(context):
+    # Savepoints depend on how deeply the test nests atomic blocks
+    return sum(
+        1 for query in context.captured_queries
+        if 'SAVEPOINT' not in query['sql']
+    )
+
+
+def run_in_threads(target, args_list):
+    barrier = threading.Barrier(len(args_list))
+    results = [None] * len(args_list)
+
+    def worker(index, args):
+        barrier.wait()
+        try:
+            results[index] = target(*args)
+        except Exception as e:
+            results[index] = e
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=worker, args=(i, args))
+        for i, args in enumerate(args_list)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class HoldSeatTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        self.booking = BookingService.create_booking(
+            self.flight.id, '1A', 'Test Passenger', 'test@example.com'
+        )
+
+    def test_hold_seat_claims_seat(self):
+        booking = BookingService.hold_seat(self.booking.id, '1A')
+
+        self.assertEqual(booking.state, BookingState.SEAT_HELD)
+        self.assertFalse(Seat.objects.get(id=booking.seat_id).is_available)
+
+    def test_hold_unavailable_seat_fails(self):
+        Seat.objects.filter(flight=self.flight, seat_number='1A').update(is_available=False)
+
+        with self.assertRaises(ValueError):
+            BookingService.hold_seat(self.booking.id, '1A')
+        self.assertEqual(Booking.objects.get(id=self.booking.id).state, BookingState.INITIATED)
+
+    def test_release_seat_on_cancel(self):
+        booking = BookingService.hold_seat(self.booking.id, '1A')
+        Booking.objects.filter(id=booking.id).update(state=BookingState.CONFIRMED)
+
+        BookingService.cancel_booking(booking.id)
+
+        self.assertTrue(Seat.objects.get(id=booking.seat_id).is_available)
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        seat_map_cache.invalidate()
+        self.flight = make_flight()
+        self.payload = {
+            'flight_id': self.flight.id,
+            'seat_number': '3C',
+            'passenger_name': 'Test Passenger',
+            'passenger_email': 'test@example.com',
+        }
+
+    def test_checkout_reaches_payment_pending_in_one_pass(self):
+        with CaptureQueriesContext(connection) as context:
+            booking = BookingService.checkout(**self.payload)
+
+        # flight, seat lookup, seat claim, seat counter, booking insert, transitions insert
+        self.assertEqual(statement_count(context), 6)
+        self.assertEqual(booking.state, BookingState.PAYMENT_PENDING)
+        self.assertEqual(
+            list(booking.transitions.values_list('from_state', 'to_state')),
+            [
+                (BookingState.INITIATED, BookingState.SEAT_HELD),
+                (BookingState.SEAT_HELD, BookingState.PAYMENT_PENDING),
+            ]
+        )
+        self.assertFalse(Seat.objects.get(id=booking.seat_id).is_available)
+
+    def checkout_and_pay(self):
+        data = self.client.post(reverse('booking-checkout'), self.payload, content_type='application/json').json()
+        return BookingService.process_payment(data['results']['id'])
+
+    @override_settings(PAYMENT_GATEWAY_OPTIONS={'success_rate': 1.0})
+    def test_checkout_then_successful_payment(self):
+        booking, success = self.checkout_and_pay()
+
+        self.assertTrue(success)
+        self.assertEqual(Booking.objects.get(id=booking.id).state, BookingState.CONFIRMED)
+        self.assertTrue(booking.payment_id)
+
+    @override_settings(PAYMENT_GATEWAY_OPTIONS={'success_rate': 0.0})
+    def test_checkout_then_failed_payment(self):
+        booking, success = self.checkout_and_pay()
+
+        self.assertFalse(success)
+        booking = Booking.objects.get(id=booking.id)
+        self.assertEqual(booking.state, BookingState.SEAT_HELD)
+        self.assertIsNone(booking.payment_id)
+        self.assertFalse(Seat.objects.get(id=booking.seat_id).is_available)
+
+    def test_unavailable_seat_creates_nothing(self):
+        BookingService.checkout(**self.payload)
+
+        data = self.client.post(reverse('booking-checkout'), self.payload, content_type='application/json').json()
+
+        self.assertEqual(data['resultCode'], '0')
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class GroupBookingTests(TestCase):
+    def setUp(self):
+        seat_map_cache.invalidate()
+        self.flight = make_flight()
+        self.url = reverse('booking-group')
+
+    def passengers(self, *seat_numbers):
+        return [
+            {'seat_number': n, 'passenger_name': f'Passenger {n}', 'passenger_email': f'{n}@example.com'}
+            for n in seat_numbers
+        ]
+
+    def test_group_holds_every_seat(self):
+        data = self.client.post(self.url, {
+            'flight_id': self.flight.id,
+            'passengers': self.passengers('4A', '4B', '4C'),
+        }, content_type='application/json').json()
+
+        self.assertEqual(data['resultCode'], '1')
+        self.assertEqual([b['seat_details']['seat_number'] for b in data['results']], ['4A', '4B', '4C'])
+        self.assertEqual({b['state'] for b in data['results']}, {BookingState.SEAT_HELD})
+        self.assertEqual(BookingStateTransition.objects.count(), 3)
+        self.assertEqual(Seat.objects.filter(flight=self.flight, is_available=False).count(), 3)
+
+    def test_group_fails_as_a_whole(self):
+        Seat.objects.filter(flight=self.flight, seat_number='4B').update(is_available=False)
+
+        with self.assertRaises(ValueError):
+            BookingService.create_group_booking(self.flight.id, self.passengers('4A', '4B', '4C'))
+
+        self.assertEqual(Booking.objects.count(), 0)
+        self.assertEqual(Seat.objects.filter(flight=self.flight, is_available=False).count(), 1)
+
+    def test_group_size_is_bounded(self):
+        response = self.client.post(self.url, {
+            'flight_id': self.flight.id,
+            'passengers': self.passengers(*[f'{row}A' for row in range(1, 6)] + [f'{row}B' for row in range(1, 6)]),
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PAYMENT_WORKERS=0)
+class PaymentServiceTests(TestCase):
+    def setUp(self):
+        seat_map_cache.invalidate()
+        self.flight = make_flight()
+        self.booking = BookingService.checkout(self.flight.id, '2B', 'Test', 'test@example.com')
+
+    def test_request_returns_pending_attempt_without_charging(self):
+        response = self.client.post(
+            reverse('booking-pay', args=[self.booking.id]), {'payment_method': 'upi'},
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['results']['status'], PaymentStatus.PENDING)
+        self.assertEqual(Booking.objects.get(id=self.booking.id).state, BookingState.PAYMENT_PENDING)
+
+    def test_retried_request_reuses_attempt(self):
+        first = PaymentService.request_payment(self.booking.id)
+        second = PaymentService.request_payment(self.booking.id)
+
+        self.assertEqual(first.id, second.id)
+
+    def test_successful_charge_confirms_booking(self):
+        attempt = PaymentService.request_payment(self.booking.id)
+
+        attempt = PaymentService.process_attempt(attempt.id, gateway=FakePaymentGateway(success_rate=1))
+
+        self.assertEqual(attempt.status, PaymentStatus.SUCCEEDED)
+        booking = Booking.objects.get(id=self.booking.id)
+        self.assertEqual(booking.state, BookingState.CONFIRMED)
+        self.assertEqual(booking.payment_id, attempt.payment_id)
+
+    def test_failed_charge_returns_to_seat_held(self):
+        attempt = PaymentService.request_payment(self.booking.id)
+
+        PaymentService.process_attempt(attempt.id, gateway=FakePaymentGateway(success_rate=0))
+
+        self.assertEqual(Booking.objects.get(id=self.booking.id).state, BookingState.SEAT_HELD)
+
+    @override_settings(PAYMENT_WORKERS=2, PAYMENT_RETRY_BACKOFF=0)
+    def test_gateway_error_is_retried(self):
+        class FlakyGateway(FakePaymentGateway):
+            calls = 0
+
+            def charge(self, *args, **kwargs):
+                FlakyGateway.calls += 1
+                if FlakyGateway.calls == 1:
+                    raise ConnectionError("gateway timed out")
+                return super().charge(*args, **kwargs)
+
+        gateway = FlakyGateway(success_rate=1)
+        with mock.patch('bookings.services.payment_service.payment_pool') as pool:
+            with self.captureOnCommitCallbacks(execute=True):
+                attempt = PaymentService.request_payment(self.booking.id)
+            with self.assertLogs('bookings.services.payment_service', 'ERROR'):
+                PaymentService.process_attempt(attempt.id, gateway=gateway)
+            self.assertEqual(PaymentAttempt.objects.get(id=attempt.id).status, PaymentStatus.PENDING)
+
+            # The client's retry queues the same attempt again
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(PaymentService.request_payment(self.booking.id).id, attempt.id)
+            self.assertEqual(pool.submit.call_count, 2)
+
+        # And so does the sweeper
+        sweeper = PaymentWorkerPool(gateway=gateway)
+        with mock.patch.object(sweeper, 'submit') as submit:
+            self.assertEqual(sweeper.sweep(), [attempt.id])
+        submit.assert_called_once_with(attempt.id)
+
+        attempt = PaymentService.process_attempt(attempt.id, gateway=gateway)
+        self.assertEqual(attempt.status, PaymentStatus.SUCCEEDED)
+        self.assertEqual(Booking.objects.get(id=self.booking.id).state, BookingState.CONFIRMED)
+
+    @override_settings(PAYMENT_MAX_TRIES=2, PAYMENT_RETRY_BACKOFF=60)
+    def test_gateway_errors_back_off_then_fail_the_attempt(self):
+        class DownGateway(FakePaymentGateway):
+            def charge(self, *args, **kwargs):
+                raise ConnectionError("gateway down")
+
+        attempt = PaymentService.request_payment(self.booking.id)
+        with self.assertLogs('bookings.services.payment_service', 'ERROR'):
+            PaymentService.process_attempt(attempt.id, gateway=DownGateway())
+
+        # Not due again for a minute
+        self.assertEqual(PaymentService.claimable_attempt_ids(), [])
+        self.assertIsNone(PaymentService.process_attempt(attempt.id, gateway=DownGateway()))
+
+        PaymentAttempt.objects.filter(id=attempt.id).update(retry_at=timezone.now())
+        with self.assertLogs('bookings.services.payment_service', 'ERROR'):
+            attempt = PaymentService.process_attempt(attempt.id, gateway=DownGateway())
+
+        self.assertEqual(attempt.status, PaymentStatus.FAILED)
+        self.assertEqual(PaymentAttempt.objects.get(id=attempt.id).tries, 2)
+        self.assertEqual(Booking.objects.get(id=self.booking.id).state, BookingState.SEAT_HELD)
+        self.assertEqual(PaymentService.claimable_attempt_ids(), [])
+
+    def test_attempt_is_charged_once(self):
+        attempt = PaymentService.request_payment(self.booking.id)
+        PaymentService.process_attempt(attempt.id, gateway=FakePaymentGateway(success_rate=1))
+
+        self.assertIsNone(PaymentService.process_attempt(attempt.id))
+
+
+class PaymentWorkerCommandTests(TransactionTestCase):
+    # Committed data: the worker pool charges on its own threads
+    def setUp(self):
+        seat_map_cache.invalidate()
+        self.flight = make_flight()
+        self.booking = BookingService.checkout(self.flight.id, '2B', 'Test', 'test@example.com')
+
+    @override_settings(PAYMENT_WORKERS=0, PAYMENT_RETRY_BACKOFF=0)
+    def test_drain_stops_when_the_gateway_keeps_failing(self):
+        attempt = PaymentService.request_payment(self.booking.id)
+        out = StringIO()
+
+        with mock.patch.object(FakePaymentGateway, 'charge', side_effect=ConnectionError("down")):
+            with self.assertLogs('bookings.services.payment_service', 'ERROR'):
+                call_command('payment_worker', '--once', '--workers', '1', stdout=out)
+
+        self.assertIn('Processed 1 payment attempts', out.getvalue())
+        self.assertIn('1 left for a retry', out.getvalue())
+        self.assertEqual(PaymentAttempt.objects.get(id=attempt.id).status, PaymentStatus.PENDING)
+
+
+class ExpireHeldBookingsTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        self.held = []
+        for i, seat_number in enumerate(['1A', '1B', '1C', '2A']):
+            booking = BookingService.create_booking(
+                self.flight.id, seat_number, f'Passenger {i}', f'p{i}@example.com'
+            )
+            self.held.append(BookingService.hold_seat(booking.id, seat_number))
+        Booking.objects.filter(id__in=[b.id for b in self.held[:3]]).update(
+            seat_hold_expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+    def test_expires_due_holds_in_one_batch(self):
+        with CaptureQueriesContext(connection) as context:
+            count = BookingService.expire_held_bookings(batch_size=10)
+
+        self.assertEqual(count, 3)
+        # select, release seats, seat counters, bookings, transitions
+        self.assertEqual(statement_count(context), 5)
+        self.assertEqual(
+            set(Booking.objects.filter(state=BookingState.EXPIRED).values_list('id', flat=True)),
+            {b.id for b in self.held[:3]}
+        )
+        self.assertEqual(
+            Seat.objects.filter(flight=self.flight, is_available=False).count(), 1
+        )
+        self.assertEqual(
+            BookingStateTransition.objects.filter(to_state=BookingState.EXPIRED).count(), 3
+        )
+
+    def test_bulk_transition_refuses_rows_that_moved(self):
+        BookingService.initiate_payment(self.held[3].id)
+        transitions = BookingStateTransition.objects.count()
+
+        with self.assertRaises(InvalidStateTransitionError):
+            with transaction.atomic():
+                BookingStateMachine.bulk_transition(
+                    [self.held[0].id, self.held[3].id], BookingState.SEAT_HELD, BookingState.EXPIRED
+                )
+
+        self.assertFalse(Booking.objects.filter(state=BookingState.EXPIRED).exists())
+        self.assertEqual(BookingStateTransition.objects.count(), transitions)
+
+    def test_batches_are_bounded(self):
+        self.assertEqual(BookingService.expire_held_bookings(batch_size=2), 2)
+        self.assertEqual(BookingService.expire_held_bookings(batch_size=2), 1)
+        self.assertEqual(BookingService.expire_held_bookings(batch_size=2), 0)
+
+
+class HoldExpirySchedulerTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        self.scheduler = HoldExpiryScheduler(batch_size=10)
+
+    def held_booking(self, seat_number, expires_in):
+        booking = BookingService.create_booking(
+            self.flight.id, seat_number, 'Test Passenger', 'test@example.com'
+        )
+        booking = BookingService.hold_seat(booking.id, seat_number)
+        Booking.objects.filter(id=booking.id).update(
+            seat_hold_expires_at=timezone.now() + expires_in
+        )
+        return booking
+
+    def test_loads_held_bookings_and_expires_only_due_ones(self):
+        due = self.held_booking('1A', timedelta(minutes=-1))
+        later = self.held_booking('1B', timedelta(minutes=5))
+
+        self.assertEqual(self.scheduler.load(), 2)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.scheduler.run_pending(), 1)
+
+        # select by id, release seats, seat counters, bookings, transitions
+        self.assertEqual(statement_count(context), 5)
+        self.assertEqual(Booking.objects.get(id=due.id).state, BookingState.EXPIRED)
+        self.assertTrue(Seat.objects.get(id=due.seat_id).is_available)
+        self.assertEqual(Booking.objects.get(id=later.id).state, BookingState.SEAT_HELD)
+        self.assertEqual(self.scheduler.pending(), 1)
+
+    def test_bookings_that_moved_on_are_left_alone(self):
+        booking = self.held_booking('1A', timedelta(minutes=-1))
+        self.scheduler.load()
+        Booking.objects.filter(id=booking.id).update(state=BookingState.CONFIRMED)
+
+        self.assertEqual(self.scheduler.run_pending(), 0)
+        self.assertEqual(Booking.objects.get(id=booking.id).state, BookingState.CONFIRMED)
+
+    def test_hold_seat_and_failed_payment_feed_the_scheduler(self):
+        hold_expiry.load()
+        self.addCleanup(hold_expiry.reset)
+        booking = BookingService.create_booking(
+            self.flight.id, '1A', 'Test Passenger', 'test@example.com'
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.hold_seat(booking.id, '1A')
+        self.assertEqual(hold_expiry.pending(), 1)
+        self.assertEqual(hold_expiry.run_pending(), 0)
+
+        BookingService.initiate_payment(booking.id)
+        attempt = PaymentService.request_payment(booking.id)
+        Booking.objects.filter(id=booking.id).update(
+            seat_hold_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        hold_expiry.reset()
+        hold_expiry.load()
+        self.assertEqual(hold_expiry.pending(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            PaymentService.process_attempt(attempt.id, gateway=FakePaymentGateway(success_rate=0))
+
+        self.assertEqual(hold_expiry.run_pending(), 1)
+        self.assertEqual(Booking.objects.get(id=booking.id).state, BookingState.EXPIRED)
+
+    def test_schedule_is_ignored_until_loaded(self):
+        self.scheduler.schedule(1, timezone.now())
+
+        self.assertEqual(self.scheduler.pending(), 0)
+
+
+class TransitionLogTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        self.booking = BookingService.create_booking(
+            self.flight.id, '1A', 'Test Passenger', 'test@example.com'
+        )
+
+    @override_settings(TRANSITION_AUDIT_DURABILITY='commit')
+    def test_commit_mode_writes_one_batch_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                BookingStateMachine.transition(self.booking, BookingState.SEAT_HELD)
+                BookingStateMachine.transition(self.booking, BookingState.PAYMENT_PENDING)
+
+        self.assertFalse(self.booking.transitions.exists())
+        self.assertEqual(len(callbacks), 2)
+        with CaptureQueriesContext(connection) as context:
+            for callback in callbacks:
+                callback()
+        self.assertEqual(statement_count(context), 1)
+        self.assertEqual(self.booking.transitions.count(), 2)
+
+    @override_settings(TRANSITION_AUDIT_DURABILITY='commit')
+    def test_commit_mode_drops_rows_of_rolled_back_savepoint(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                BookingStateMachine.transition(self.booking, BookingState.SEAT_HELD)
+                try:
+                    with transaction.atomic():
+                        BookingStateMachine.transition(self.booking, BookingState.PAYMENT_PENDING)
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+
+        self.assertEqual(
+            list(self.booking.transitions.values_list('to_state', flat=True)),
+            [BookingState.SEAT_HELD]
+        )
+
+    @override_settings(TRANSITION_AUDIT_DURABILITY='commit')
+    def test_commit_mode_after_a_rolled_back_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    BookingStateMachine.transition(self.booking, BookingState.SEAT_HELD)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.booking.refresh_from_db()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                BookingStateMachine.transition(self.booking, BookingState.SEAT_HELD)
+
+        self.assertEqual(
+            list(self.booking.transitions.values_list('to_state', flat=True)),
+            [BookingState.SEAT_HELD]
+        )
+
+    @override_settings(TRANSITION_AUDIT_DURABILITY='background', TRANSITION_FLUSH_INTERVAL=0)
+    def test_background_mode_queues_until_flushed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.hold_seat(self.booking.id, '1A')
+            BookingService.initiate_payment(self.booking.id)
+
+        self.assertFalse(self.booking.transitions.exists())
+        self.assertEqual(transition_log.pending(), 2)
+        self.assertEqual(transition_log.flush(), 2)
+        self.assertEqual(transition_log.pending(), 0)
+        self.assertEqual(
+            list(self.booking.transitions.order_by('id').values_list('to_state', flat=True)),
+            [BookingState.SEAT_HELD, BookingState.PAYMENT_PENDING]
+        )
+
+
+class FlightCatalogueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.flight = make_flight()
+        self.list_url = reverse('flight-list')
+        self.detail_url = reverse('flight-detail', args=[self.flight.id])
+
+    def test_repeat_reads_are_served_from_cache(self):
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+        hits = flight_catalogue.hits
+
+        with self.assertNumQueries(0):
+            flights = self.client.get(self.list_url).json()['results']
+            detail = self.client.get(self.detail_url).json()['results']
+
+        self.assertEqual(flight_catalogue.hits, hits + 2)
+        self.assertEqual(flights[0]['flight_number'], 'TS100')
+        self.assertEqual(detail['id'], self.flight.id)
+
+    def test_save_invalidates(self):
+        self.client.get(self.detail_url)
+
+        self.flight.price = Decimal('999.00')
+        self.flight.save()
+
+        self.assertEqual(self.client.get(self.detail_url).json()['results']['price'], '999.00')
+
+    def test_hold_patches_cached_availability(self):
+        other = make_flight('TS101', rows=1)
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+        booking = BookingService.create_booking(self.flight.id, '', 'Test', 'test@example.com')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.hold_seat(booking.id, '1A')
+        with self.assertNumQueries(0):
+            flights = self.client.get(self.list_url).json()['results']
+            detail = self.client.get(self.detail_url).json()['results']
+
+        counts = {flight['id']: flight['available_seats'] for flight in flights}
+        self.assertEqual(counts, {self.flight.id: 29, other.id: 6})
+        self.assertEqual(detail['available_seats'], 29)
+
+    def test_missing_flight_is_cached(self):
+        url = reverse('flight-detail', args=[self.flight.id + 100])
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url).json()
+
+        self.assertEqual(response['resultCode'], '0')
+
+    def test_conditional_get(self):
+        response = self.client.get(self.list_url)
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(
+            self.client.get(self.list_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+
+        Flight.objects.get(id=self.flight.id).save()
+        self.assertEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_conditional_get_when_gzipped(self):
+        # Large enough to compress despite gzip's random padding
+        for i in range(5):
+            make_flight(f'TS20{i}', rows=1)
+        response = self.client.get(self.list_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        # GZipMiddleware weakens the ETag; it must still match
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(
+            self.client.get(self.list_url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+        )
+
+    def test_stats(self):
+        self.client.get(self.list_url)
+
+        stats = self.client.get(reverse('flight-cache-stats')).json()['results']
+
+        self.assertGreaterEqual(stats['misses'], 1)
+        self.assertEqual(stats['backend'], 'LocMemCache')
+
+
+class FlightSearchTests(TestCase):
+    def setUp(self):
+        seat_map_cache.invalidate()
+        departure = timezone.now().replace(hour=12) + timedelta(days=3)
+        self.cheap = make_flight('TS1', rows=1, departure_time=departure, price=Decimal('3000.00'))
+        self.late = make_flight('TS2', rows=1, departure_time=departure + timedelta(days=1), price=Decimal('2000.00'))
+        make_flight('TS3', rows=1, departure_time=departure, destination='Goa')
+        self.url = reverse('flight-search')
+        self.day = departure.date()
+
+    def search(self, **params):
+        response = self.client.get(self.url, {'origin': 'Delhi', 'destination': 'Mumbai', **params})
+        return [flight['flight_number'] for flight in response.json()['results']]
+
+    def test_route_and_sort(self):
+        self.assertEqual(self.search(), ['TS1', 'TS2'])
+        self.assertEqual(self.search(sort='price'), ['TS2', 'TS1'])
+
+    def test_date_window(self):
+        self.assertEqual(self.search(date_from=self.day, date_to=self.day), ['TS1'])
+
+    def test_min_seats_uses_counter(self):
+        booking = BookingService.create_booking(self.cheap.id, '1A', 'Test', 'test@example.com')
+        BookingService.hold_seat(booking.id, '1A')
+
+        self.assertEqual(Flight.objects.get(id=self.cheap.id).available_seats, 5)
+        self.assertEqual(self.search(min_seats=6), ['TS2'])
+
+    def test_counter_follows_release(self):
+        booking = BookingService.checkout(self.cheap.id, '1A', 'Test', 'test@example.com')
+        Booking.objects.filter(id=booking.id).update(state=BookingState.CONFIRMED)
+
+        BookingService.cancel_booking(booking.id)
+
+        self.assertEqual(Flight.objects.get(id=self.cheap.id).available_seats, 6)
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get(self.url, {'sort': 'bogus'}).status_code, 400)
+
+
+class AvailableSeatsCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        seat_map_cache.invalidate()
+        self.flight = make_flight(rows=2)
+
+    def available_seats(self):
+        return Flight.objects.get(id=self.flight.id).available_seats
+
+    def test_group_hold_and_expiry_sweep(self):
+        BookingService.create_group_booking(self.flight.id, [
+            {'seat_number': n, 'passenger_name': n, 'passenger_email': f'{n}@example.com'}
+            for n in ['1A', '1B', '1C']
+        ])
+        self.assertEqual(self.available_seats(), 9)
+
+        Booking.objects.update(seat_hold_expires_at=timezone.now() - timedelta(minutes=1))
+        BookingService.expire_held_bookings()
+        self.assertEqual(self.available_seats(), 12)
+
+    def test_expiry_counts_only_seats_it_releases(self):
+        bookings = BookingService.create_group_booking(self.flight.id, [
+            {'seat_number': n, 'passenger_name': n, 'passenger_email': f'{n}@example.com'}
+            for n in ['1A', '1B']
+        ])
+        # Released elsewhere (e.g. by an admin) while still held
+        Seat.objects.filter(id=bookings[0].seat_id).update(is_available=True)
+        Flight.objects.filter(id=self.flight.id).update(available_seats=11)
+
+        Booking.objects.update(seat_hold_expires_at=timezone.now() - timedelta(minutes=1))
+        BookingService.expire_held_bookings()
+
+        self.assertEqual(self.available_seats(), 12)
+
+    def test_list_shows_fresh_count_from_cache(self):
+        url = reverse('flight-list')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.checkout(self.flight.id, '2A', 'Test', 'test@example.com')
+
+        self.assertEqual(self.client.get(url).json()['results'][0]['available_seats'], 11)
+        detail = self.client.get(reverse('flight-detail', args=[self.flight.id])).json()
+        self.assertEqual(detail['results']['available_seats'], 11)
+
+    def test_seats_saved_one_at_a_time_are_counted(self):
+        # As the admin saves them
+        flight = Flight.objects.create(
+            flight_number='TS200', origin='Delhi', destination='Goa',
+            departure_time=timezone.now() + timedelta(days=7), total_seats=2, price=Decimal('100.00')
+        )
+        first = Seat.objects.create(flight=flight, seat_number='1A')
+        Seat.objects.create(flight=flight, seat_number='1B')
+        Seat.objects.create(flight=flight, seat_number='1C', is_available=False)
+        self.assertEqual(Flight.objects.get(id=flight.id).available_seats, 2)
+
+        first.is_available = False
+        first.save()
+        self.assertEqual(Flight.objects.get(id=flight.id).available_seats, 1)
+
+        Seat.objects.get(flight=flight, seat_number='1B').delete()
+        self.assertEqual(Flight.objects.get(id=flight.id).available_seats, 0)
+
+        flight.delete()
+        self.assertFalse(Seat.objects.filter(flight_id=flight.id).exists())
+
+    def test_reconcile_repairs_drift(self):
+        Seat.objects.filter(flight=self.flight, seat_number='1A').update(is_available=False)
+        out = StringIO()
+
+        call_command('reconcile_seat_counts', '--dry-run', stdout=out)
+        self.assertIn('counter 12, seats 11', out.getvalue())
+        self.assertEqual(self.available_seats(), 12)
+
+        call_command('reconcile_seat_counts', stdout=out)
+        self.assertEqual(self.available_seats(), 11)
+
+
+class SeatMapTests(TestCase):
+    def setUp(self):
+        seat_map_cache.invalidate()
+        self.flight = make_flight(rows=2)
+        self.url = reverse('flight-seats', args=[self.flight.id])
+
+    def test_seat_map_is_served_from_memory(self):
+        first = self.client.get(self.url).json()
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url).json()
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(second['results']), 12)
+        self.assertEqual(
+            second['results'][0],
+            {'id': second['results'][0]['id'], 'seat_number': '1A', 'is_available': True}
+        )
+
+    def test_unknown_flight(self):
+        response = self.client.get(reverse('flight-seats', args=[self.flight.id + 1]))
+
+        self.assertEqual(response.json()['resultCode'], '0')
+
+    def test_hold_and_expiry_update_cached_map(self):
+        seat_map = seat_map_cache.get(self.flight.id)
+        booking = BookingService.create_booking(self.flight.id, '1B', 'Test', 'test@example.com')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.hold_seat(booking.id, '1B')
+        self.assertEqual(seat_map.available_count(), 11)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingService.expire_booking(booking.id)
+        self.assertEqual(seat_map.available_count(), 12)
+
+    def test_bitmap_encoding(self):
+        Seat.objects.create(flight=self.flight, seat_number='EXIT1')
+        Seat.objects.filter(flight=self.flight, seat_number__in=['1B', '2F']).update(is_available=False)
+        Seat.objects.filter(flight=self.flight, seat_number='2E').delete()
+
+        results = self.client.get(self.url, {'encoding': 'bitmap'}).json()['results']
+
+        self.assertEqual(results['rows'], [1, 2])
+        self.assertEqual(results['letters'], 'ABCDEF')
+        # 1A..1F, 2A..2F: 1B, 2E and 2F clear
+        self.assertEqual(base64.b64decode(results['available']), bytes([0b10111111, 0b11000000]))
+        self.assertEqual(results['missing'], ['2E'])
+        self.assertEqual(results['other'], {'EXIT1': True})
+
+    def test_seat_map_is_gzipped(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            json.loads(gzip.decompress(response.content)), self.client.get(self.url).json()
+        )
+
+    def test_verify_repairs_drift(self):
+        seat_map_cache.get(self.flight.id)
+        Seat.objects.filter(flight=self.flight, seat_number='2C').update(is_available=False)
+
+        self.assertEqual(seat_map_cache.verify(self.flight.id), ['2C'])
+        self.assertEqual(seat_map_cache.get(self.flight.id).available_count(), 11)
+
+
+class SeatAssignmentTests(TestCase):
+    def setUp(self):
+        seat_map_cache.invalidate()
+        seat_assigner.reset()
+        self.flight = make_flight()
+
+    def hold(self, **preference):
+        booking = BookingService.create_booking(self.flight.id, None, 'Test', 'test@example.com')
+        return BookingService.hold_seat(booking.id, preference=preference)
+
+    def test_any_seat_is_assigned_and_claimed(self):
+        booking = self.hold()
+
+        self.assertEqual(booking.state, BookingState.SEAT_HELD)
+        self.assertFalse(Seat.objects.get(id=booking.seat_id).is_available)
+        self.assertEqual(Flight.objects.get(id=self.flight.id).available_seats, 29)
+
+    def test_preference_is_respected(self):
+        booking = self.hold(seat_type='window', row_from=3, row_to=4)
+
+        self.assertIn(booking.seat.seat_number, {'3A', '3F', '4A', '4F'})
+
+    def test_concurrent_picks_are_spread_out(self):
+        picks = [seat_id for seat_id, _ in
+                 (next(seat_assigner.candidates(self.flight.id)) for _ in range(6))]
+
+        self.assertEqual(len(set(picks)), 6)
+
+    def test_seat_taken_elsewhere_is_skipped(self):
+        seat_map_cache.get(self.flight.id)
+        # Taken by another process: this process's seat map still shows it free
+        Seat.objects.filter(flight=self.flight).exclude(seat_number='1C').update(is_available=False)
+
+        with override_settings(SEAT_ASSIGNMENT_ATTEMPTS=30):
+            booking = self.hold()
+
+        self.assertEqual(booking.seat.seat_number, '1C')
+
+    def test_stale_map_is_refreshed_before_giving_up(self):
+        seat_map_cache.get(self.flight.id)
+        Seat.objects.filter(flight=self.flight).exclude(seat_number='1C').update(is_available=False)
+
+        # All SEAT_ASSIGNMENT_ATTEMPTS candidates conflict, then the reloaded map has only 1C
+        booking = self.hold()
+
+        self.assertEqual(booking.seat.seat_number, '1C')
+
+    def test_seat_contention_is_a_retryable_conflict(self):
+        booking = BookingService.create_booking(self.flight.id, None, 'Test', 'test@example.com')
+        url = reverse('booking-hold-seat', args=[booking.id])
+        seat_map_cache.get(self.flight.id)
+        Seat.objects.filter(flight=self.flight).exclude(seat_number='5F').update(is_available=False)
+
+        # The map stays stale, so both rounds try front-row seats and conflict
+        with mock.patch.object(seat_assigner, 'refresh'):
+            response = self.client.post(url, {}, content_type='application/json',
+                                        HTTP_IDEMPOTENCY_KEY='hold-1')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['resultCode'], '0')
+
+        # The 409 is not stored against the key, so the retry runs again
+        seat_map_cache.invalidate(self.flight.id)
+        retry = self.client.post(url, {}, content_type='application/json',
+                                 HTTP_IDEMPOTENCY_KEY='hold-1')
+        self.assertEqual(retry.json()['results']['seat_number'], '5F')
+
+    def test_no_matching_seat(self):
+        with self.assertRaisesMessage(ValueError, "No seat available matching the preference"):
+            self.hold(row_from=6)
+
+    def test_group_seated_together(self):
+        passengers = [
+            {'passenger_name': f'Passenger {i}', 'passenger_email': f'{i}@example.com'}
+            for i in range(3)
+        ]
+        data = self.client.post(reverse('booking-group'), {
+            'flight_id': self.flight.id,
+            'passengers': passengers,
+            'seat_together': True,
+        }, content_type='application/json').json()
+
+        seats = sorted(b['seat_details']['seat_number'] for b in data['results'])
+        self.assertEqual(len({seat[:-1] for seat in seats}), 1)
+        self.assertEqual(ord(seats[-1][-1]) - ord(seats[0][-1]), 2)
+
+    def test_group_is_not_split_by_the_aisle(self):
+        # Row 1 has only 1C and 1D free, across the aisle from each other
+        Seat.objects.filter(flight=self.flight).exclude(seat_number__in=['1C', '1D']).update(
+            is_available=False
+        )
+        seat_map_cache.invalidate(self.flight.id)
+
+        self.assertEqual(list(seat_assigner.group_candidates(self.flight.id, 2, together=True)), [])
+        self.assertEqual(seat_map_cache.get(self.flight.id).sections, ['ABC', 'DEF'])
+
+    def test_create_booking_takes_no_seat_preference(self):
+        # The seat is only chosen at hold time
+        response = self.client.post(reverse('booking-create'), {
+            'flight_id': self.flight.id, 'passenger_name': 'Test', 'passenger_email': 't@example.com',
+            'seat_type': 'window',
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()), ['seat_number'])
+
+    def test_checkout_assigns_matching_seat(self):
+        data = self.client.post(reverse('booking-checkout'), {
+            'flight_id': self.flight.id, 'passenger_name': 'Test', 'passenger_email': 't@example.com',
+            'seat_type': 'aisle', 'row_from': 2, 'row_to': 2,
+        }, content_type='application/json').json()
+
+        self.assertIn(data['results']['seat_details']['seat_number'], {'2C', '2D'})
+
+    def test_group_must_name_all_seats_or_none(self):
+        response = self.client.post(reverse('booking-group'), {
+            'flight_id': self.flight.id,
+            'passengers': [
+                {'seat_number': '1A', 'passenger_name': 'A', 'passenger_email': 'a@example.com'},
+                {'passenger_name': 'B', 'passenger_email': 'b@example.com'},
+            ],
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+
+
+class BookingListTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        seats = Seat.objects.filter(flight=self.flight).values_list('seat_number', flat=True)
+        for i, seat_number in enumerate(list(seats)[:12]):
+            booking = BookingService.create_booking(
+                self.flight.id, seat_number, f'Passenger {i}', f'p{i}@example.com'
+            )
+            BookingService.hold_seat(booking.id, seat_number)
+        self.url = reverse('booking-list')
+
+    def test_page_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'page_size': 5})
+
+        data = response.json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertEqual(len(data['results'][0]['transitions']), 1)
+        # bookings joined with flight and seat, then one query for transitions
+        self.assertEqual(statement_count(context), 2)
+
+    def test_projection_skips_transitions(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'fields': 'id,state,seat_details'})
+
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'state', 'seat_details'})
+        self.assertEqual(statement_count(context), 1)
+
+    def test_cursor_walks_every_booking_once(self):
+        seen = []
+        params = {'page_size': 5}
+        while True:
+            data = self.client.get(self.url, params).json()
+            seen.extend(row['id'] for row in data['results'])
+            if not data['next']:
+                break
+            params['cursor'] = data['next']
+
+        self.assertEqual(len(seen), 12)
+        self.assertEqual(set(seen), set(Booking.objects.values_list('id', flat=True)))
+
+    def test_values_serializers_match_model_serializers(self):
+        BookingService.create_booking(self.flight.id, None, 'No Seat', 'noseat@example.com')
+        bookings = Booking.objects.order_by('-created_at', '-id')
+
+        self.assertEqual(
+            self.client.get(self.url, {'page_size': 20}).json()['results'],
+            json.loads(JSONRenderer().render(BookingSerializer(bookings, many=True).data))
+        )
+        fields = ['id', 'amount', 'seat_details']
+        self.assertEqual(
+            BookingValuesSerializer(bookings, fields=fields).data,
+            [{name: booking[name] for name in fields}
+             for booking in BookingSerializer(bookings, many=True).data]
+        )
+        flights = Flight.objects.order_by('id')
+        self.assertEqual(FlightValuesSerializer(flights).data, FlightSerializer(flights, many=True).data)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class BookingExportTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        for i, seat_number in enumerate(['1A', '1B', '1C']):
+            booking = BookingService.create_booking(
+                self.flight.id, seat_number, f'Passenger {i}', f'p{i}@example.com'
+            )
+            BookingService.hold_seat(booking.id, seat_number)
+        BookingService.create_booking(self.flight.id, '1D', 'Passenger 3', 'p3@example.com')
+        self.url = reverse('booking-export')
+
+    def stream(self, params):
+        response = self.client.get(self.url, params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_with_state_filter(self):
+        lines = self.stream({'state': BookingState.SEAT_HELD}).splitlines()
+
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row['state'] for row in rows}, {BookingState.SEAT_HELD})
+
+    def test_transitions_csv(self):
+        rows = list(csv.DictReader(self.stream({'table': 'transitions', 'export_format': 'csv'}).splitlines()))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['to_state'], BookingState.SEAT_HELD)
+
+    def test_date_range_filter(self):
+        tomorrow = (timezone.now() + timedelta(days=1)).date().isoformat()
+
+        self.assertEqual(self.stream({'created_from': tomorrow}), '')
+        self.assertEqual(len(self.stream({'created_to': tomorrow}).splitlines()), 4)
+
+    def test_invalid_filter(self):
+        response = self.client.get(self.url, {'state': 'BOGUS'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        self.expired = []
+        for i, seat_number in enumerate(['1A', '1B', '1C']):
+            booking = BookingService.create_booking(
+                self.flight.id, seat_number, f'Passenger {i}', f'p{i}@example.com'
+            )
+            BookingService.hold_seat(booking.id, seat_number)
+            self.expired.append(BookingService.expire_booking(booking.id))
+        self.active = BookingService.hold_seat(
+            BookingService.create_booking(self.flight.id, '2A', 'Active', 'a@example.com').id, '2A'
+        )
+        self.cutoff = timezone.now() + timedelta(seconds=1)
+
+    def test_archives_finished_bookings_in_batches(self):
+        self.assertEqual(ArchiveService.archive_batch(self.cutoff, batch_size=2), 2)
+        self.assertEqual(ArchiveService.archive(self.cutoff, batch_size=2), 1)
+
+        self.assertEqual(list(Booking.objects.values_list('id', flat=True)), [self.active.id])
+        self.assertFalse(
+            BookingStateTransition.objects.exclude(booking_id=self.active.id).exists()
+        )
+        archived = ArchivedBooking.objects.get(booking_id=self.expired[0].id)
+        self.assertEqual(archived.seat_number, '1A')
+        self.assertEqual(
+            [t['to_state'] for t in archived.transitions],
+            [BookingState.SEAT_HELD, BookingState.EXPIRED]
+        )
+
+    def test_cutoff_is_respected(self):
+        self.assertEqual(ArchiveService.archive(timezone.now() - timedelta(days=1)), 0)
+
+    def test_detail_view_falls_back_to_archive(self):
+        booking = self.expired[0]
+        ArchiveService.archive(self.cutoff)
+
+        response = self.client.get(reverse('booking-detail', args=[booking.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results']['booking_reference'], booking.booking_reference)
+        self.assertEqual(response.data['results']['state'], BookingState.EXPIRED)
+        self.assertEqual(ArchiveService.find(booking_reference=booking.booking_reference).booking_id, booking.id)
+        self.assertEqual(
+            self.client.get(reverse('booking-detail', args=[999999])).status_code, 404
+        )
+
+
+@override_settings(BOOKING_REFERENCE_FILTER=True)
+class BookingReferenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        booking_references.reset()
+        self.flight = make_flight()
+        self.booking = BookingService.create_booking(
+            self.flight.id, '1A', 'Test Passenger', 'test@example.com'
+        )
+
+    def test_detail_and_actions_by_reference(self):
+        reference = self.booking.booking_reference
+        response = self.client.get(reverse('booking-detail-by-reference', args=[reference.lower()]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results']['id'], self.booking.id)
+
+        response = self.client.post(
+            reverse('booking-hold-seat-by-reference', args=[reference]),
+            {'seat_number': '1A'}, content_type='application/json'
+        )
+        self.assertEqual(response.data['resultCode'], '1')
+        self.assertEqual(Booking.objects.get(id=self.booking.id).state, BookingState.SEAT_HELD)
+
+    def test_unknown_references_are_rejected_without_queries(self):
+        booking_references.resolve(self.booking.booking_reference)
+
+        for reference in ['not-a-reference', 'BK0000000000', 'BKFFFFFFFFFF']:
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse('booking-detail-by-reference', args=[reference]))
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.data['resultCode'], '0')
+
+    def test_resolved_id_is_cached(self):
+        booking_references.resolve(self.booking.booking_reference)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(booking_references.resolve(self.booking.booking_reference), self.booking.id)
+
+    def test_bookings_created_elsewhere_become_resolvable(self):
+        booking_references.resolve(self.booking.booking_reference)
+        # Inserted without going through this process's BookingService
+        other = Booking.objects.create(
+            booking_reference='BK0123456789', flight=self.flight,
+            passenger_name='Elsewhere', passenger_email='e@example.com', amount=self.flight.price
+        )
+        self.assertFalse(booking_references.might_exist(other.booking_reference))
+
+        # What the other process's BookingService does on commit: bump the
+        # shared generation so this process reloads recent references
+        booking_references.add([])
+        self.assertEqual(booking_references.resolve(other.booking_reference), other.id)
+
+    @override_settings(BOOKING_REFERENCE_FILTER=None)
+    def test_filter_is_off_with_a_per_process_cache(self):
+        booking_references.resolve(self.booking.booking_reference)
+        # Created by another process, whose generation bump this process's
+        # local-memory cache never sees
+        other = Booking.objects.create(
+            booking_reference='BK0123456789', flight=self.flight,
+            passenger_name='Elsewhere', passenger_email='e@example.com', amount=self.flight.price
+        )
+
+        self.assertFalse(booking_references.filter_enabled)
+        self.assertEqual(booking_references.resolve(other.booking_reference), other.id)
+
+    @override_settings(BOOKING_REFERENCE_FILTER=None)
+    def test_unknown_reference_is_remembered_with_a_per_process_cache(self):
+        url = reverse('booking-detail-by-reference', args=['BK0123456789'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+        # Once a booking has the reference, the remembered miss is dropped
+        other = Booking.objects.create(
+            booking_reference='BK0123456789', flight=self.flight,
+            passenger_name='Later', passenger_email='l@example.com', amount=self.flight.price
+        )
+        booking_references.add([other.booking_reference])
+        self.assertEqual(booking_references.resolve(other.booking_reference), other.id)
+
+    def test_archived_bookings_resolve(self):
+        BookingService.hold_seat(self.booking.id, '1A')
+        BookingService.expire_booking(self.booking.id)
+        ArchiveService.archive(timezone.now() + timedelta(seconds=1))
+
+        response = self.client.get(
+            reverse('booking-detail-by-reference', args=[self.booking.booking_reference])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results']['state'], BookingState.EXPIRED)
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        self.url = reverse('booking-create')
+        self.payload = {
+            'flight_id': self.flight.id,
+            'seat_number': '1A',
+            'passenger_name': 'Test Passenger',
+            'passenger_email': 'test@example.com',
+        }
+
+    def post(self, key, payload=None, url=None):
+        return self.client.post(
+            url or self.url, payload or self.payload,
+            content_type='application/json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_is_replayed_without_rerunning(self):
+        first = self.post('retry-1')
+
+        with CaptureQueriesContext(connection) as context:
+            second = self.post('retry-1')
+
+        # The claiming INSERT and the lookup of the stored response
+        self.assertEqual(statement_count(context), 2)
+
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+
+    def test_each_key_runs_once(self):
+        self.post('key-a')
+        self.post('key-b')
+        self.client.post(self.url, self.payload, content_type='application/json')
+
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def test_key_reused_for_different_request(self):
+        self.post('reused')
+
+        response = self.post('reused', {**self.payload, 'passenger_name': 'Someone Else'})
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_key_in_progress(self):
+        IdempotencyRecord.objects.create(
+            key='running', fingerprint='x', expires_at=timezone.now() + timedelta(hours=1)
+        )
+
+        self.assertEqual(self.post('running').status_code, 409)
+        self.assertEqual(Booking.objects.count(), 0)
+
+    def test_expired_key_runs_again(self):
+        self.post('old')
+        IdempotencyRecord.objects.filter(key='old').update(expires_at=timezone.now())
+
+        response = self.post('old')
+
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(Booking.objects.count(), 2)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.flight = make_flight()
+        self.booking = BookingService.create_booking(
+            self.flight.id, '1A', 'Test Passenger', 'test@example.com'
+        )
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0)
+    def test_sampled_request_reports_server_timing(self):
+        response = self.client.post(
+            reverse('booking-hold-seat', args=[self.booking.id]),
+            {'seat_number': '1A'}, content_type='application/json'
+        )
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'sql;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r'lock;dur=[\d.]+')
+        self.assertRegex(timing, r'serializer;dur=[\d.]+')
+        self.assertRegex(timing, r'total;dur=[\d.]+$')
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0.0)
+    def test_unsampled_request_reports_latency_only(self):
+        response = self.client.get(reverse('booking-detail', args=[self.booking.id]))
+
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+$')
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0)
+    def test_metrics_endpoint_exposes_histograms(self):
+        self.client.get(reverse('booking-detail', args=[self.booking.id]))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn(
+            'booking_api_request_duration_seconds_count{view="booking-detail",method="GET"}', body
+        )
+        self.assertIn(
+            'booking_api_request_queries_bucket{view="booking-detail",method="GET",le="+Inf"}', body
+        )
+
+
+class FastJSONTests(SimpleTestCase):
+    def test_renders_like_json_renderer(self):
+        data = {
+            'price': Decimal('5500.00'),
+            'at': timezone.now(),
+            'day': timezone.now().date(),
+            'name': 'Zoë \u2028',
+            'seats': {1: True},
+            'nested': [None, 1.5, ErrorDetail('bad', code='invalid')],
+        }
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2')
+        )
+
+    def test_parse(self):
+        self.assertEqual(FastJSONParser().parse(BytesIO('{"a": "é"}'.encode())), {'a': 'é'})
+
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"seat_number": '))
+
+
+class LoadTestStatsTests(TestCase):
+    def test_percentiles_use_nearest_rank(self):
+        stats = Stats()
+        for ms in range(1, 101):
+            stats.record(ms / 1000, 'ok')
+
+        summary = stats.summary(elapsed=2)
+
+        self.assertEqual((summary['p50_ms'], summary['p95_ms'], summary['p99_ms']), (50, 95, 99))
+        self.assertEqual(summary['throughput_rps'], 50)
+
+    def test_classify(self):
+        self.assertEqual(classify(200, b'{"resultCode": "1"}'), 'ok')
+        self.assertEqual(classify(200, b'{"resultCode": "0"}'), 'rejected')
+        self.assertEqual(classify(500, b''), 'error')
+        self.assertEqual(classify(None, b'timed out'), 'error')
+
+
+class SQLiteConcurrencyBackendTests(SimpleTestCase):
+    def make_wrapper(self, path, **options):
+        settings_dict = {**connection.settings_dict, 'NAME': path, 'OPTIONS': options}
+        wrapper = SQLiteWrapper(settings_dict, alias='concurrency-test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = str(Path(directory.name) / 'test.sqlite3')
+
+    def test_init_command_enables_wal(self):
+        wrapper = self.make_wrapper(
+            self.path, init_command='PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL'
+        )
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_immediate_transaction_takes_write_lock_at_begin(self):
+        first = self.make_wrapper(self.path, transaction_mode='IMMEDIATE', timeout=0)
+        second = self.make_wrapper(self.path, transaction_mode='IMMEDIATE', timeout=0)
+
+        first._start_transaction_under_autocommit()
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            second._start_transaction_under_autocommit()
+        first.commit()
+        second._start_transaction_under_autocommit()
+        second.rollback()
+
+    def test_writer_queue_serializes_transactions_in_process(self):
+        first = self.make_wrapper(self.path, writer_queue=True, timeout=0.05)
+        second = self.make_wrapper(self.path, writer_queue=True, timeout=0.05)
+
+        first._start_transaction_under_autocommit()
+        with self.assertRaisesMessage(OperationalError, 'writer queue timed out'):
+            second._start_transaction_under_autocommit()
+        first.rollback()
+        second._start_transaction_under_autocommit()
+        second.commit()
+
+    def test_rejects_unknown_transaction_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.make_wrapper(self.path, transaction_mode='LAZY')
+
+
+class HoldExpiryThreadTests(TransactionTestCase):
+    # Committed data: the scheduler thread has its own connection
+    @override_settings(SEAT_HOLD_DURATION=timedelta(milliseconds=200))
+    def test_seat_returns_to_inventory_shortly_after_the_deadline(self):
+        flight = make_flight()
+        scheduler = HoldExpiryScheduler(tick=0.05)
+        scheduler.load()
+        scheduler.start()
+        self.addCleanup(scheduler.stop)
+        booking = BookingService.create_booking(flight.id, '1A', 'Test Passenger', 'test@example.com')
+
+        with mock.patch('bookings.services.booking_service.hold_expiry', scheduler):
+            BookingService.hold_seat(booking.id, '1A')
+
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            if Booking.objects.get(id=booking.id).state == BookingState.EXPIRED:
+                break
+            time.sleep(0.05)
+        self.assertEqual(Booking.objects.get(id=booking.id).state, BookingState.EXPIRED)
+        self.assertTrue(Seat.objects.get(flight=flight, seat_number='1A').is_available)
+
+    def test_web_workers_expire_only_their_own_holds(self):
+        flight = make_flight()
+        # Held by some other process before this one started
+        other = BookingService.create_booking(flight.id, '1A', 'Other', 'other@example.com')
+        BookingService.hold_seat(other.id, '1A')
+        scheduler = HoldExpiryScheduler(tick=0.05)
+        scheduler.start(load=False)
+        self.addCleanup(scheduler.stop)
+        deadline = time.monotonic() + 2
+        while not scheduler.active and time.monotonic() < deadline:
+            time.sleep(0.01)
+        booking = BookingService.create_booking(flight.id, '1B', 'Test Passenger', 'test@example.com')
+
+        with mock.patch('bookings.services.booking_service.hold_expiry', scheduler):
+            BookingService.hold_seat(booking.id, '1B')
+
+        self.assertTrue(scheduler.active)
+        self.assertEqual(scheduler.pending(), 1)
+
+
+class AsyncFlightViewTests(TransactionTestCase):
+    # Committed data: the async views read on executor threads with their
+    # own connections
+    def setUp(self):
+        cache.clear()
+        seat_map_cache.invalidate()
+        self.flight = make_flight()
+        self.factory = RequestFactory()
+
+    def assertSameAsSync(self, async_view, url, *args):
+        response = async_to_sync(async_view)(self.factory.get(url), *args)
+        expected = self.client.get(url)
+
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+        return response
+
+    def test_async_views_match_sync_views(self):
+        response = self.assertSameAsSync(async_views.flight_list, reverse('flight-list'))
+        self.assertIn('ETag', response)
+        self.assertSameAsSync(
+            async_views.flight_detail, reverse('flight-detail', args=[self.flight.id]), self.flight.id
+        )
+        self.assertSameAsSync(
+            async_views.flight_seats, reverse('flight-seats', args=[self.flight.id]), self.flight.id
+        )
+        self.assertSameAsSync(async_views.flight_search, reverse('flight-search') + '?origin=Delhi')
+
+    def test_conditional_get(self):
+        etag = async_to_sync(async_views.flight_list)(self.factory.get('/api/flights/'))['ETag']
+
+        response = async_to_sync(async_views.flight_list)(
+            self.factory.get('/api/flights/', HTTP_IF_NONE_MATCH=etag)
+        )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_reads_check_executor_connections(self):
+        # Executor threads get no request signals, so each read retires
+        # expired or broken connections itself
+        with mock.patch('bookings.async_views.close_old_connections') as close:
+            flights = async_to_sync(async_views.read)(lambda: list(Flight.objects.all()))
+
+        self.assertEqual(flights, [self.flight])
+        self.assertEqual(close.call_count, 2)
+
+    def test_seat_stream_sends_snapshot_then_changes(self):
+        def parse(chunk):
+            event, data = chunk.decode().strip().split('\n')
+            return event.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+        async def watch():
+            response = await async_views.flight_seat_stream(self.factory.get('/'), self.flight.id)
+            stream = response.streaming_content
+            try:
+                self.assertEqual(await stream.__anext__(), b'retry: 1000\n')
+                snapshot = parse(await stream.__anext__())
+                self.assertEqual(seat_events.subscriber_count(self.flight.id), 1)
+                [booking] = await sync_to_async(BookingService.create_group_booking)(self.flight.id, [
+                    {'seat_number': '2B', 'passenger_name': 'Test Passenger', 'passenger_email': 't@example.com'}
+                ])
+                taken = parse(await stream.__anext__())
+                await sync_to_async(BookingService.expire_booking)(booking.id)
+                released = parse(await stream.__anext__())
+            finally:
+                await stream.aclose()
+            return response, snapshot, taken, released
+
+        response, snapshot, taken, released = async_to_sync(watch)()
+
+        seat = Seat.objects.get(flight=self.flight, seat_number='2B')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(snapshot[0], 'snapshot')
+        self.assertEqual(len(snapshot[1]['seats']), 30)
+        self.assertEqual(taken, ('seats', {'available': [], 'taken': [seat.id]}))
+        self.assertEqual(released, ('seats', {'available': [seat.id], 'taken': []}))
+        self.assertEqual(seat_events.subscriber_count(), 0)
+
+
+class ConcurrentHoldSeatTests(TransactionTestCase):
+    # On SQLite these run on a file database with the concurrency backend:
+    # the in-memory test database shares one cache between connections,
+    # whose table locks fail at once instead of waiting for the writer
+    workers = 8
+
+    def setUp(self):
+        if connection.vendor == 'sqlite':
+            self.use_file_database()
+        cache.clear()
+        seat_map_cache.invalidate()
+        seat_assigner.reset()
+        self.flight = make_flight(rows=2)
+        self.bookings = [
+            BookingService.create_booking(
+                self.flight.id, '', f'Passenger {i}', f'p{i}@example.com'
+            )
+            for i in range(self.workers)
+        ]
+
+    def use_file_database(self):
+        directory = tempfile.TemporaryDirectory()
+        path = str(Path(directory.name) / 'test.sqlite3')
+        # Copies the migrated, empty test database
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        target.close()
+
+        settings_dict = {
+            **connection.settings_dict,
+            'NAME': path,
+            'ENGINE': 'airline_booking.db_backends.sqlite3',
+            'OPTIONS': {
+                'timeout': 20,
+                'init_command': 'PRAGMA journal_mode=WAL',
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+        # Threads open their connections from connections.settings
+        original_settings = connections.settings[DEFAULT_DB_ALIAS]
+        original = connections[DEFAULT_DB_ALIAS]
+        wrapper = SQLiteWrapper(settings_dict)
+        connections.settings[DEFAULT_DB_ALIAS] = settings_dict
+        connections[DEFAULT_DB_ALIAS] = wrapper
+
+        def restore():
+            wrapper.close()
+            connections.settings[DEFAULT_DB_ALIAS] = original_settings
+            connections[DEFAULT_DB_ALIAS] = original
+            directory.cleanup()
+        self.addCleanup(restore)
+
+    def assertNoDoubleHolds(self):
+        held = list(
+            Booking.objects.filter(state=BookingState.SEAT_HELD).values_list('seat_id', flat=True)
+        )
+        taken = set(
+            Seat.objects.filter(flight=self.flight, is_available=False).values_list('id', flat=True)
+        )
+        self.assertEqual(len(held), len(set(held)))
+        self.assertEqual(set(held), taken)
+        self.flight.refresh_from_db()
+        self.assertEqual(self.flight.available_seats, self.flight.total_seats - len(taken))
+        return held
+
+    def test_parallel_holds_on_distinct_seats_all_succeed(self):
+        seats = list(Seat.objects.filter(flight=self.flight).values_list('seat_number', flat=True))
+        results = run_in_threads(BookingService.hold_seat, [
+            (booking.id, seats[i]) for i, booking in enumerate(self.bookings)
+        ])
+
+        errors = [r for r in results if isinstance(r, Exception)]
+        self.assertEqual(errors, [])
+        self.assertEqual([r.seat.seat_number for r in results], seats[:self.workers])
+        self.assertEqual(len(self.assertNoDoubleHolds()), self.workers)
+
+    def test_parallel_holds_on_same_seat_have_one_winner(self):
+        results = run_in_threads(BookingService.hold_seat, [
+            (booking.id, '1A') for booking in self.bookings
+        ])
+
+        winners = [r for r in results if isinstance(r, Booking)]
+        self.assertEqual(len(winners), 1)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results if r not in winners))
+        self.assertEqual(
+            self.assertNoDoubleHolds(),
+            [Seat.objects.get(flight=self.flight, seat_number='1A').id]
+        )
+
+    def test_parallel_any_seat_holds_never_share_a_seat(self):
+        # Fewer seats than bookings, so some threads must lose
+        flight = make_flight('TS101', rows=1)
+        self.flight = flight
+        bookings = [
+            BookingService.create_booking(flight.id, '', f'Passenger {i}', f'q{i}@example.com')
+            for i in range(self.workers)
+        ]
+
+        results = run_in_threads(BookingService.hold_seat, [(booking.id,) for booking in bookings])
+
+        winners = [r for r in results if isinstance(r, Booking)]
+        self.assertTrue(all(isinstance(r, ValueError) for r in results if r not in winners))
+        self.assertLessEqual(len(winners), flight.total_seats)
+        self.assertEqual(sorted(self.assertNoDoubleHolds()), sorted(r.seat_id for r in winners))
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_holds_do_not_wait_on_other_seat_locks(self):
+        locked = threading.Event()
+        release = threading.Event()
+
+        def slow_hold():
+            # Keeps seat 1A locked, as an in-flight hold on it would
+            with transaction.atomic():
+                Seat.objects.select_for_update().get(flight=self.flight, seat_number='1A')
+                locked.set()
+                release.wait(10)
+            connection.close()
+
+        blocker = threading.Thread(target=slow_hold)
+        blocker.start()
+        locked.wait()
+
+        seats = list(
+            Seat.objects.filter(flight=self.flight).exclude(seat_number='1A')
+            .values_list('seat_number', flat=True)
+        )
+        started = timezone.now()
+        results = run_in_threads(BookingService.hold_seat, [
+            (booking.id, seats[i]) for i, booking in enumerate(self.bookings)
+        ])
+        elapsed = timezone.now() - started
+        release.set()
+        blocker.join()
+
+        self.assertEqual([r for r in results if isinstance(r, Exception)], [])
+        self.assertLess(elapsed, timedelta(seconds=5))
+        self.assertEqual(len(self.assertNoDoubleHolds()), self.workers)
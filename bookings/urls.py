@@ -1,25 +1,57 @@
+from django.conf import settings
 from django.urls import path
+from bookings import async_views
 from bookings.views import (
-    FlightListView, FlightDetailView, FlightSeatsView,
-    CreateBookingView, HoldSeatView, InitiatePaymentView,
-    ProcessPaymentView, CancelBookingView, ProcessRefundView,
-    BookingDetailView, BookingListView
+    FlightListView, FlightDetailView, FlightSeatsView, FlightSearchView, FlightCacheStatsView,
+    CreateBookingView, CheckoutView, GroupBookingView, HoldSeatView,
+    InitiatePaymentView, ProcessPaymentView, RequestPaymentView, PaymentAttemptView,
+    CancelBookingView, ProcessRefundView,
+    BookingDetailView, BookingListView, BookingExportView, MetricsView
 )
 
 urlpatterns = [
     # Flight endpoints
     path('flights/', FlightListView.as_view(), name='flight-list'),
+    path('flights/search/', FlightSearchView.as_view(), name='flight-search'),
+    path('flights/cache-stats/', FlightCacheStatsView.as_view(), name='flight-cache-stats'),
     path('flights/<int:flight_id>/', FlightDetailView.as_view(), name='flight-detail'),
     path('flights/<int:flight_id>/seats/', FlightSeatsView.as_view(), name='flight-seats'),
     
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    
     # Booking endpoints
     path('bookings/', BookingListView.as_view(), name='booking-list'),
     path('bookings/create/', CreateBookingView.as_view(), name='booking-create'),
+    path('bookings/checkout/', CheckoutView.as_view(), name='booking-checkout'),
+    path('bookings/group/', GroupBookingView.as_view(), name='booking-group'),
+    path('bookings/export/', BookingExportView.as_view(), name='booking-export'),
     path('bookings/<int:booking_id>/', BookingDetailView.as_view(), name='booking-detail'),
     path('bookings/<int:booking_id>/hold-seat/', HoldSeatView.as_view(), name='booking-hold-seat'),
     path('bookings/<int:booking_id>/initiate-payment/', InitiatePaymentView.as_view(), name='booking-initiate-payment'),
     path('bookings/<int:booking_id>/process-payment/', ProcessPaymentView.as_view(), name='booking-process-payment'),
+    path('bookings/<int:booking_id>/pay/', RequestPaymentView.as_view(), name='booking-pay'),
+    path('bookings/<int:booking_id>/payments/<int:attempt_id>/', PaymentAttemptView.as_view(), name='booking-payment-attempt'),
     path('bookings/<int:booking_id>/cancel/', CancelBookingView.as_view(), name='booking-cancel'),
     path('bookings/<int:booking_id>/refund/', ProcessRefundView.as_view(), name='booking-refund'),
+    
+    # The same booking endpoints addressed by booking reference
+    path('bookings/ref/<str:reference>/', BookingDetailView.as_view(), name='booking-detail-by-reference'),
+    path('bookings/ref/<str:reference>/hold-seat/', HoldSeatView.as_view(), name='booking-hold-seat-by-reference'),
+    path('bookings/ref/<str:reference>/initiate-payment/', InitiatePaymentView.as_view(), name='booking-initiate-payment-by-reference'),
+    path('bookings/ref/<str:reference>/process-payment/', ProcessPaymentView.as_view(), name='booking-process-payment-by-reference'),
+    path('bookings/ref/<str:reference>/pay/', RequestPaymentView.as_view(), name='booking-pay-by-reference'),
+    path('bookings/ref/<str:reference>/payments/<int:attempt_id>/', PaymentAttemptView.as_view(), name='booking-payment-attempt-by-reference'),
+    path('bookings/ref/<str:reference>/cancel/', CancelBookingView.as_view(), name='booking-cancel-by-reference'),
+    path('bookings/ref/<str:reference>/refund/', ProcessRefundView.as_view(), name='booking-refund-by-reference'),
 ]
 
+if settings.ASYNC_FLIGHT_VIEWS:
+    # Same routes and names, served by the async views
+    async_routes = [
+        path('flights/', async_views.flight_list, name='flight-list'),
+        path('flights/search/', async_views.flight_search, name='flight-search'),
+        path('flights/<int:flight_id>/', async_views.flight_detail, name='flight-detail'),
+        path('flights/<int:flight_id>/seats/', async_views.flight_seats, name='flight-seats'),
+        path('flights/<int:flight_id>/seats/stream/', async_views.flight_seat_stream, name='flight-seat-stream'),
+    ]
+    urlpatterns = async_routes + urlpatterns
@@ -1,31 +1,136 @@
-from django.shortcuts import render
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db.models import prefetch_related_objects
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.gzip import gzip_page
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from bookings.models import Booking, Flight, Seat
+from rest_framework.exceptions import NotFound
+from bookings.models import Booking, PaymentAttempt
 from bookings.serializers import (
-    BookingSerializer, CreateBookingSerializer, HoldSeatSerializer,
-    ProcessPaymentSerializer, FlightSerializer, SeatSerializer
+    BookingSerializer, CheckoutSerializer, CreateBookingSerializer, GroupBookingSerializer,
+    HoldSeatSerializer, ProcessPaymentSerializer, PaymentAttemptSerializer,
+    FlightSearchSerializer, ArchivedBookingSerializer, SeatMapQuerySerializer,
+    BookingValuesSerializer, FlightValuesSerializer
 )
 from bookings.services.booking_service import BookingService
+from bookings.services.payment_service import PaymentService
 from bookings.services.state_machine import InvalidStateTransitionError
+from bookings.services.seat_map import seat_map_cache
+from bookings.services.seat_assignment import SeatContentionError
+from bookings.services.flight_cache import flight_catalogue
+from bookings.services.flight_search import FlightSearchService
+from bookings.pagination import KeysetPagination, InvalidCursorError
+from bookings.services.export_service import ExportService, ExportError
+from bookings.services.archive_service import ArchiveService
+from bookings.services.booking_references import booking_references
+from bookings.services.idempotency import IdempotencyService, IdempotencyError
+from bookings.instrumentation import registry as metrics_registry
 
+def not_modified(request, etag, last_modified):
+    """True when the client's conditional headers match the current version."""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        # Weak comparison: gzipped responses carry the ETag as W/"..."
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return etag.removeprefix('W/') in tags or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+def with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+class IdempotencyMixin:
+    """Honours an Idempotency-Key header on POST.
+    
+    The first response for a key is stored; retries with the same key and
+    body get it back without running the view again. Server errors and
+    409 Conflict responses are not stored, so the request can be retried.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key', '').strip()
+        if request.method != 'POST' or not key:
+            return super().dispatch(request, *args, **kwargs)
+        if len(key) > 255:
+            return JsonResponse(
+                {'errorMessage': 'Idempotency-Key is too long',"resultCode": "0"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        fingerprint = IdempotencyService.fingerprint(request.method, request.path, request.body)
+        try:
+            record = IdempotencyService.claim(key, fingerprint)
+        except IdempotencyError as e:
+            return JsonResponse({'errorMessage': str(e),"resultCode": "0"}, status=e.status_code)
+        if record is not None:
+            response = HttpResponse(
+                IdempotencyService.content(record),
+                status=record.status_code,
+                content_type=record.content_type
+            )
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code >= 500 or response.status_code == status.HTTP_409_CONFLICT:
+                IdempotencyService.release(key)
+                return response
+            response.render()
+            IdempotencyService.complete(
+                key, response.status_code, response.get('Content-Type', ''), response.content
+            )
+        except Exception:
+            IdempotencyService.release(key)
+            raise
+        return response
+
+class BookingReferenceMixin:
+    """Lets a booking_id view also be routed by booking reference.
+    
+    Unknown references get the usual not-found envelope, usually without
+    a database query (see BookingReferenceIndex).
+    """
+    def dispatch(self, request, *args, **kwargs):
+        if 'reference' in kwargs:
+            kwargs['booking_id'] = booking_references.resolve(kwargs.pop('reference'))
+        return super().dispatch(request, *args, **kwargs)
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if 'booking_id' in kwargs and kwargs['booking_id'] is None:
+            raise NotFound('Booking not found')
+    
+    def handle_exception(self, exc):
+        if isinstance(exc, NotFound):
+            return Response(
+                {'errorMessage': str(exc.detail),"resultCode": "0"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return super().handle_exception(exc)
+
+# Large, repetitive JSON: compressed for clients that accept gzip
+@method_decorator(gzip_page, name='dispatch')
 class FlightListView(APIView):
     def get(self, request):
-        flights = Flight.objects.all()
-        serializer = FlightSerializer(flights, many=True)
+        flights, etag, last_modified = flight_catalogue.flight_list()
+        if not_modified(request, etag, last_modified):
+            return with_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
         resp = {
-            "results": serializer.data,
+            "results": flights,
             "resultDescription": "Flight details.",
             "resultCode": "1"
         }
-        return Response(resp, status=status.HTTP_200_OK)
+        return with_validators(Response(resp, status=status.HTTP_200_OK), etag, last_modified)
        
 
 class FlightDetailView(APIView):
     def get(self, request, flight_id):
 
-        flight =Flight.objects.filter(id=flight_id).first()       
+        flight, etag, last_modified = flight_catalogue.flight_detail(flight_id)
         if not flight:            
             resp = {                
                 "errorMessage": "Flight details not found.",
@@ -33,40 +138,69 @@ class FlightDetailView(APIView):
             }
             return Response(resp, status=status.HTTP_200_OK)
 
-
-        serializer = FlightSerializer(flight)
+        if not_modified(request, etag, last_modified):
+            return with_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
         resp = {
-            "results": serializer.data,
+            "results": flight,
             "resultDescription": "Flight details descriptions.",
             "resultCode": "1"
         }
+        return with_validators(Response(resp, status=status.HTTP_200_OK), etag, last_modified)
+
+
+@method_decorator(gzip_page, name='dispatch')
+class FlightSearchView(APIView):
+    def get(self, request):
+        serializer = FlightSearchSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        flights = FlightSearchService.search(**serializer.validated_data)
+        resp = {
+            "results": FlightValuesSerializer(flights).data,
+            "resultDescription": "Flight search results.",
+            "resultCode": "1"
+        }
+        return Response(resp, status=status.HTTP_200_OK)
+
+
+class FlightCacheStatsView(APIView):
+    def get(self, request):
+        resp = {
+            "results": flight_catalogue.stats(),
+            "resultDescription": "Flight cache statistics.",
+            "resultCode": "1"
+        }
         return Response(resp, status=status.HTTP_200_OK)
        
 
+@method_decorator(gzip_page, name='dispatch')
 class FlightSeatsView(APIView):
     def get(self, request, flight_id):
-        flight =Flight.objects.filter(id=flight_id).first()       
-        if not flight:            
+        serializer = SeatMapQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        seat_map = seat_map_cache.get(flight_id)
+        if seat_map is None:
             resp = {                
                 "errorMessage": "Flight details not found.",
                 "resultCode": "0"
             }
             return Response(resp, status=status.HTTP_200_OK)
-        seats = Seat.objects.filter(flight=flight)
-        serializer = SeatSerializer(seats, many=True)
+        if serializer.validated_data['encoding'] == 'bitmap':
+            seats = seat_map.as_bitmap()
+        else:
+            seats = seat_map.as_list()
         resp = {
-                "results": serializer.data,
+                "results": seats,
                 "resultDescription": "Flight seats details.",
                 "resultCode": "1"
             }
         return Response(resp, status=status.HTTP_200_OK)
 
-class CreateBookingView(APIView):
+class CreateBookingView(IdempotencyMixin, APIView):
     def post(self, request):
-        data = request.data
-
-        print(f"data: {data}",flush=True)
-        
         serializer = CreateBookingSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -74,7 +208,7 @@ class CreateBookingView(APIView):
         try:
             booking = BookingService.create_booking(
                 flight_id=serializer.validated_data['flight_id'],
-                seat_number=serializer.validated_data['seat_number'],
+                seat_number=serializer.validated_data.get('seat_number'),
                 passenger_name=serializer.validated_data['passenger_name'],
                 passenger_email=serializer.validated_data['passenger_email']
             )
@@ -83,7 +217,7 @@ class CreateBookingView(APIView):
             # return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
             resp = {
-                "results": serializer.data,
+                "results": response_serializer.data,
                 "resultDescription": "Booking ceate successfully.",
                 "resultCode": "1"
             }
@@ -97,7 +231,7 @@ class CreateBookingView(APIView):
                  },status=status.HTTP_200_OK
             )
 
-class HoldSeatView(APIView):
+class HoldSeatView(IdempotencyMixin, BookingReferenceMixin, APIView):
     def post(self, request, booking_id):
         serializer = HoldSeatSerializer(data=request.data)
         if not serializer.is_valid():
@@ -111,12 +245,13 @@ class HoldSeatView(APIView):
         try:
             booking = BookingService.hold_seat(
                 booking_id=booking_id,
-                seat_number=serializer.validated_data['seat_number']
+                seat_number=serializer.validated_data.get('seat_number'),
+                preference=serializer.preference(serializer.validated_data)
             )
             
-            response_serializer = BookingSerializer(booking)            
             resp = {
-                "results": serializer.data,
+                # The assigned seat when none was asked for
+                "results": {**serializer.data, "seat_number": booking.seat.seat_number},
                 "resultDescription": "Booking ceate successfully.",
                 "resultCode": "1"
             }
@@ -128,6 +263,12 @@ class HoldSeatView(APIView):
                  "resultCode": "0"
                  },status=status.HTTP_200_OK
             )
+        except SeatContentionError as e:
+            return Response(
+                {'errorMessage': f'{str(e)}',
+                 "resultCode": "0"
+                 },status=status.HTTP_409_CONFLICT
+            )
         except (ValueError, InvalidStateTransitionError) as e:
             return Response(
                 {'errorMessage': f'{str(e)}',
@@ -141,7 +282,94 @@ class HoldSeatView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class InitiatePaymentView(APIView):
+class CheckoutView(IdempotencyMixin, APIView):
+    def post(self, request):
+        serializer = CheckoutSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            booking = BookingService.checkout(
+                flight_id=serializer.validated_data['flight_id'],
+                seat_number=serializer.validated_data.get('seat_number'),
+                passenger_name=serializer.validated_data['passenger_name'],
+                passenger_email=serializer.validated_data['passenger_email'],
+                preference=serializer.preference(serializer.validated_data)
+            )
+            response_serializer = BookingSerializer(booking)
+            resp = {
+                "results": response_serializer.data,
+                "resultDescription": "Booking checked out, payment pending.",
+                "resultCode": "1"
+            }
+            return Response(resp, status=status.HTTP_200_OK)
+        
+        except SeatContentionError as e:
+            return Response(
+                {'errorMessage': f'{str(e)}',
+                 "resultCode": "0"
+                 },status=status.HTTP_409_CONFLICT
+            )
+        except (ValueError, InvalidStateTransitionError) as e:
+            return Response(
+                {'errorMessage': f'{str(e)}',
+                 "resultCode": "0"
+                 },status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response(
+                {'errorMessage': 'Failed to check out booking',"resultCode": "0"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class GroupBookingView(IdempotencyMixin, APIView):
+    def post(self, request):
+        serializer = GroupBookingSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            passengers = serializer.validated_data['passengers']
+            if passengers[0].get('seat_number'):
+                bookings = BookingService.create_group_booking(
+                    flight_id=serializer.validated_data['flight_id'],
+                    passengers=passengers
+                )
+            else:
+                bookings = BookingService.create_assigned_group_booking(
+                    flight_id=serializer.validated_data['flight_id'],
+                    passengers=passengers,
+                    together=serializer.validated_data['seat_together'],
+                    preference=serializer.preference(serializer.validated_data)
+                )
+            prefetch_related_objects(bookings, 'transitions')
+            response_serializer = BookingSerializer(bookings, many=True)
+            resp = {
+                "results": response_serializer.data,
+                "resultDescription": "Group booking seats held.",
+                "resultCode": "1"
+            }
+            return Response(resp, status=status.HTTP_200_OK)
+        
+        except SeatContentionError as e:
+            return Response(
+                {'errorMessage': f'{str(e)}',
+                 "resultCode": "0"
+                 },status=status.HTTP_409_CONFLICT
+            )
+        except (ValueError, InvalidStateTransitionError) as e:
+            return Response(
+                {'errorMessage': f'{str(e)}',
+                 "resultCode": "0"
+                 },status=status.HTTP_200_OK
+            )
+        except Exception as e:
+            return Response(
+                {'errorMessage': 'Failed to create group booking',"resultCode": "0"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class InitiatePaymentView(IdempotencyMixin, BookingReferenceMixin, APIView):
     def post(self, request, booking_id):
         try:
             booking = BookingService.initiate_payment(booking_id=booking_id)
@@ -167,7 +395,7 @@ class InitiatePaymentView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class ProcessPaymentView(APIView):
+class ProcessPaymentView(IdempotencyMixin, BookingReferenceMixin, APIView):
     def post(self, request, booking_id):
         serializer = ProcessPaymentSerializer(data=request.data)
         if not serializer.is_valid():
@@ -203,7 +431,53 @@ class ProcessPaymentView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class CancelBookingView(APIView):
+class RequestPaymentView(IdempotencyMixin, BookingReferenceMixin, APIView):
+    def post(self, request, booking_id):
+        serializer = ProcessPaymentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            attempt = PaymentService.request_payment(
+                booking_id=booking_id,
+                payment_method=serializer.validated_data.get('payment_method', 'card')
+            )
+            resp = {
+                "results": PaymentAttemptSerializer(attempt).data,
+                "resultDescription": "Payment accepted for processing.",
+                "resultCode": "1"
+            }
+            return Response(resp, status=status.HTTP_202_ACCEPTED)
+        
+        except Booking.DoesNotExist:
+            return Response(
+                {'errorMessage': 'Booking not found',"resultCode": "0"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except ValueError as e:
+            return Response({'errorMessage': str(e),"resultCode": "0"}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response(
+                {'errorMessage': 'Failed to request payment',"resultCode": "0"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class PaymentAttemptView(BookingReferenceMixin, APIView):
+    def get(self, request, booking_id, attempt_id):
+        attempt = PaymentAttempt.objects.filter(id=attempt_id, booking_id=booking_id).first()
+        if not attempt:
+            return Response(
+                {'errorMessage': 'Payment attempt not found',"resultCode": "0"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        resp = {
+            "results": PaymentAttemptSerializer(attempt).data,
+            "resultDescription": "Payment attempt details.",
+            "resultCode": "1"
+        }
+        return Response(resp, status=status.HTTP_200_OK)
+
+class CancelBookingView(IdempotencyMixin, BookingReferenceMixin, APIView):
     def post(self, request, booking_id):
         try:
             booking = BookingService.cancel_booking(booking_id=booking_id)
@@ -228,7 +502,7 @@ class CancelBookingView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class ProcessRefundView(APIView):
+class ProcessRefundView(IdempotencyMixin, BookingReferenceMixin, APIView):
     def post(self, request, booking_id):
         try:
             booking = BookingService.process_refund(booking_id=booking_id)
@@ -254,15 +528,24 @@ class ProcessRefundView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-class BookingDetailView(APIView):
+class BookingDetailView(BookingReferenceMixin, APIView):
     def get(self, request, booking_id):
         try:
             booking = Booking.objects.get(id=booking_id)
-        except:
-            resp = {                
-                "errorMessage": "Flight details descriptions.",
-                "resultCode": "0"
-            }           
+        except Booking.DoesNotExist:
+            # Finished bookings may have been moved to the archive
+            archived = ArchiveService.find(booking_id=booking_id)
+            if archived is None:
+                return Response(
+                    {'errorMessage': 'Booking not found',"resultCode": "0"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            resp = {
+                "results": ArchivedBookingSerializer(archived).data,
+                "resultDescription": "Archived flight booking details descriptions.",
+                "resultCode": "1"
+            }
+            return Response(resp, status=status.HTTP_200_OK)
 
         serializer = BookingSerializer(booking)
         resp = {
@@ -272,14 +555,65 @@ class BookingDetailView(APIView):
         }
         return Response(resp, status=status.HTTP_200_OK)
 
+@method_decorator(gzip_page, name='dispatch')
 class BookingListView(APIView):
     def get(self, request):
-        bookings = Booking.objects.all()
-        serializer = BookingSerializer(bookings, many=True)
+        fields = request.query_params.get('fields')
+        fields = [name.strip() for name in fields.split(',')] if fields else None
+
+        # Flight and seat details are joined in; transitions take one query
+        serializer = BookingValuesSerializer(fields=fields)
+        try:
+            page, next_cursor = KeysetPagination(request).paginate(serializer.values(Booking.objects.all()))
+        except InvalidCursorError as e:
+            return Response(
+                {'errorMessage': str(e), "resultCode": "0"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         resp = {
-            "results": serializer.data,
+            "results": serializer.to_representation(page),
+            "next": next_cursor,
             "resultDescription": "All Booking data.",
             "resultCode": "1"
         }
-        return Response(resp, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(resp, status=status.HTTP_200_OK)
+
+
+class BookingExportView(APIView):
+    def get(self, request):
+        params = request.query_params
+        table = params.get('table', 'bookings')
+        fmt = params.get('export_format', 'ndjson')
+        try:
+            if table not in ExportService.TABLES:
+                raise ExportError(f"Unknown table {table}")
+            if fmt not in ExportService.FORMATS:
+                raise ExportError(f"Unknown format {fmt}")
+            filters = ExportService.parse_filters(
+                state=params.get('state'),
+                flight_id=params.get('flight_id'),
+                created_from=params.get('created_from'),
+                created_to=params.get('created_to')
+            )
+        except ExportError as e:
+            return Response(
+                {'errorMessage': str(e), "resultCode": "0"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = ExportService.rows(table, filters)
+        response = StreamingHttpResponse(
+            ExportService.render(table, rows, fmt),
+            content_type=ExportService.CONTENT_TYPES[fmt]
+        )
+        response['Content-Disposition'] = f'attachment; filename="{table}.{fmt}"'
+        return response
+
+class MetricsView(APIView):
+    def get(self, request):
+        # Prometheus text format; counters are per process
+        return HttpResponse(
+            metrics_registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
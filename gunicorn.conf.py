@@ -0,0 +1,28 @@
+"""Gunicorn settings for the production profile.
+
+WSGI, threaded workers (default):
+    gunicorn -c gunicorn.conf.py airline_booking.wsgi:application
+
+ASGI with the async flight views (needs uvicorn):
+    ASYNC_FLIGHT_VIEWS=1 GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \
+        gunicorn -c gunicorn.conf.py airline_booking.asgi:application
+
+Each worker thread holds its own persistent database connection
+(DB_CONN_MAX_AGE), so keep workers * threads below the database's
+connection limit.
+"""
+import multiprocessing
+# Imported under another name: gunicorn treats module-level names as settings
+from decouple import config as env
+
+bind = env('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = env('WEB_CONCURRENCY', default=multiprocessing.cpu_count() * 2 + 1, cast=int)
+worker_class = env('GUNICORN_WORKER_CLASS', default='gthread')
+threads = env('GUNICORN_THREADS', default=4, cast=int)
+timeout = env('GUNICORN_TIMEOUT', default=30, cast=int)
+keepalive = 5
+# Recycle workers now and then so slow leaks cannot accumulate
+max_requests = env('GUNICORN_MAX_REQUESTS', default=5000, cast=int)
+max_requests_jitter = 500
+# Empty disables the access log
+accesslog = env('GUNICORN_ACCESS_LOG', default='-') or None